@@ -4,9 +4,23 @@ from pathlib import Path
 
 from platformdirs import user_data_dir
 
+from antares_web_installer.logqueue import LogQueue
+
 TARGET_DIR = Path(user_data_dir("AntaresWeb", "RTE"))
 SRC_DIR = Path(".")
 
-logging.basicConfig(level=logging.DEBUG, format="[%(asctime)-15s] %(message)s", stream=sys.stdout)
-
 logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+# the handlers are called by a background thread, so that logging doesn't slow down the installation
+log_queue = LogQueue(logger)
+
+
+def add_console_handler() -> None:
+    """
+    Write the log messages on the standard output.
+    Called by the entry points of the applications: importing the package doesn't start the log thread.
+    """
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setFormatter(logging.Formatter("[%(asctime)-15s] %(message)s"))
+    log_queue.add_handler(console_handler)
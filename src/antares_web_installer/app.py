@@ -1,28 +1,93 @@
+import contextlib
 import dataclasses
 import os
-import re
+import shutil
 import subprocess
+import tempfile
 import textwrap
+import threading
 import time
-from difflib import SequenceMatcher
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from shutil import copy2, copytree
-from typing import List
-
-import requests
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
 
 if os.name == "nt":
     from pythoncom import com_error
 
 import psutil
 
-from antares_web_installer import logger
-from antares_web_installer.config import update_config
+from antares_web_installer import log_queue, logger
+from antares_web_installer.archive import ArchiveError, BundleArchive, is_archive
+from antares_web_installer.blobstore import BlobStore, BlobStoreError
+from antares_web_installer.config import read_server_address, update_config
+from antares_web_installer.copier import DEFAULT_NB_WORKERS, CopyCallback, Copier, CopyError, VerificationError
+from antares_web_installer.delta import DELTAS_DIR, DeltaEntry, DeltaError, DeltaPackage
+from antares_web_installer.events import (
+    BytesTransferred,
+    Event,
+    EventBus,
+    InstallFailed,
+    InstallFinished,
+    ProgressChanged,
+    StepFinished,
+    StepStarted,
+    log_event,
+)
+from antares_web_installer.journal import Journal
+from antares_web_installer.manifest import (
+    CHECKSUMS_FILE,
+    HASH_ALGORITHM,
+    FileEntry,
+    Manifest,
+    load_checksums,
+    plan_copy,
+)
+from antares_web_installer.processes import (
+    DEFAULT_STOP_TIMEOUT,
+    ServerFinder,
+    ServerLock,
+    find_port_holder,
+    is_port_free,
+    stop_processes,
+    wait_port_released,
+)
+from antares_web_installer.progress import TransferProgress, format_size
+from antares_web_installer.readiness import ReadinessError, ReadinessProber, ReadinessTimeout
+from antares_web_installer.scanner import ScanEntry, TreeIndex, scan_tree
+from antares_web_installer.serveroutput import OutputMonitor
 from antares_web_installer.shortcuts import create_shortcut, get_desktop
+from antares_web_installer.snapshot import DEFAULT_NB_SNAPSHOTS, Snapshot, SnapshotError, SnapshotStore
+from antares_web_installer.steps import Step, StepScheduler
+from antares_web_installer.tracing import Tracer
+from antares_web_installer.versions import VERSION_FILE, VersionError, VersionResolver, read_version_file
+
+# Directory of the target directory where the installer keeps its own data (manifest...)
+INSTALLER_DATA_DIR = Path(".installer")
+MANIFEST_PATH = INSTALLER_DATA_DIR / "manifest.json"
+# In staged mode, the new program files are prepared in the staging directory, on the same file system
+# as the target directory, and the replaced program files are moved to the backup directory.
+STAGING_PATH = INSTALLER_DATA_DIR / "staging"
+BACKUP_PATH = INSTALLER_DATA_DIR / "previous"
+# Journal of the files copied by the installation in progress, used to resume an interrupted installation
+JOURNAL_PATH = INSTALLER_DATA_DIR / "journal.jsonl"
+# Lock file describing the server launched by the installer, used to find it without scanning all the processes
+SERVER_LOCK_PATH = INSTALLER_DATA_DIR / "server.json"
+# Output of the server launched by the installer
+SERVER_OUTPUT_PATH = Path("logs") / "server-output.log"
+# Snapshots of the installation taken before the upgrades, which can be restored with the "rollback" command
+SNAPSHOTS_PATH = INSTALLER_DATA_DIR / "snapshots"
+# Versions given by the server executables, so that they are not executed again
+VERSIONS_CACHE_PATH = INSTALLER_DATA_DIR / "versions.json"
+# Trace of the duration of the installation phases, with the data of the installer, so that the trace
+# of a failed installation doesn't look like an existing installation to the next one
+TRACE_PATH = INSTALLER_DATA_DIR / "install-trace.jsonl"
+
+# Configuration file of the server, part of the resources excluded from the installation
+CONFIG_FILE_NAME = "config.yaml"
 
 # List of files and directories to exclude during installation
 COMMON_EXCLUDED_RESOURCES = {
-    Path("config.yaml"),
+    Path(CONFIG_FILE_NAME),
     Path("archives"),
     Path("internal_studies"),
     Path("studies"),
@@ -30,6 +95,8 @@ COMMON_EXCLUDED_RESOURCES = {
     Path("matrices"),
     Path("tmp"),
     Path("local_workspace"),
+    INSTALLER_DATA_DIR,
+    DELTAS_DIR,
 }
 
 POSIX_EXCLUDED_FILES = COMMON_EXCLUDED_RESOURCES | {Path("AntaresWebInstallerCLI")}
@@ -40,8 +107,7 @@ EXCLUDED_ROOT_RESOURCES = POSIX_EXCLUDED_FILES if os.name == "posix" else WINDOW
 SERVER_NAMES = {"posix": "AntaresWebServer", "nt": "AntaresWebServer.exe"}
 SHORTCUT_NAMES = {"posix": "AntaresWebServer.desktop", "nt": "AntaresWebServer.lnk"}
 
-SERVER_ADDRESS = "http://127.0.0.1:8080"
-HEALTHCHECK_ADDRESS = f"{SERVER_ADDRESS}/api/health"
+HEALTHCHECK_PATH = "/api/health"
 
 MAX_SERVER_START_TIME = 120
 
@@ -58,194 +124,994 @@ class App:
     target_dir: Path
     shortcut: bool = True
     launch: bool = True
+    incremental: bool = True
+    nb_workers: int = DEFAULT_NB_WORKERS
+    staged: bool = False
+    resume: bool = True
+    verify: bool = True
+    nb_snapshots: int = DEFAULT_NB_SNAPSHOTS
+    blob_store: Optional[Path] = None
+    stop_timeout: float = DEFAULT_STOP_TIMEOUT
+    server_start_timeout: float = MAX_SERVER_START_TIME
+    trace_path: Optional[Path] = None
 
     server_path: Path = dataclasses.field(init=False)
+    old_version: Optional[str] = dataclasses.field(init=False, default=None)
+    source_is_archive: bool = dataclasses.field(init=False)
+    _archive: Optional[BundleArchive] = dataclasses.field(init=False, default=None, repr=False)
+    _source_index: Optional[TreeIndex] = dataclasses.field(init=False, default=None, repr=False)
+    copier: Copier = dataclasses.field(init=False)
+    _versions: VersionResolver = dataclasses.field(init=False, repr=False)
     progress: float = dataclasses.field(init=False)
     nb_steps: int = dataclasses.field(init=False)
     version: str = dataclasses.field(init=False)
+    step_timings: Dict[str, float] = dataclasses.field(init=False, default_factory=dict)
+    events: EventBus = dataclasses.field(init=False, repr=False)
+    tracer: Tracer = dataclasses.field(init=False, repr=False)
+    _step_progress: Dict[Optional[str], float] = dataclasses.field(init=False, repr=False)
+    _current_step: threading.local = dataclasses.field(init=False, repr=False)
 
     def __post_init__(self):
         # Prepare the path to the executable which is located in the target directory
         server_name = SERVER_NAMES[os.name]
         self.server_path = self.target_dir / "AntaresWeb" / server_name
+        # the files are hashed while they are copied, to check them and to write the manifest of the installed files
+        self.copier = Copier(
+            nb_workers=self.nb_workers,
+            hash_algorithm=HASH_ALGORITHM if self.verify else None,
+            # the program files may be linked to a store shared by the installations of the machine
+            blob_store=BlobStore(self.blob_store) if self.blob_store is not None else None,
+        )
+        # the source may be a release archive instead of an extracted bundle
+        self.source_is_archive = is_archive(self.source_dir)
+        # the versions given by the server executables are cached in the installation
+        self._versions = VersionResolver(self.target_dir.joinpath(VERSIONS_CACHE_PATH))
+
+        # the progress is published as events, which are also logged for the console and the log files
+        self.events = EventBus()
+        self.events.subscribe(log_event(logger))
+        # the duration of each phase is written in a trace file
+        self.tracer = Tracer()
 
         # Set all progress variables needed to compute current progress of the installation
-        self.nb_steps = 2  # kill, install steps
+        self.nb_steps = len(self._plan_steps())
+        self._step_progress = {}
+        self._current_step = threading.local()
+        self.progress = 0
+
+    def _plan_steps(self) -> List[Step]:
+        """
+        Build the dependency graph of the installation steps, in the order of the error reporting.
+        """
+        steps = []
+        if self.staged:
+            steps.append(Step("stage", self.stage_files))
+        if not self.source_is_archive:
+            # the version of the new server is known before the installation needs it
+            steps.append(Step("version", self.probe_new_version))
+        # in staged mode, the running server is only stopped once the new program files are ready
+        steps.append(Step("kill", self.kill_running_server, requires=["stage"] if self.staged else []))
+        install_requires = ["kill"]
+        if self.nb_snapshots > 0:
+            steps.append(Step("snapshot", self.create_snapshot, requires=["kill"]))
+            install_requires.append("snapshot")
+        steps.append(Step("install", self.install_files, requires=install_requires))
+        # the shortcut and the server launch only need the installed files
         if self.shortcut:
-            self.nb_steps += 1
+            steps.append(Step("shortcut", self.create_shortcuts, requires=["install"]))
         if self.launch:
-            self.nb_steps += 1
-        self.current_step = 0
-        self.progress = 0
+            steps.append(Step("launch", self.start_server, requires=["install"]))
+        return [dataclasses.replace(step, func=self._step_runner(step)) for step in steps]
+
+    def _step_runner(self, step: Step) -> Callable[[], None]:
+        def run_step() -> None:
+            self._current_step.name = step.name
+            self.events.publish(StepStarted(step.name))
+            start = time.perf_counter()
+            failed = True
+            try:
+                with self.tracer.span(step.name):
+                    step.func()
+                failed = False
+            finally:
+                self._current_step.name = None
+                self.events.publish(StepFinished(step.name, time.perf_counter() - start, failed=failed))
+            if self._step_progress[step.name] < 100:
+                self.update_progress(100, step_name=step.name)
+
+        return run_step
 
     def run(self) -> None:
-        self.kill_running_server()
-        self.current_step += 1
+        """
+        Run the installation steps, the independent ones concurrently.
+        """
+        steps = self._plan_steps()
+        self._step_progress = {step.name: 0 for step in steps}
+        self.tracer = Tracer()
+        scheduler = StepScheduler(steps)
+        outcome: Optional[Event] = None
+        try:
+            scheduler.run()
+            if self.staged:
+                self._remove_backup()
+            outcome = InstallFinished()
+        except Exception as e:
+            outcome = InstallFailed(str(e))
+            raise
+        finally:
+            self.step_timings = scheduler.timings
+            self.close_archive()
+            timings = ", ".join(f"{name} {elapsed:.2f} s" for name, elapsed in self.step_timings.items())
+            logger.info(f"Step timings: {timings}.")
+            for name, error in list(scheduler.errors.items())[1:]:
+                logger.warning(f"The step '{name}' also failed: {error}")
+            self._write_trace()
+            # the log messages are written, and published, before the outcome of the installation
+            log_queue.flush()
+            if outcome is not None:
+                self.events.publish(outcome)
 
-        self.install_files()
-        self.current_step += 1
+    def _write_trace(self) -> None:
+        """
+        Append the spans of the installation to the trace file, and log their summary.
+        """
+        logger.info(f"Installation phases:\n{self.tracer.summary()}")
+        trace_path = self.target_dir.joinpath(TRACE_PATH) if self.trace_path is None else self.trace_path
+        try:
+            self.tracer.write(trace_path)
+        except OSError as e:
+            logger.warning(f"Cannot write the installation trace in '{trace_path}': {e}")
+        else:
+            logger.debug(f"Installation trace written in '{trace_path}'.")
 
-        if self.shortcut:
-            self.create_shortcuts()
-            self.current_step += 1
+    @property
+    def server_address(self) -> Tuple[str, int]:
+        """
+        Host and port the server listens to, read from the configuration file of the installation.
+        """
+        return read_server_address(self.target_dir.joinpath("config.yaml"))
 
-        if self.launch:
-            self.start_server()
-            self.current_step += 1
+    @property
+    def server_host(self) -> str:
+        return self.server_address[0]
+
+    @property
+    def server_port(self) -> int:
+        return self.server_address[1]
+
+    @property
+    def server_url(self) -> str:
+        host, port = self.server_address
+        # a server listening to all the interfaces is reached through the loopback interface
+        host = {"0.0.0.0": "127.0.0.1", "::": "::1"}.get(host, host)
+        return f"http://[{host}]:{port}" if ":" in host else f"http://{host}:{port}"
+
+    def update_progress(self, progress: float, step_name: Optional[str] = None):
+        """
+        Update the progress of the current step, and publish the progress of the whole installation.
 
-    def update_progress(self, progress: float):
-        self.progress = (progress / self.nb_steps) + (self.current_step / self.nb_steps) * 100
-        logger.info(f"Progression: {self.progress:.2f}")
+        @param progress: progress of the step, between 0 and 100.
+        @param step_name: name of the step, by default the step running in the current thread.
+        """
+        if step_name is None:
+            step_name = getattr(self._current_step, "name", None)
+        self._step_progress[step_name] = progress
+        self.progress = sum(self._step_progress.values()) / self.nb_steps
+        self.events.publish(ProgressChanged(self.progress, step_name))
 
     def kill_running_server(self) -> None:
         """
         Check whether Antares service is up.
-        Kill the process if so.
+        Stop the processes if so, and wait until the port of the server is released.
         """
-        server_processes = self._get_server_processes()
+        with self.tracer.span("find"):
+            server_processes = self._get_server_processes()
         if len(server_processes) > 0:
+            # the port of the stopped server, which the new server will listen to
+            lock = ServerLock.load(self.target_dir.joinpath(SERVER_LOCK_PATH))
+            port = lock.port if lock is not None else self.server_port
             logger.info("Attempt to stop running Antares server ...")
-            for p in server_processes:
-                try:
-                    p.kill()
-                except psutil.NoSuchProcess:
-                    logger.debug(f"The process '{p.pid}' was stopped before being killed.")
-                    continue
-            gone, alive = psutil.wait_procs(server_processes, timeout=5)
-            alive_count = len(alive)
-            if alive_count > 0:
+            with self.tracer.span("stop", processes=len(server_processes)):
+                alive = stop_processes(server_processes, timeout=self.stop_timeout)
+            if alive:
                 raise InstallError(
                     "Could not to stop Antares server. Please stop it before launching again the installation."
                 )
-            else:
-                logger.info("Antares server successfully stopped...")
+            self.target_dir.joinpath(SERVER_LOCK_PATH).unlink(missing_ok=True)
+            with self.tracer.span("port", port=port):
+                released = wait_port_released(self.server_host, port, timeout=self.stop_timeout)
+            if not released:
+                raise InstallError(
+                    f"Antares server was stopped, but the port {port} is still in use."
+                    " Please release it before launching again the installation."
+                )
+            logger.info("Antares server successfully stopped...")
         else:
             logger.info("No running server found, resuming installation.")
         self.update_progress(100)
 
     def _get_server_processes(self) -> List[psutil.Process]:
-        res = []
-        for process in psutil.process_iter(["pid", "name"]):
-            try:
-                # evaluate matching between query process name and existing process name
-                matching_ratio = SequenceMatcher(None, "antareswebserver", process.name().lower()).ratio()
-            except FileNotFoundError:
-                logger.warning("The process '{}' does not exist anymore. Skipping its analysis".format(process.name()))
-                continue
-            except psutil.NoSuchProcess:
-                logger.warning("The process '{}' was stopped before being analyzed. Skipping.".format(process.name()))
-                continue
-            if matching_ratio > 0.8:
-                res.append(process)
-                logger.debug(f"Running server found: {process.name()} -  process id: {process.pid}")
-        return res
+        """
+        Find the server processes of this installation, run by the current user.
+        """
+        lock_path = self.target_dir.joinpath(SERVER_LOCK_PATH)
+        processes = ServerFinder(self.server_path, self.target_dir).find(lock_path)
+        for process in processes:
+            logger.debug(f"Running server found: process id: {process.pid}")
+        return processes
 
     def install_files(self):
         """ """
         logger.info(f"Starting installing files in {self.target_dir}...")
 
-        # if the target directory already exists and isn't empty
-        if self.target_dir.is_dir() and list(self.target_dir.iterdir()):
-            logger.info("Existing files were found. Proceed checking old version...")
-            # check app version
-            old_version = self.check_version()
-            logger.info(f"Old application version : {old_version}.")
+        # if the target directory already exists and isn't empty (and isn't an interrupted new installation)
+        if self._has_existing_files() and not self._is_interrupted_install():
+            self._upgrade_files()
+
+        else:
+            # copy all files from package
+            logger.info("No existing files found. Starting file copy...")
+            if self.source_is_archive:
+                self._extract_archive(self.target_dir, (0, 90), program_files_only=False)
+            else:
+                index = self.get_source_index()
+                self._check_blob_store(self.target_dir)
+                # the delta packages are only used to upgrade an existing installation
+                roots = [entry.relpath for entry in index.top_level() if entry.relpath != DELTAS_DIR.name]
+                manifest = Manifest()
+                with self._start_journal(self.target_dir, fresh=True) as journal:
+                    entries = index.iter_files(roots=roots)
+                    done = self._find_copied_files(journal, entries, self.target_dir, manifest)
+                    total_bytes = sum(e.size for e in index.iter_files(roots=roots) if e.relpath not in done)
+                    self.check_disk_space(self.target_dir, total_bytes)
+                    logger.info(f"{format_size(total_bytes)} to copy.")
+                    on_copied = self._record_copy(
+                        journal, manifest, index, self.target_dir, self._track_copy(total_bytes, (0, 90))
+                    )
+                    errors: List[Union[CopyError, VerificationError]] = []
+                    with self.tracer.span("copy"):
+                        for root in roots:
+                            with self.tracer.span(root) as span:
+                                try:
+                                    self.copier.copy_tree(
+                                        index,
+                                        self.target_dir,
+                                        [root],
+                                        span.counting(on_copied),
+                                        skip=lambda e: e.relpath in done,
+                                    )
+                                except (CopyError, VerificationError) as e:
+                                    # the next entries are still copied, so that they are not copied again on resume
+                                    span.failed = True
+                                    errors.append(e)
+                    if errors:
+                        error = errors[0]
+                        if isinstance(error, VerificationError):
+                            raise self._corrupted_file_error(error, self.target_dir) from error
+                        raise InstallError(
+                            f"Error: Cannot write '{error.relpath}' in {self.target_dir}: {error.reason}"
+                        ) from error
+                    manifest.save(self.target_dir.joinpath(MANIFEST_PATH))
+                    journal.discard()
+                logger.info(f"Copy methods: {self.copier.format_strategies()}.")
+            logger.info("Files was successfully copied.")
+            self.version = self.check_version()
+            self.update_progress(100)
+
+        self._prune_blob_store()
+
+    def _upgrade_files(self) -> None:
+        """
+        Upgrade the existing installation: update the configuration file and the program files.
+        """
+        logger.info("Existing files were found. Proceed checking old version...")
+        # `check_old_version` raises an `InstallError` if the old version is unknown
+        old_version = self.check_old_version()
+        self.update_progress(25)
+
+        # update config file
+        logger.info("Update configuration file...")
+        target_config_path = self.target_dir.joinpath("config.yaml")
+        with self.tracer.span("config"), self._source_config_path() as src_config_path:
+            update_config(src_config_path, target_config_path, old_version)
+        logger.info("Configuration file updated.")
+        self.update_progress(50)
+
+        # copy binaries
+        logger.info("Update program files...")
+        if self.staged and self.target_dir.joinpath(STAGING_PATH).is_dir():
+            with self.tracer.span("swap"):
+                self.swap_staged_files()
+        else:
+            self.copy_files(progress_range=(50, 75))
+        self._remove_stale_version_file()
+        logger.info("Program files updated")
+        self.update_progress(75)
+
+        # check new version of the application
+        logger.info("Check new application version...")
+        self.version = self.check_version()
+        logger.info(f"New application version : {self.version}.")
+        self.update_progress(100)
+
+    def get_source_index(self) -> TreeIndex:
+        """
+        Scan the source directory, once for the whole installation.
+        """
+        if self._source_index is None:
+            logger.info(f"Scanning '{self.source_dir}'...")
+            try:
+                self._source_index = scan_tree(self.source_dir, EXCLUDED_ROOT_RESOURCES)
+            except OSError as e:
+                raise InstallError(f"Error: Cannot read the sources in '{self.source_dir}': {e}") from e
+            logger.info(f"Sources: {self._source_index.describe()}.")
+            if self.verify and CHECKSUMS_FILE in self._source_index.entries:
+                self._load_checksums(self._source_index)
+        return self._source_index
+
+    def _load_checksums(self, index: TreeIndex) -> None:
+        """
+        Load the checksum manifest shipped with the bundle, used to check the copied files.
+        """
+        checksums_path = self.source_dir.joinpath(CHECKSUMS_FILE)
+        try:
+            checksums = load_checksums(checksums_path)
+        except (OSError, ValueError) as e:
+            raise InstallError(f"Error: Cannot read the checksums of the bundle in '{checksums_path}': {e}") from e
+        missing = [relpath for relpath in checksums if relpath not in index.entries]
+        if missing:
+            raise InstallError(f"Error: The bundle is incomplete, missing files: {', '.join(missing)}")
+        self.copier.checksums = checksums
+        logger.info(f"{len(checksums)} checksum(s) loaded from '{checksums_path}'.")
+
+    @staticmethod
+    def check_disk_space(dst_dir: Path, required_bytes: int) -> None:
+        """
+        Check that the file system of `dst_dir` has enough free space to write `required_bytes`.
+        """
+        existing_dir = next(path for path in (dst_dir, *dst_dir.parents) if path.exists())
+        free_bytes = shutil.disk_usage(existing_dir).free
+        if free_bytes < required_bytes:
+            raise InstallError(
+                f"Error: Not enough disk space in '{existing_dir}':"
+                f" {format_size(required_bytes)} required, {format_size(free_bytes)} available."
+            )
+
+    def get_archive(self) -> BundleArchive:
+        """
+        Open the source archive, once for the whole installation.
+        """
+        if self._archive is None:
+            try:
+                self._archive = BundleArchive(self.source_dir)
+            except ArchiveError as e:
+                raise InstallError(f"Error: {e}") from e
+        return self._archive
+
+    def close_archive(self) -> None:
+        if self._archive is not None:
+            self._archive.close()
+            self._archive = None
+
+    @contextlib.contextmanager
+    def _source_config_path(self) -> Iterator[Path]:
+        """
+        Give the path of the source configuration file, extracted in a temporary directory
+        if the source is an archive.
+        """
+        if not self.source_is_archive:
+            yield self.source_dir.joinpath("config.yaml")
+            return
+        archive = self.get_archive()
+        member = archive.get_member("config.yaml")
+        if member is None:
+            raise InstallError(f"Error: No 'config.yaml' found in '{self.source_dir}'")
+        with tempfile.TemporaryDirectory(prefix="~antares-web-installer-") as tmp_dir:
+            archive.extract(Path(tmp_dir), [member])
+            yield Path(tmp_dir, "config.yaml")
+
+    def _extract_archive(self, dst_dir: Path, progress_range: Tuple[float, float], program_files_only: bool) -> None:
+        """
+        Extract the source archive member by member in `dst_dir`, without intermediate copy.
+
+        @param dst_dir: either the target directory or the staging directory.
+        @param progress_range: progress values of the current step at the beginning and the end of the extraction.
+        @param program_files_only: whether to skip the excluded resources (configuration, studies...).
+        """
+        archive = self.get_archive()
+        # like from a directory, the delta packages are only read from the bundle, never installed
+        members = [member for member in archive.members if member.root != DELTAS_DIR]
+        if program_files_only:
+            members = [member for member in members if member.root not in EXCLUDED_ROOT_RESOURCES]
+        total_bytes = sum(member.size for member in members if member.kind == "file")
+        logger.info(f"{format_size(total_bytes)} to extract from '{self.source_dir}'.")
+        try:
+            with self.tracer.span("extract") as span:
+                archive.extract(dst_dir, members, span.counting(self._track_copy(total_bytes, progress_range)))
+        except ArchiveError as e:
+            raise InstallError(f"Error: {e}") from e
+        except OSError as e:
+            raise InstallError(f"Error: Cannot extract '{self.source_dir.name}' in {dst_dir}: {e}") from e
+        # a zip archive may not record the permissions of its members: the server must be executable anyway
+        server_path = dst_dir.joinpath("AntaresWeb", SERVER_NAMES[os.name])
+        if os.name == "posix" and server_path.is_file():
+            server_path.chmod(0o755)
+        logger.info("Extraction completed.")
+
+    def _check_blob_store(self, dst_dir: Path) -> None:
+        """
+        Check that the program files copied in `dst_dir` can be linked to the blob store, if any.
+        """
+        store = self.copier.blob_store
+        if store is None:
+            return
+        try:
+            store.check_target(dst_dir)
+        except (BlobStoreError, OSError) as e:
+            raise InstallError(f"Error: Cannot use the blob store: {e}") from e
+        logger.info(f"Program files are linked to the blob store '{store.root_dir}'.")
+
+    def _prune_blob_store(self) -> None:
+        """
+        Remove the blobs which are not used by any installation anymore.
+        """
+        store = self.copier.blob_store
+        if store is None:
+            return
+        nb_removed, freed_bytes = store.prune()
+        if nb_removed:
+            logger.info(f"{nb_removed} unused file(s) removed from the blob store ({format_size(freed_bytes)}).")
+
+    def _is_interrupted_install(self) -> bool:
+        """
+        Check whether the target directory only contains the files of an interrupted new installation.
+        """
+        if not self.resume or self.source_is_archive:
+            return False
+        journal_path = self.target_dir.joinpath(JOURNAL_PATH)
+        return Journal.find(journal_path, self.source_dir, self.target_dir, fresh=True) is not None
+
+    def _start_journal(self, dst_dir: Path, fresh: bool) -> Journal:
+        """
+        Resume the journal of the interrupted copy to `dst_dir`, or start a new one.
+
+        @param dst_dir: either the target directory or the staging directory.
+        @param fresh: whether the copy is a new installation or an update.
+        """
+        journal_path = self.target_dir.joinpath(JOURNAL_PATH)
+        if not self.resume:
+            journal_path.unlink(missing_ok=True)
+        return Journal.start(journal_path, self.source_dir, dst_dir, fresh, old_version=self.old_version)
+
+    def _interrupted_upgrade_version(self) -> Optional[str]:
+        """
+        Get the version installed before an interrupted upgrade, recorded in its journal:
+        once some program files are upgraded, the installed version can't be found again.
+        """
+        if not self.resume:
+            return None
+        journal = Journal.load(self.target_dir.joinpath(JOURNAL_PATH))
+        if journal is None or journal.header.get("fresh") is not False:
+            return None
+        if journal.header.get("dst") not in {str(self.target_dir), str(self.target_dir.joinpath(STAGING_PATH))}:
+            return None
+        return journal.header.get("old_version")
+
+    @staticmethod
+    def _find_copied_files(
+        journal: Journal,
+        entries: Iterable[ScanEntry],
+        dst_dir: Path,
+        manifest: Manifest,
+    ) -> Set[str]:
+        """
+        Find the files which were already copied by an interrupted installation, and are still up-to-date.
+        Their digests, if known, are added to the manifest.
+        """
+        done = set()
+        for entry in entries:
+            if journal.is_done(entry, dst_dir.joinpath(entry.relpath)):
+                done.add(entry.relpath)
+                journal_entry = journal.entries[entry.relpath]
+                if journal_entry.digest and not entry.excluded:
+                    manifest.entries[entry.relpath] = FileEntry(
+                        journal_entry.dst_size, journal_entry.dst_mtime_ns, journal_entry.digest
+                    )
+        if done:
+            logger.info(f"Resuming the interrupted installation: {len(done)} file(s) already copied.")
+        return done
+
+    def _record_copy(
+        self,
+        journal: Journal,
+        manifest: Manifest,
+        index: TreeIndex,
+        dst_dir: Path,
+        callback: CopyCallback,
+    ) -> CopyCallback:
+        """
+        Wrap a copy callback to record each copied file in the journal,
+        and each copied program file in the manifest of the installed files.
+        """
+
+        def on_copied(relpath: str, size: int) -> None:
+            dst_path = dst_dir.joinpath(relpath)
+            entry = index.entries[relpath]
+            # the digest is computed during the copy, unless the verification is disabled
+            digest = self.copier.digests.get(relpath)
+            if not entry.excluded:
+                manifest.record(relpath, dst_path, digest)
+                digest = manifest.entries[relpath].digest
+            journal.record(entry, dst_path, digest)
+            callback(relpath, size)
+
+        return on_copied
+
+    @staticmethod
+    def _corrupted_file_error(e: VerificationError, dst_dir: Path) -> InstallError:
+        return InstallError(
+            f"Error: '{e.relpath}' is corrupted in {dst_dir}: its {HASH_ALGORITHM} digest is {e.actual}"
+            f" but {e.expected} is expected. Please check the source and target disks, then run the installation again."
+        )
+
+    def _has_existing_files(self) -> bool:
+        # the data of the installer may be written before the files are installed
+        return self.target_dir.is_dir() and any(p.name != INSTALLER_DATA_DIR.name for p in self.target_dir.iterdir())
+
+    def check_old_version(self) -> str:
+        """
+        Check the version of the installed application, which must be at least 2.18.
+        When an interrupted upgrade is resumed, the version recorded when it started is used.
+        """
+        if self.old_version is None:
+            old_version = self._interrupted_upgrade_version()
+            if old_version is None:
+                old_version = self.check_version()
+                logger.info(f"Old application version : {old_version}.")
+            else:
+                logger.info(f"Resuming the upgrade from version {old_version}.")
             version_info = tuple(map(int, old_version.split(".")))
             if version_info < (2, 18):
                 raise InstallError(
                     f"Trying to update from version {old_version}: updating from version older than 2.18 is not supported, please select a new installation directory."
                 )
-            self.update_progress(25)
+            self.old_version = old_version
+        return self.old_version
 
-            # update config file
-            logger.info("Update configuration file...")
-            src_config_path = self.source_dir.joinpath("config.yaml")
-            target_config_path = self.target_dir.joinpath("config.yaml")
-            update_config(src_config_path, target_config_path, old_version)
-            logger.info("Configuration file updated.")
-            self.update_progress(50)
+    def stage_files(self) -> None:
+        """
+        Prepare the new program files in the staging directory while the old server keeps running.
+        The program files are then switched by `swap_staged_files` during the installation step.
+        """
+        staging_dir = self.target_dir.joinpath(STAGING_PATH)
+        # remove the leftovers of an interrupted installation, unless it can be resumed
+        journal_path = self.target_dir.joinpath(JOURNAL_PATH)
+        if not self.resume or Journal.find(journal_path, self.source_dir, staging_dir) is None:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+        if not self._has_existing_files():
+            logger.info("No existing files found. Nothing to stage.")
+            self.update_progress(100)
+            return
 
-            # copy binaries
-            logger.info("Update program files...")
-            self.copy_files()
-            logger.info("Program files updated")
-            self.update_progress(75)
+        logger.info("Existing files were found. Proceed checking old version...")
+        self.check_old_version()
+        self.update_progress(10)
 
-            # check new version of the application
-            logger.info("Check new application version...")
-            self.version = self.check_version()
-            logger.info(f"New application version : {self.version}.")
+        logger.info(f"Staging program files in '{staging_dir}'...")
+        self._install_program_files(staging_dir, progress_range=(10, 100))
+        logger.info("Program files staged.")
+        self.update_progress(100)
+
+    def swap_staged_files(self) -> None:
+        """
+        Replace the installed program files by the staged ones, using renames only.
+        The replaced files are kept in the backup directory until the end of the installation,
+        and are restored if a rename fails.
+        """
+        staging_dir = self.target_dir.joinpath(STAGING_PATH)
+        backup_dir = self.target_dir.joinpath(BACKUP_PATH)
+        shutil.rmtree(backup_dir, ignore_errors=True)
+        backup_dir.mkdir(parents=True)
+
+        logger.info("Switching to the staged program files...")
+        swapped = []
+        try:
+            for staged_path in sorted(staging_dir.iterdir()):
+                installed_path = self.target_dir.joinpath(staged_path.name)
+                backup_path = backup_dir.joinpath(staged_path.name)
+                if installed_path.exists():
+                    os.replace(installed_path, backup_path)
+                swapped.append(staged_path.name)
+                os.replace(staged_path, installed_path)
+        except OSError as e:
+            logger.warning(f"Restoring the previous program files after error: {e}")
+            for name in reversed(swapped):
+                installed_path = self.target_dir.joinpath(name)
+                backup_path = backup_dir.joinpath(name)
+                if installed_path.exists() and not staging_dir.joinpath(name).exists():
+                    os.replace(installed_path, staging_dir.joinpath(name))
+                if backup_path.exists():
+                    os.replace(backup_path, installed_path)
+            raise InstallError(f"Error: Cannot switch to the new program files in {self.target_dir}: {e}") from e
+        staging_dir.rmdir()
+        logger.info(f"{len(swapped)} program files and directories switched.")
+
+    def create_snapshot(self) -> None:
+        """
+        Take a snapshot of the existing installation, including the configuration and the user data,
+        so that the upgrade can be rolled back. The oldest snapshots are then removed.
+        """
+        if not self._has_existing_files() or self._is_interrupted_install():
+            logger.info("No existing installation found. No snapshot taken.")
             self.update_progress(100)
+            return
+        journal = Journal.load(self.target_dir.joinpath(JOURNAL_PATH))
+        if journal is not None and journal.header.get("dst") == str(self.target_dir):
+            # the installation is partially upgraded: the snapshot taken before the interrupted upgrade is kept
+            logger.info("Resuming an interrupted upgrade: keeping the snapshot taken before it.")
+            self.update_progress(100)
+            return
 
+        old_version = self.check_old_version()
+        store = SnapshotStore(self.target_dir.joinpath(SNAPSHOTS_PATH))
+        logger.info(f"Taking a snapshot of the version {old_version}...")
+        try:
+            snapshot = store.create(
+                self.target_dir,
+                old_version,
+                excluded={INSTALLER_DATA_DIR.name},
+                program_files=self._program_file_names(),
+                user_data={path.name for path in EXCLUDED_ROOT_RESOURCES} - {CONFIG_FILE_NAME},
+            )
+        except (SnapshotError, OSError) as e:
+            # the upgrade is still possible, but it can't be rolled back
+            logger.warning(f"Cannot take a snapshot of '{self.target_dir}': {e}")
         else:
-            # copy all files from package
-            logger.info("No existing files found. Starting file copy...")
-            copytree(self.source_dir, self.target_dir, dirs_exist_ok=True)
-            logger.info("Files was successfully copied.")
-            self.version = self.check_version()
-            self.update_progress(100)
+            logger.info(f"Snapshot {snapshot} taken.")
+            if not snapshot.user_data:
+                logger.warning(
+                    "The file system doesn't support reflinks: the user data (studies, matrices...)"
+                    " is not part of the snapshot, a rollback won't restore it."
+                )
+        self.update_progress(50)
+
+        for removed in store.prune(keep=self.nb_snapshots):
+            logger.info(f"Snapshot {removed.name} removed.")
+        self.update_progress(100)
+
+    def rollback(self, name: Optional[str] = None) -> Snapshot:
+        """
+        Restore a snapshot of the installation, taken before an upgrade.
+        The running server is stopped first.
+
+        @param name: name of the snapshot to restore, by default the latest one.
+        @return: the restored snapshot.
+        """
+        store = SnapshotStore(self.target_dir.joinpath(SNAPSHOTS_PATH))
+        try:
+            snapshot = store.get(name)
+        except SnapshotError as e:
+            raise InstallError(f"Error: {e}") from e
 
-    def copy_files(self):
+        self.kill_running_server()
+        logger.info(f"Restoring snapshot {snapshot}...")
+        try:
+            kept_dir = store.restore(
+                snapshot,
+                self.target_dir,
+                excluded={INSTALLER_DATA_DIR.name},
+                program_files=self._program_file_names(),
+            )
+        except SnapshotError as e:
+            raise InstallError(f"Error: {e}") from e
+        # the manifest describes the program files of the upgraded version
+        self.target_dir.joinpath(MANIFEST_PATH).unlink(missing_ok=True)
+        logger.info(f"Version {snapshot.version} restored.")
+        if kept_dir is not None:
+            logger.warning(f"The files modified since the snapshot are kept in '{kept_dir}'.")
+        return snapshot
+
+    def _program_file_names(self) -> Set[str]:
+        """
+        Names of the top-level entries of the installation holding the program files,
+        as opposed to the configuration and the user data.
+        """
+        excluded = {path.name for path in EXCLUDED_ROOT_RESOURCES}
+        return {path.name for path in self.target_dir.iterdir() if path.name not in excluded}
+
+    def _remove_backup(self) -> None:
+        backup_dir = self.target_dir.joinpath(BACKUP_PATH)
+        if backup_dir.exists():
+            logger.info("Removing the previous program files...")
+            shutil.rmtree(backup_dir, ignore_errors=True)
+
+    def _track_copy(self, total_bytes: int, progress_range: Tuple[float, float]) -> CopyCallback:
+        """
+        Create a callback which updates the progress according to the number of bytes copied,
+        and regularly reports the throughput and the remaining time.
+
+        @param total_bytes: total size of the files to copy.
+        @param progress_range: progress values of the current step at the beginning and the end of the copy.
+        @return: the callback to pass to the copier.
+        """
+        transfer = TransferProgress(total_bytes)
+        start, end = progress_range
+
+        def on_copied(relpath: str, size: int) -> None:
+            logger.debug(f"Copied '{relpath}'")
+            if transfer.advance(size):
+                self.update_progress(start + transfer.fraction * (end - start))
+                self.events.publish(BytesTransferred(transfer.done_bytes, transfer.total_bytes, str(transfer)))
+
+        return on_copied
+
+    def copy_files(self, progress_range: Tuple[float, float] = (0, 100)):
         """
         Copy all files from self.src_dir to self.target_dir
         Override existing files and directories that have the same name
         Raise an InstallError if an error occurs while overriding a directory, if the user hasn't the permission to
         write or if self.target_dir already exists.
+        In incremental mode, only the files that were added or changed since the previous installation are copied.
+
+        @param progress_range: progress values of the current step at the beginning and the end of the copy.
         """
-        src_dir_content = list(self.source_dir.iterdir())
-        dirs_to_copy = []
-        for root_dir in src_dir_content:
-            if root_dir.relative_to(self.source_dir) not in EXCLUDED_ROOT_RESOURCES:
-                dirs_to_copy.append(root_dir)
-        src_dir_content_length = len(dirs_to_copy)
+        self._install_program_files(self.target_dir, progress_range)
+
+    def _install_program_files(self, dst_dir: Path, progress_range: Tuple[float, float]) -> None:
+        """
+        Copy the program files, i.e. the source files which are not excluded, in `dst_dir`,
+        which is either the target directory or the staging directory.
+        """
+        if self.source_is_archive:
+            if self.incremental:
+                logger.info("Files of an archive can't be compared with the installed ones: extracting all of them.")
+            self._extract_archive(dst_dir, progress_range, program_files_only=True)
+            return
+
+        index = self.get_source_index()
+        self._check_blob_store(dst_dir)
+        if self.incremental:
+            self._copy_changed_files(index, dst_dir, progress_range)
+            return
+
+        manifest_path = self.target_dir.joinpath(MANIFEST_PATH)
+        manifest = Manifest.load(manifest_path)
+        with self._start_journal(dst_dir, fresh=False) as journal:
+            done = self._find_copied_files(journal, index.iter_files(include_excluded=False), dst_dir, manifest)
+            total_bytes = sum(e.size for e in index.iter_files(include_excluded=False) if e.relpath not in done)
+            self.check_disk_space(dst_dir, total_bytes)
+            logger.info(f"{format_size(total_bytes)} to copy.")
+            track_copy = self._track_copy(total_bytes, progress_range)
+            on_copied = self._record_copy(journal, manifest, index, dst_dir, track_copy)
+
+            with self.tracer.span("copy"):
+                for root_entry in index.top_level(include_excluded=False):
+                    logger.info(f"Copying '{root_entry.relpath}'")
+                    try:
+                        with self.tracer.span(root_entry.relpath) as span:
+                            self.copier.copy_tree(
+                                index,
+                                dst_dir,
+                                [root_entry.relpath],
+                                span.counting(on_copied),
+                                skip=lambda e: e.relpath in done,
+                            )
+                    # handle permission errors
+                    except CopyError as e:  # pragma: no cover
+                        raise InstallError(f"Error: Cannot write '{e.relpath}' in {dst_dir}: {e.reason}") from e
+                    except VerificationError as e:
+                        raise self._corrupted_file_error(e, dst_dir) from e
+            manifest.retain(entry.relpath for entry in index.iter_files(include_excluded=False))
+            manifest.save(manifest_path)
+            journal.discard()
+        logger.info("File copy completed.")
+        logger.info(f"Copy methods: {self.copier.format_strategies()}.")
+
+    def _copy_changed_files(self, index: TreeIndex, dst_dir: Path, progress_range: Tuple[float, float]) -> None:
+        """
+        Copy only the program files that differ from the installed ones,
+        using the manifest of the installed tree to avoid hashing unchanged files again.
+        When the files are copied in the staging directory, the unchanged files are hard-linked there.
+        """
+        manifest_path = self.target_dir.joinpath(MANIFEST_PATH)
+        manifest = Manifest.load(manifest_path)
+
+        with self._start_journal(dst_dir, fresh=False) as journal:
+            # the files copied by an interrupted installation are neither compared nor copied again
+            done = self._find_copied_files(journal, index.iter_files(include_excluded=False), dst_dir, manifest)
+
+            logger.info("Comparing program files with the installed ones...")
+            with self.tracer.span("compare"):
+                plan = plan_copy(index, self.target_dir, manifest, skip=lambda e: e.relpath in done)
+            logger.info(
+                f"{len(plan.changed)} file(s) added or changed ({format_size(plan.bytes_to_copy)}),"
+                f" {len(plan.unchanged)} file(s) unchanged."
+            )
+            self.check_disk_space(dst_dir, plan.bytes_to_copy)
+
+            if dst_dir != self.target_dir:
+                with self.tracer.span("link", files=len(plan.unchanged)):
+                    self._link_unchanged_files(plan.unchanged, dst_dir)
 
-        initial_value = self.progress
+            track_copy = self._track_copy(plan.bytes_to_copy, progress_range)
+            on_copied = self._record_copy(journal, manifest, index, dst_dir, track_copy)
 
-        for index, elt_path in enumerate(dirs_to_copy):
-            logger.info(f"Copying '{elt_path}'")
+            with self.tracer.span("deltas") as span:
+                to_copy = self._apply_deltas(plan.changed, dst_dir, manifest, span.counting(on_copied))
             try:
-                if elt_path.is_file():
-                    copy2(elt_path, self.target_dir)
-                else:
-                    # copy new directory
-                    copytree(elt_path, self.target_dir.joinpath(elt_path.name), dirs_exist_ok=True)
+                self._copy_files_by_entry(dst_dir, to_copy, on_copied)
             # handle permission errors
-            except PermissionError as e:  # pragma: no cover
-                relpath = elt_path.relative_to(self.source_dir).as_posix()
-                raise InstallError(f"Error: Cannot write '{relpath}' in {self.target_dir}: {e}")
+            except CopyError as e:  # pragma: no cover
+                raise InstallError(f"Error: Cannot write '{e.relpath}' in {dst_dir}: {e.reason}") from e
+            except VerificationError as e:
+                raise self._corrupted_file_error(e, dst_dir) from e
 
-            self.update_progress(initial_value + (index + 1) * 100 / src_dir_content_length)
+            manifest.retain([*plan.changed, *plan.unchanged, *done])
+            manifest.save(manifest_path)
+            journal.discard()
         logger.info("File copy completed.")
+        logger.info(f"Copy methods: {self.copier.format_strategies()}.")
 
-    def check_version(self) -> str:
+    def _copy_files_by_entry(self, dst_dir: Path, relpaths: List[str], callback: CopyCallback) -> None:
+        """
+        Copy source files in `dst_dir`, one top-level entry after the other, so that the copy of each entry is traced.
         """
-        Execute command to get the current version of the server.
+        relpaths_by_entry: Dict[str, List[str]] = {}
+        for relpath in relpaths:
+            relpaths_by_entry.setdefault(relpath.split("/", 1)[0], []).append(relpath)
+        with self.tracer.span("copy"):
+            for entry, entry_relpaths in relpaths_by_entry.items():
+                with self.tracer.span(entry) as span:
+                    self.copier.copy_files(self.source_dir, dst_dir, entry_relpaths, span.counting(callback))
+
+    def _apply_deltas(
+        self,
+        relpaths: List[str],
+        dst_dir: Path,
+        manifest: Manifest,
+        callback: CopyCallback,
+    ) -> List[str]:
         """
-        # check user's os
-        args = [str(self.server_path), "--version"]
+        Patch the changed files for which the source bundle ships a delta against the installed version.
+        The patches are applied in parallel, and a file is copied in full if its installed version
+        is not the base of the patch or if the patch fails.
 
+        @param relpaths: POSIX paths of the changed files.
+        @param dst_dir: either the target directory or the staging directory.
+        @param manifest: manifest of the installed tree, used to check the base of the patches.
+        @param callback: function called with the relative path and the size of each patched file.
+        @return: the files which must be copied in full.
+        """
+        if self.old_version is None:
+            return relpaths
         try:
-            logger.info("Attempt to get version of Antares server...")
-            version = subprocess.check_output(args, text=True, stderr=subprocess.PIPE, timeout=30).strip()
-        except FileNotFoundError as e:
-            raise InstallError(f"Can't check version: {e}") from e
-        except subprocess.CalledProcessError as e:
-            reason = textwrap.indent(e.stderr, "  | ", predicate=lambda line: True)
-            raise InstallError(f"Can't check version:\n{reason}") from e
-        except subprocess.TimeoutExpired as e:
-            raise InstallError(f"Impossible to check previous version: {e}") from e
+            package = DeltaPackage.find(self.source_dir, self.old_version)
+        except DeltaError as e:
+            logger.warning(f"{e}: the changed files are copied in full.")
+            return relpaths
+        if package is None:
+            logger.info(f"No delta package for version {self.old_version}.")
+            return relpaths
 
-        # ensure the version number is in the form 'x.x' or 'x.x.x'
-        matched_value = re.match(r"^(\d(.\d)+)+", version)
+        store = self.copier.blob_store
+        to_copy, to_patch = [], []
+        for relpath in relpaths:
+            entry = package.entries.get(relpath)
+            base_path = self.target_dir.joinpath(relpath)
+            if entry is None or not base_path.is_file() or manifest.digest(relpath, base_path) != entry.base_digest:
+                to_copy.append(relpath)
+            elif store is not None and store.contains(entry.target_digest, store.is_executable(base_path)):
+                # the new file is already stored by another installation: linking it is cheaper than patching
+                to_copy.append(relpath)
+            else:
+                to_patch.append(entry)
+        logger.info(f"Applying the delta package of version {self.old_version} to {len(to_patch)} file(s)...")
 
-        if not matched_value:
-            raise InstallError("No version found.")
+        def patch(entry: DeltaEntry) -> int:
+            dst_path = dst_dir.joinpath(entry.relpath)
+            dst_path.parent.mkdir(parents=True, exist_ok=True)
+            written_bytes = package.apply(entry, self.target_dir.joinpath(entry.relpath), dst_path)
+            if store is not None:
+                store.adopt(dst_path, entry.target_digest)
+            return written_bytes
 
-        version = matched_value.group()
+        nb_patched, written_bytes = 0, 0
+        with ThreadPoolExecutor(max_workers=self.nb_workers) as executor:
+            futures = {executor.submit(patch, entry): entry for entry in to_patch}
+            for future in as_completed(futures):
+                entry = futures[future]
+                try:
+                    written_bytes += future.result()
+                    nb_patched += 1
+                except (DeltaError, OSError) as e:
+                    logger.warning(f"{e}: the file is copied in full.")
+                    to_copy.append(entry.relpath)
+                    continue
+                # the patched file was checked against its target digest: it is not hashed again
+                self.copier.digests[entry.relpath] = entry.target_digest
+                callback(entry.relpath, dst_dir.joinpath(entry.relpath).stat().st_size)
+        logger.info(f"{nb_patched} file(s) patched, {format_size(written_bytes)} written.")
+        return to_copy
+
+    def _link_unchanged_files(self, relpaths: List[str], dst_dir: Path) -> None:
+        """
+        Hard-link the unchanged installed files in `dst_dir`, or copy them if links are not supported.
+        """
+        to_copy = []
+        for relpath in relpaths:
+            dst_path = dst_dir.joinpath(relpath)
+            dst_path.parent.mkdir(parents=True, exist_ok=True)
+            installed_path = self.target_dir.joinpath(relpath)
+            try:
+                # the file may already be staged by an interrupted installation
+                if dst_path.exists():
+                    if os.path.samefile(installed_path, dst_path):
+                        continue
+                    dst_path.unlink()
+                os.link(installed_path, dst_path)
+            except OSError:
+                to_copy.append(relpath)
+        if to_copy:
+            logger.info(f"{len(to_copy)} unchanged file(s) can't be linked and are copied.")
+            try:
+                self.copier.copy_files(self.target_dir, dst_dir, to_copy)
+            except CopyError as e:
+                raise InstallError(f"Error: Cannot write '{e.relpath}' in {dst_dir}: {e.reason}") from e
+            except VerificationError as e:
+                raise self._corrupted_file_error(e, dst_dir) from e
+
+    def check_version(self) -> str:
+        """
+        Get the version of the installed server, from the version file of the installation if any,
+        else by executing the server, unless its version is already known.
+        """
+        try:
+            logger.info("Attempt to get version of Antares server...")
+            with self.tracer.span("version"):
+                version = self._versions.resolve(self.target_dir, self.server_path, copy_of=self._source_server_path())
+        except VersionError as e:
+            raise InstallError(str(e)) from e
 
         logger.info("Version found.")
         return version
 
+    def _source_server_path(self) -> Optional[Path]:
+        """
+        Path of the server executable of the bundle, which the installed one may be a copy of.
+        """
+        if self.source_is_archive:
+            return None
+        return self.source_dir / "AntaresWeb" / SERVER_NAMES[os.name]
+
+    def probe_new_version(self) -> None:
+        """
+        Find the version of the server of the bundle while the other steps are running,
+        so that it is known once the server is installed.
+        """
+        source_server_path = self._source_server_path()
+        if source_server_path is None or not source_server_path.is_file():
+            return
+        if read_version_file(self.source_dir) is not None:
+            return
+        try:
+            version = self._versions.probe(source_server_path)
+        except VersionError as e:
+            # the version is checked again once the server is installed
+            logger.debug(f"Cannot probe the version of '{source_server_path}': {e}")
+        else:
+            logger.debug(f"Version of the bundle: {version}.")
+
+    def _remove_stale_version_file(self) -> None:
+        """
+        Remove the version file of the previous installation if the bundle doesn't ship one.
+        """
+        if self.source_is_archive:
+            shipped = self.get_archive().get_member(VERSION_FILE) is not None
+        else:
+            shipped = self.source_dir.joinpath(VERSION_FILE).is_file()
+        if not shipped:
+            self.target_dir.joinpath(VERSION_FILE).unlink(missing_ok=True)
+
     def create_shortcuts(self):
         """
         Create a local server icon and a browser icon on desktop and
@@ -290,34 +1156,113 @@ class App:
         logger.info(f"Attempt to start the newly installed server located in '{self.target_dir}'...")
         logger.debug(f"User permissions: {os.path.exists(self.server_path) and os.access(self.server_path, os.X_OK)}")
 
-        args = [self.server_path]
-        server_process = subprocess.Popen(
-            args=args,
-            cwd=self.target_dir,
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
-            shell=True,
-        )
+        host, port = self.server_address
+        if not is_port_free(host, port) and self._check_port_holder(port):
+            logger.info(f"The server is already running on port {port}.")
+            self.update_progress(100)
+            return
+
+        # the output of the server is kept in a log file, and watched to detect its readiness or its failure
+        output_path = self.target_dir.joinpath(SERVER_OUTPUT_PATH)
+        try:
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            with output_path.open(mode="wb") as output:
+                server_process = subprocess.Popen(
+                    args=[str(self.server_path)],
+                    cwd=self.target_dir,
+                    stdin=subprocess.DEVNULL,
+                    stdout=output,
+                    stderr=subprocess.STDOUT,
+                )
+        except OSError as e:
+            # e.g. the server is missing or isn't executable
+            raise InstallError(f"Cannot start the server: {e}") from e
         self.update_progress(50)
 
-        start_time = time.time()
-        nb_attempts = 1
-        while time.time() - start_time < MAX_SERVER_START_TIME:
-            logger.info(f"Waiting for server start (attempt #{nb_attempts})...")
-            if server_process.poll() is not None:
-                raise InstallError("Server failed to start, please check server logs.")
+        prober = ReadinessProber(f"{self.server_url}{HEALTHCHECK_PATH}", timeout=self.server_start_timeout)
+        logger.info("Waiting for server start...")
+
+        def on_failure(nb_probes: int, reason: str) -> None:
+            logger.debug(f"Server not ready (probe #{nb_probes}): {reason}")
+
+        def on_probe(nb_probes: int, elapsed: float, reason: Optional[str]) -> None:
+            self.tracer.add_span("probe", elapsed, probe=nb_probes, ready=reason is None, reason=reason)
+
+        with OutputMonitor(output_path) as monitor:
             try:
-                res = requests.get(HEALTHCHECK_ADDRESS)
-                if res.status_code == 200:
-                    logger.info("The server is now running.")
-                    break
-                else:
-                    logger.debug(f"Got HTTP status code {res.status_code} while requesting {HEALTHCHECK_ADDRESS}")
-                    logger.debug(f"Content: {res.text}")
-            except requests.RequestException as req_err:
-                logger.debug(f"Error while requesting {HEALTHCHECK_ADDRESS}: {req_err}", exc_info=req_err)
-            time.sleep(1)
-            nb_attempts += 1
-        else:
-            raise InstallError("Server didn't start in time, please check server logs.")
+                result = prober.wait(
+                    is_alive=lambda: server_process.poll() is None and monitor.fatal_line is None,
+                    on_failure=on_failure,
+                    wakeup=monitor.event,
+                    on_probe=on_probe,
+                )
+            except ReadinessError as e:
+                error: Optional[ReadinessError] = e
+                # give the server a moment to write the end of its error message
+                with contextlib.suppress(subprocess.TimeoutExpired):
+                    server_process.wait(timeout=1)
+            else:
+                error = None
+        if error is not None:
+            raise self._server_start_error(error, server_process, monitor) from error
+
+        logger.info(f"The server is now running (ready in {result.elapsed:.2f} s, {result.nb_probes} probe(s)).")
+        self._record_server(server_process.pid)
         self.update_progress(100)
+
+    def _check_port_holder(self, port: int) -> bool:
+        """
+        Identify the process listening to the port of the server, which can only be the server of the installation.
+
+        @param port: port of the server, which is in use.
+        @return: `True` if the server of the installation is listening to the port.
+        @raise InstallError: if another process is listening to the port.
+        """
+        holder = find_port_holder(port)
+        if holder is None:
+            description = "another process"
+        elif ServerFinder(self.server_path, self.target_dir).matches(holder):
+            return True
+        else:
+            exe = holder.exe or holder.name or "unknown executable"
+            description = f"the process {holder.pid} ('{exe}')"
+        config_path = self.target_dir.joinpath("config.yaml")
+        raise InstallError(
+            f"Cannot start the server: the port {port} is already in use by {description}."
+            f" Please stop it, or change the port in the 'server' section of '{config_path}'."
+        )
+
+    def _server_start_error(
+        self,
+        error: ReadinessError,
+        server_process: subprocess.Popen,
+        monitor: OutputMonitor,
+    ) -> InstallError:
+        """
+        Describe a server startup failure with the last lines of the server output.
+        """
+        if isinstance(error, ReadinessTimeout):
+            message = "Server didn't start in time"
+        else:
+            message = "Server failed to start"
+        if monitor.fatal_line is not None:
+            message += f": {monitor.fatal_line}"
+            # the server is not usable, but it may still be running
+            with contextlib.suppress(psutil.NoSuchProcess):
+                stop_processes([psutil.Process(server_process.pid)], timeout=self.stop_timeout)
+        output = textwrap.indent("\n".join(monitor.tail()), "  ")
+        return InstallError(f"{message}, please check server logs. Last lines of '{monitor.path}':\n{output}")
+
+    def _record_server(self, pid: int) -> None:
+        """
+        Record the launched server in the lock file, so that it is found without scanning all the processes.
+        """
+        lock_path = self.target_dir.joinpath(SERVER_LOCK_PATH)
+        try:
+            finder = ServerFinder(self.server_path, self.target_dir)
+            lock = finder.record(psutil.Process(pid), self.server_port, lock_path)
+        except (psutil.Error, OSError) as e:
+            logger.warning(f"Cannot record the server in '{lock_path}': {e}")
+            return
+        if lock is not None:
+            logger.debug(f"Server recorded in '{lock_path}': process id: {lock.pid}")
@@ -0,0 +1,223 @@
+"""
+Module to install Antares Web directly from a release archive (`.zip`, `.tar.gz`, `.tar.xz`...).
+
+The archive members are extracted one by one, straight into the target directory,
+so that the bundle doesn't need to be extracted in a temporary directory first.
+If all the members are located in a single top-level directory (e.g. "AntaresWeb-2.19.0/"),
+this directory is considered as the root of the bundle.
+"""
+
+import dataclasses
+import datetime
+import os
+import posixpath
+import shutil
+import tarfile
+import typing as t
+import zipfile
+from pathlib import Path, PurePosixPath
+
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.xz", ".txz", ".tar.bz2", ".tbz2")
+
+BUFFER_SIZE = 1024 * 1024
+"""Size of the buffer used to extract the files."""
+
+ExtractCallback = t.Callable[[str, int], None]
+"""Function called with the relative path and the size of each extracted file."""
+
+
+class ArchiveError(Exception):
+    """
+    Exception raised when an archive can't be read or contains unsafe members.
+    """
+
+
+def is_archive(path: Path) -> bool:
+    """
+    Check whether a source path is an archive file rather than an extracted bundle.
+    """
+    return path.is_file() and path.name.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+@dataclasses.dataclass(frozen=True)
+class ArchiveMember:
+    """
+    File, directory or link of the archive.
+
+    Attributes:
+        name: name of the member in the archive.
+        relpath: POSIX path of the member relative to the root of the bundle.
+        kind: one of "file", "dir", "symlink" or "hardlink".
+        size: size of the file in bytes.
+        mode: permission bits, or 0 if unknown.
+        mtime: modification time in seconds since the epoch.
+        linkname: target of the link, for symbolic and hard links.
+    """
+
+    name: str
+    relpath: str
+    kind: str
+    size: int = 0
+    mode: int = 0
+    mtime: float = 0
+    linkname: str = ""
+
+    @property
+    def root(self) -> Path:
+        """First component of the path, used to apply the exclusion rules."""
+        return Path(PurePosixPath(self.relpath).parts[0])
+
+
+def _check_relpath(name: str) -> str:
+    path = PurePosixPath(name.replace("\\", "/"))
+    if path.is_absolute() or ".." in path.parts or (path.parts and ":" in path.parts[0]):
+        raise ArchiveError(f"Unsafe path in archive: '{name}'")
+    return path.as_posix()
+
+
+class BundleArchive:
+    """
+    Archive of an Antares Web bundle.
+
+    The members are listed when the archive is opened, so that the total size to extract is known
+    before the extraction starts.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._zip: t.Optional[zipfile.ZipFile] = None
+        self._tar: t.Optional[tarfile.TarFile] = None
+        self._tar_infos: t.Dict[str, tarfile.TarInfo] = {}
+        try:
+            if zipfile.is_zipfile(path):
+                self._zip = zipfile.ZipFile(path)
+                members = [self._zip_member(info) for info in self._zip.infolist()]
+            else:
+                self._tar = tarfile.open(path, mode="r:*")
+                self._tar_infos = {info.name: info for info in self._tar.getmembers()}
+                members = [self._tar_member(info) for info in self._tar_infos.values()]
+        except (OSError, zipfile.BadZipFile, tarfile.TarError) as e:
+            self.close()
+            raise ArchiveError(f"Cannot read archive '{path}': {e}") from e
+        self.members = self._strip_root([member for member in members if member is not None])
+
+    def __enter__(self) -> "BundleArchive":
+        return self
+
+    def __exit__(self, *args: t.Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._zip is not None:
+            self._zip.close()
+        if self._tar is not None:
+            self._tar.close()
+
+    @staticmethod
+    def _zip_member(info: zipfile.ZipInfo) -> t.Optional[ArchiveMember]:
+        kind = "dir" if info.is_dir() else "file"
+        relpath = _check_relpath(info.filename.rstrip("/"))
+        mode = (info.external_attr >> 16) & 0o7777
+        mtime = datetime.datetime(*info.date_time).timestamp()
+        return ArchiveMember(info.filename, relpath, kind, info.file_size, mode, mtime)
+
+    @staticmethod
+    def _tar_member(info: tarfile.TarInfo) -> t.Optional[ArchiveMember]:
+        if info.isdir():
+            kind = "dir"
+        elif info.isreg():
+            kind = "file"
+        elif info.issym():
+            kind = "symlink"
+        elif info.islnk():
+            kind = "hardlink"
+        else:
+            # devices and FIFOs are not part of a bundle
+            return None
+        relpath = _check_relpath(info.name)
+        return ArchiveMember(info.name, relpath, kind, info.size, info.mode, info.mtime, info.linkname)
+
+    @staticmethod
+    def _strip_root(members: t.List[ArchiveMember]) -> t.List[ArchiveMember]:
+        members = [member for member in members if member.relpath not in {"", "."}]
+        roots = {PurePosixPath(member.relpath).parts[0] for member in members}
+        if len(roots) != 1:
+            return members
+        root = roots.pop()
+        if any(member.relpath == root and member.kind != "dir" for member in members):
+            return members
+        prefix = f"{root}/"
+        return [
+            dataclasses.replace(member, relpath=member.relpath[len(prefix) :])
+            for member in members
+            if member.relpath.startswith(prefix)
+        ]
+
+    def _open(self, member: ArchiveMember) -> t.IO[bytes]:
+        if self._zip is not None:
+            return self._zip.open(member.name)
+        assert self._tar is not None
+        stream = self._tar.extractfile(self._tar_infos[member.name])
+        if stream is None:  # pragma: no cover
+            raise ArchiveError(f"Cannot read member '{member.name}' of archive '{self.path}'")
+        return stream
+
+    def get_member(self, relpath: str) -> t.Optional[ArchiveMember]:
+        """Return the member with the given path relative to the root of the bundle, if any."""
+        return next((member for member in self.members if member.relpath == relpath), None)
+
+    def extract(
+        self,
+        target_dir: Path,
+        members: t.Optional[t.Iterable[ArchiveMember]] = None,
+        callback: t.Optional[ExtractCallback] = None,
+    ) -> None:
+        """
+        Extract members in the target directory, overriding the existing files.
+
+        :param target_dir: target directory, created if it doesn't exist.
+        :param members: members to extract, by default all the members, in the order of the archive.
+        :param callback: function called with the relative path and the size of each extracted file.
+        :raise ArchiveError: if a member can't be read or is unsafe.
+        :raise OSError: if a file can't be written.
+        """
+        target_dir.mkdir(parents=True, exist_ok=True)
+        by_name = {member.name: member for member in self.members}
+        directories = []
+        for member in self.members if members is None else members:
+            dst_path = target_dir.joinpath(member.relpath)
+            if member.kind == "dir":
+                dst_path.mkdir(parents=True, exist_ok=True)
+                directories.append((member, dst_path))
+                continue
+            dst_path.parent.mkdir(parents=True, exist_ok=True)
+            # the existing files are replaced rather than rewritten, so that their other hard links are preserved
+            if dst_path.is_symlink() or dst_path.is_file():
+                dst_path.unlink()
+            if member.kind == "symlink":
+                link_path = posixpath.normpath(posixpath.join(posixpath.dirname(member.relpath), member.linkname))
+                if posixpath.isabs(member.linkname) or link_path.startswith(".."):
+                    raise ArchiveError(f"Unsafe link in archive: '{member.name}' -> '{member.linkname}'")
+                os.symlink(member.linkname, dst_path)
+                continue
+            if member.kind == "hardlink":
+                linked = by_name.get(member.linkname)
+                if linked is None:
+                    raise ArchiveError(f"Unsafe link in archive: '{member.name}' -> '{member.linkname}'")
+                shutil.copy2(target_dir.joinpath(linked.relpath), dst_path)
+            else:
+                with self._open(member) as src, dst_path.open(mode="wb") as dst:
+                    shutil.copyfileobj(src, dst, BUFFER_SIZE)
+                self._set_metadata(member, dst_path)
+            if callback is not None:
+                callback(member.relpath, member.size)
+        # set the directory metadata once their content is written
+        for member, dst_path in reversed(directories):
+            self._set_metadata(member, dst_path)
+
+    @staticmethod
+    def _set_metadata(member: ArchiveMember, dst_path: Path) -> None:
+        if member.mode:
+            os.chmod(dst_path, member.mode & 0o777)
+        if member.mtime:
+            os.utime(dst_path, (member.mtime, member.mtime))
@@ -0,0 +1,173 @@
+"""
+Module to share the program files of several installations through a content-addressed store.
+
+Each program file is stored once per machine in the blob store, named after the digest of its content,
+and the installations hard-link their program files to the stored blobs. Installing a version which
+shares most of its files with an already installed one only writes the files which are not stored yet.
+
+A blob is never modified: the installer always replaces the installed files instead of rewriting them,
+and the server never writes its program files. A blob which is only linked by the store itself
+(its link count is 1) is not used by any installation anymore, and can be removed.
+The store must be on the same file system as the installation directories.
+"""
+
+import os
+import stat
+import time
+import typing as t
+import uuid
+from pathlib import Path
+
+from antares_web_installer.fastcopy import CopyResult, CopyStrategy, FileCopier
+from antares_web_installer.manifest import HASH_ALGORITHM, hash_file
+
+EXECUTABLE_SUFFIX = ".x"
+"""Suffix of the executable blobs: the permissions are shared by all the links of a blob."""
+
+MIN_UNUSED_AGE = 3600
+"""Age in seconds of an unused blob before it can be removed, so that a concurrent installation can link it."""
+
+
+class BlobStoreError(Exception):
+    """
+    Exception raised when the blob store can't be used for an installation directory.
+    """
+
+
+class BlobStore:
+    """
+    Content-addressed store of program files, shared by the installations of a machine.
+
+    This class is thread-safe: the same instance can be shared by all the copy workers.
+    """
+
+    def __init__(self, root_dir: Path):
+        self.root_dir = root_dir
+        self._file_copier = FileCopier()
+
+    @property
+    def blobs_dir(self) -> Path:
+        return self.root_dir.joinpath(HASH_ALGORITHM)
+
+    def blob_path(self, digest: str, executable: bool = False) -> Path:
+        """Path of the blob storing a content with the given digest."""
+        name = digest + EXECUTABLE_SUFFIX if executable else digest
+        return self.blobs_dir.joinpath(digest[:2], name)
+
+    def check_target(self, target_dir: Path) -> None:
+        """
+        Check that the installation directory can be linked to the store.
+
+        :raise BlobStoreError: if the store is not on the same file system as `target_dir`.
+        """
+        self.blobs_dir.mkdir(parents=True, exist_ok=True)
+        existing_dir = next(path for path in (target_dir, *target_dir.parents) if path.exists())
+        if os.stat(existing_dir).st_dev != os.stat(self.blobs_dir).st_dev:
+            raise BlobStoreError(f"The blob store '{self.root_dir}' is not on the same file system as '{target_dir}'")
+
+    def install(self, src_path: Path, dst_path: Path, digest: t.Optional[str] = None) -> CopyResult:
+        """
+        Install a file by linking it to the blob with the same content, storing the blob first if needed.
+
+        :param src_path: path of the source file.
+        :param dst_path: path of the installed file, replaced if it exists.
+        :param digest: expected digest of the source file, if known; the source is hashed otherwise.
+        :return: `HARDLINK` if the blob was already stored, or the method used to copy the file in the store;
+            the size of the file and the digest of the stored content (which can differ from the expected one
+            if the source file is corrupted).
+        :raise OSError: if the file can't be read, stored or linked.
+        """
+        src_stat = os.stat(src_path)
+        executable = bool(src_stat.st_mode & stat.S_IXUSR)
+        if digest is None:
+            digest = hash_file(src_path)
+        blob_path = self.blob_path(digest, executable)
+        if blob_path.exists():
+            result = CopyResult(CopyStrategy.HARDLINK, src_stat.st_size, digest)
+        else:
+            result = self._store(src_path, executable)
+            blob_path = self.blob_path(result.digest, executable)  # type: ignore[arg-type]
+        # the installed file is replaced rather than rewritten, so that its other hard links are preserved
+        dst_path.unlink(missing_ok=True)
+        try:
+            os.link(blob_path, dst_path)
+        except FileNotFoundError:
+            if result.strategy != CopyStrategy.HARDLINK:
+                raise
+            # the unused blob was removed by a concurrent installation in the meantime
+            result = self._store(src_path, executable)
+            os.link(self.blob_path(result.digest, executable), dst_path)  # type: ignore[arg-type]
+        return result
+
+    @staticmethod
+    def is_executable(path: Path) -> bool:
+        return bool(os.stat(path).st_mode & stat.S_IXUSR)
+
+    def contains(self, digest: str, executable: bool = False) -> bool:
+        return self.blob_path(digest, executable).exists()
+
+    def adopt(self, path: Path, digest: str) -> None:
+        """
+        Share an installed file which was not installed from the store (e.g. a patched file),
+        by linking it into the store, or by replacing it with a link to the identical stored blob.
+
+        :param path: path of the installed file.
+        :param digest: digest of the file content.
+        :raise OSError: if the file can't be linked.
+        """
+        executable = self.is_executable(path)
+        blob_path = self.blob_path(digest, executable)
+        blob_path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.link(path, blob_path)
+        except FileExistsError:
+            tmp_path = path.with_name(f"~{path.name}.tmp")
+            tmp_path.unlink(missing_ok=True)
+            os.link(blob_path, tmp_path)
+            os.replace(tmp_path, path)
+
+    def _store(self, src_path: Path, executable: bool) -> CopyResult:
+        # the blob is named after the data actually copied, and only appears once it is complete
+        self.blobs_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.blobs_dir.joinpath(f"~{uuid.uuid4().hex}.tmp")
+        try:
+            result = self._file_copier.copy_file(src_path, tmp_path, HASH_ALGORITHM)
+            blob_path = self.blob_path(result.digest, executable)  # type: ignore[arg-type]
+            blob_path.parent.mkdir(exist_ok=True)
+            # a concurrent installation may have stored the same blob in the meantime: both are identical
+            os.replace(tmp_path, blob_path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        return result
+
+    def prune(self, min_age: float = MIN_UNUSED_AGE) -> t.Tuple[int, int]:
+        """
+        Remove the blobs which are not linked by any installation anymore, and the leftovers of interrupted copies.
+
+        :param min_age: minimum time in seconds since the last change of a blob or a leftover before it is removed.
+        :return: the number of removed blobs and the number of bytes freed.
+        """
+        if not self.blobs_dir.is_dir():
+            return 0, 0
+        deadline = time.time() - min_age
+        nb_removed, freed_bytes = 0, 0
+        for dir_entry in os.scandir(self.blobs_dir):
+            if dir_entry.is_file() and dir_entry.name.endswith(".tmp"):
+                paths = [dir_entry]
+            elif dir_entry.is_dir():
+                paths = list(os.scandir(dir_entry.path))
+            else:
+                continue
+            for blob_entry in paths:
+                blob_stat = blob_entry.stat()
+                # the change time is updated each time a link is added or removed
+                if blob_stat.st_nlink > 1 or blob_stat.st_ctime > deadline:
+                    continue
+                try:
+                    os.unlink(blob_entry.path)
+                except FileNotFoundError:
+                    continue
+                nb_removed += 1
+                freed_bytes += blob_stat.st_size
+        return nb_removed, freed_bytes
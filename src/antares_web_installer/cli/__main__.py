@@ -4,11 +4,17 @@ Main entrypoint for the CLI application.
 
 import sys
 
-from antares_web_installer.cli.cli import install_cli
+from antares_web_installer import add_console_handler
+from antares_web_installer.cli.cli import install_cli, rollback_cli
 
 
 def main():
-    install_cli(sys.argv[1:])
+    add_console_handler()
+    args = sys.argv[1:]
+    if args[:1] == ["rollback"]:
+        rollback_cli(args[1:])
+    else:
+        install_cli(args)
 
 
 if __name__ == "__main__":
@@ -4,8 +4,18 @@ from pathlib import Path
 
 import click
 
-from antares_web_installer import SRC_DIR, logger
-from antares_web_installer.app import App, InstallError
+from antares_web_installer import SRC_DIR, log_queue, logger
+from antares_web_installer.app import MAX_SERVER_START_TIME, SNAPSHOTS_PATH, TRACE_PATH, App, InstallError
+from antares_web_installer.copier import DEFAULT_NB_WORKERS
+from antares_web_installer.processes import DEFAULT_STOP_TIMEOUT
+from antares_web_installer.snapshot import DEFAULT_NB_SNAPSHOTS, SnapshotStore
+
+
+def _add_cli_logger() -> None:
+    cli_logger = logging.StreamHandler()
+    cli_logger.setLevel(logging.INFO)
+    cli_logger.setFormatter(logging.Formatter("[%(asctime)-15s] %(message)s"))
+    log_queue.add_handler(cli_logger)
 
 
 @click.command()
@@ -22,7 +32,7 @@ from antares_web_installer.app import App, InstallError
     default=SRC_DIR,
     show_default=True,
     type=click.Path(),
-    help="Where to find the Antares Web sources.",
+    help="Where to find the Antares Web sources: a directory or a .zip, .tar.gz or .tar.xz archive.",
 )
 @click.option(
     "--shortcut/--no-shortcut",
@@ -31,6 +41,74 @@ from antares_web_installer.app import App, InstallError
     help="Create a shortcut on desktop.",
 )
 @click.option("--launch/--no-launch", default=True, show_default=True, help="Launch Antares Web Server.")
+@click.option(
+    "--incremental/--no-incremental",
+    default=True,
+    show_default=True,
+    help="When updating, only copy the program files that were added or changed.",
+)
+@click.option(
+    "--staged/--no-staged",
+    default=False,
+    show_default=True,
+    help="When updating, prepare the new program files before stopping the running server, then switch them.",
+)
+@click.option(
+    "--resume/--no-resume",
+    default=True,
+    show_default=True,
+    help="Resume an interrupted installation, skipping the files that were already copied.",
+)
+@click.option(
+    "--verify/--no-verify",
+    default=True,
+    show_default=True,
+    help="Hash the files while they are copied and check them against the checksums shipped with the bundle.",
+)
+@click.option(
+    "--workers",
+    "nb_workers",
+    default=DEFAULT_NB_WORKERS,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="Number of threads used to copy the files.",
+)
+@click.option(
+    "--snapshots",
+    "nb_snapshots",
+    default=DEFAULT_NB_SNAPSHOTS,
+    show_default=True,
+    type=click.IntRange(min=0),
+    help="Number of pre-upgrade snapshots to keep for the 'rollback' command (0 disables the snapshots).",
+)
+@click.option(
+    "--blob-store",
+    type=click.Path(file_okay=False, path_type=Path),
+    help="Directory where the program files shared by several installations are stored once (same file system).",
+)
+@click.option(
+    "--stop-timeout",
+    default=DEFAULT_STOP_TIMEOUT,
+    show_default=True,
+    type=click.FloatRange(min=0),
+    help="Time in seconds given to the running server to stop before it is killed.",
+)
+@click.option(
+    "--server-start-timeout",
+    default=MAX_SERVER_START_TIME,
+    show_default=True,
+    type=click.FloatRange(min=0),
+    help="Maximum time in seconds to wait for the launched server to be ready.",
+)
+@click.option(
+    "--trace-out",
+    "trace_path",
+    type=click.Path(dir_okay=False, path_type=Path),
+    help=(
+        "JSON Lines file the duration of each installation phase is appended to"
+        f" [default: <TARGET_DIR>/{TRACE_PATH.as_posix()}]."
+    ),
+)
 def install_cli(src_dir: t.Union[str, Path], target_dir: t.Union[str, Path], **kwargs) -> None:
     """
     Install Antares Web Server sources.
@@ -39,11 +117,12 @@ def install_cli(src_dir: t.Union[str, Path], target_dir: t.Union[str, Path], **k
     """
     target_dir = Path(target_dir).expanduser().absolute()
     src_dir = Path(src_dir).expanduser().absolute()
+    if kwargs["blob_store"] is not None:
+        kwargs["blob_store"] = kwargs["blob_store"].expanduser().absolute()
+    if kwargs["trace_path"] is not None:
+        kwargs["trace_path"] = kwargs["trace_path"].expanduser().absolute()
 
-    cli_logger = logging.StreamHandler()
-    cli_logger.setLevel(logging.INFO)
-    cli_logger.setFormatter(logging.Formatter("[%(asctime)-15s] %(message)s"))
-    logger.addHandler(cli_logger)
+    _add_cli_logger()
 
     logger.info(f"Starting installation in directory: '{target_dir}'...")
     app = App(source_dir=src_dir, target_dir=target_dir, **kwargs)
@@ -54,7 +133,42 @@ def install_cli(src_dir: t.Union[str, Path], target_dir: t.Union[str, Path], **k
         logger.error(e)
         raise SystemExit(1)
     except KeyboardInterrupt:
-        logger.error("Installation interrupted.")
+        logger.error("Installation interrupted: run the installation again to resume it.")
+        raise SystemExit(1)
+
+    logger.info("Done.")
+
+
+@click.command()
+@click.option(
+    "-t",
+    "--target-dir",
+    required=True,
+    type=click.Path(exists=True, file_okay=False),
+    help="Location of the Antares Web Server installation to roll back.",
+)
+@click.option("--snapshot", "name", help="Name of the snapshot to restore, by default the latest one.")
+@click.option("--list", "list_only", is_flag=True, help="List the available snapshots and exit.")
+def rollback_cli(target_dir: t.Union[str, Path], name: t.Optional[str], list_only: bool) -> None:
+    """
+    Restore the Antares Web Server installation as it was before an upgrade,
+    including its configuration and user data.
+    """
+    target_dir = Path(target_dir).expanduser().absolute()
+
+    if list_only:
+        for snapshot in SnapshotStore(target_dir.joinpath(SNAPSHOTS_PATH)).list():
+            click.echo(str(snapshot))
+        return
+
+    _add_cli_logger()
+
+    logger.info(f"Starting rollback in directory: '{target_dir}'...")
+    app = App(source_dir=SRC_DIR, target_dir=target_dir, shortcut=False, launch=False)
+    try:
+        app.rollback(name)
+    except InstallError as e:
+        logger.error(e)
         raise SystemExit(1)
 
     logger.info("Done.")
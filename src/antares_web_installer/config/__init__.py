@@ -2,6 +2,8 @@
 Module to update configuration files
 """
 
+import os
+import typing as t
 from pathlib import Path
 
 import yaml
@@ -9,6 +11,9 @@ import yaml
 from antares_web_installer.config.config_2_19 import update_to_2_19
 from antares_web_installer.config.config_desktop import update_for_desktop
 
+DEFAULT_SERVER_HOST = "127.0.0.1"
+DEFAULT_SERVER_PORT = 8080
+
 
 def update_config(source_path: Path, target_config_path: Path, version: str) -> None:
     """
@@ -28,5 +33,31 @@ def update_config(source_path: Path, target_config_path: Path, version: str) ->
 
     update_for_desktop(config)
 
-    with target_config_path.open(mode="w") as f:
+    # the file is replaced rather than rewritten, so that its other hard links (snapshots) are preserved
+    tmp_path = target_config_path.with_name(f"~{target_config_path.name}.tmp")
+    with tmp_path.open(mode="w") as f:
         yaml.dump(config, f)
+    os.replace(tmp_path, target_config_path)
+
+
+def read_server_address(config_path: Path) -> t.Tuple[str, int]:
+    """
+    Read the address the server listens to, from the `host` and `port` entries of the `server` section.
+
+    :param config_path: configuration file.
+    :return: the host and the port, the default ones if they are not configured or if the file can't be read.
+    """
+    try:
+        with config_path.open(mode="r") as f:
+            config = yaml.safe_load(f)
+    except (OSError, yaml.YAMLError):
+        config = None
+    server = config.get("server") if isinstance(config, dict) else None
+    if not isinstance(server, dict):
+        server = {}
+    host = server.get("host") or DEFAULT_SERVER_HOST
+    try:
+        port = int(server.get("port") or DEFAULT_SERVER_PORT)
+    except (TypeError, ValueError):
+        port = DEFAULT_SERVER_PORT
+    return str(host), port
@@ -0,0 +1,218 @@
+"""
+Module to copy the program files using a bounded pool of worker threads.
+
+The directories of the source tree index are created on the calling thread, in order (parents before children),
+before their files are handed over to the workers.
+Copying many small files is dominated by the latency of the system calls, which threads can overlap.
+"""
+
+import collections
+import dataclasses
+import os
+import shutil
+import typing as t
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from pathlib import Path
+
+from antares_web_installer.blobstore import BlobStore
+from antares_web_installer.fastcopy import CopyResult, CopyStrategy, FileCopier
+from antares_web_installer.scanner import ScanEntry, TreeIndex
+
+DEFAULT_NB_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+"""Default number of worker threads (same default as the `ThreadPoolExecutor`)."""
+
+CopyCallback = t.Callable[[str, int], None]
+"""Function called on the calling thread with the relative path and the size of each copied file."""
+
+
+class CopyError(Exception):
+    """
+    Exception raised when a file or a directory can't be copied.
+
+    Attributes:
+        relpath: POSIX path of the file relative to the source directory.
+        reason: the original error.
+    """
+
+    def __init__(self, relpath: str, reason: OSError):
+        super().__init__(f"Cannot copy '{relpath}': {reason}")
+        self.relpath = relpath
+        self.reason = reason
+
+
+class VerificationError(Exception):
+    """
+    Exception raised when the digest of a copied file doesn't match the checksum of the bundle.
+
+    Attributes:
+        relpath: POSIX path of the file relative to the source directory.
+        expected: digest given by the checksum manifest of the bundle.
+        actual: digest of the data copied.
+    """
+
+    def __init__(self, relpath: str, expected: str, actual: str):
+        super().__init__(f"Checksum mismatch for '{relpath}': expected {expected}, got {actual}")
+        self.relpath = relpath
+        self.expected = expected
+        self.actual = actual
+
+
+def _ignore(_relpath: str, _size: int) -> None:
+    pass
+
+
+@dataclasses.dataclass
+class Copier:
+    """
+    Copy engine used to install the program files.
+
+    Attributes:
+        nb_workers: maximum number of worker threads, `1` means that files are copied on the calling thread.
+        hash_algorithm: name of the algorithm used to hash the files while they are copied, if any.
+        checksums: expected digests of the source files, indexed by relative path, checked if the files are hashed.
+        blob_store: store shared by the installations, to which the program files are linked instead of copied.
+        strategies: number of files copied with each copy method.
+        digests: digests of the copied files, indexed by relative path, if the files are hashed.
+    """
+
+    nb_workers: int = DEFAULT_NB_WORKERS
+    hash_algorithm: t.Optional[str] = None
+    checksums: t.Mapping[str, str] = dataclasses.field(default_factory=dict)
+    blob_store: t.Optional[BlobStore] = None
+    strategies: t.Counter[CopyStrategy] = dataclasses.field(default_factory=collections.Counter, init=False)
+    digests: t.Dict[str, str] = dataclasses.field(default_factory=dict, init=False, repr=False)
+    file_copier: FileCopier = dataclasses.field(default_factory=FileCopier, init=False, repr=False)
+
+    def format_strategies(self) -> str:
+        """Describe the copy methods used so far, e.g. "reflink (120 files), buffered (2 files)"."""
+        counts = self.strategies.most_common()
+        return ", ".join(f"{strategy.value} ({count} files)" for strategy, count in counts) or "no file copied"
+
+    def copy_tree(
+        self,
+        index: TreeIndex,
+        target_dir: Path,
+        roots: t.Optional[t.Collection[str]] = None,
+        callback: CopyCallback = _ignore,
+        include_excluded: bool = True,
+        skip: t.Optional[t.Callable[[ScanEntry], bool]] = None,
+    ) -> None:
+        """
+        Copy a scanned directory tree, overriding the existing files.
+
+        :param index: index of the source directory.
+        :param target_dir: target directory, created if it doesn't exist.
+        :param roots: names of the top-level files and directories to copy, by default all of them.
+        :param callback: function called with the relative path and the size of each copied file.
+        :param include_excluded: whether to copy the excluded resources, which are never linked to the blob store.
+        :param skip: function telling whether a file must be skipped (e.g. because it is already copied).
+        :raise CopyError: if a file or a directory can't be copied.
+        """
+        self._make_dir(".", target_dir)
+        directories: t.List[str] = []
+
+        def iter_files() -> t.Iterator[str]:
+            for entry in index.iter_entries(include_excluded, roots):
+                if entry.is_dir:
+                    self._make_dir(entry.relpath, target_dir.joinpath(entry.relpath))
+                    directories.append(entry.relpath)
+                elif skip is None or not skip(entry):
+                    yield entry.relpath
+
+        def is_program_file(relpath: str) -> bool:
+            return not index.entries[relpath].excluded
+
+        self._copy_all(index.root, target_dir, iter_files(), callback, is_program_file)
+        # Like `shutil.copytree`, copy the directory metadata once their content is written
+        for relpath in reversed(directories):
+            shutil.copystat(index.root.joinpath(relpath), target_dir.joinpath(relpath))
+
+    def copy_files(
+        self,
+        source_dir: Path,
+        target_dir: Path,
+        relpaths: t.Iterable[str],
+        callback: CopyCallback = _ignore,
+        program_files: bool = True,
+    ) -> None:
+        """
+        Copy a selection of files, overriding the existing ones.
+
+        :param source_dir: source directory.
+        :param target_dir: target directory.
+        :param relpaths: POSIX paths of the files to copy, relative to `source_dir`.
+        :param callback: function called with the relative path and the size of each copied file.
+        :param program_files: whether the files are program files, which can be linked to the blob store.
+        :raise CopyError: if a file or a directory can't be copied.
+        """
+        relpaths = self._make_parents(target_dir, relpaths)
+        self._copy_all(source_dir, target_dir, relpaths, callback, lambda _: program_files)
+
+    @staticmethod
+    def _make_dir(relpath: str, dst_path: Path) -> None:
+        try:
+            dst_path.mkdir(parents=True, exist_ok=True)
+        except OSError as e:
+            raise CopyError(relpath, e) from e
+
+    def _make_parents(self, target_dir: Path, relpaths: t.Iterable[str]) -> t.Iterator[str]:
+        created: t.Set[str] = set()
+        for relpath in relpaths:
+            parent = relpath.rpartition("/")[0]
+            if parent and parent not in created:
+                self._make_dir(parent, target_dir.joinpath(parent))
+                created.add(parent)
+            yield relpath
+
+    def _copy_file(self, source_dir: Path, target_dir: Path, relpath: str, shared: bool) -> t.Tuple[str, CopyResult]:
+        src_path, dst_path = source_dir.joinpath(relpath), target_dir.joinpath(relpath)
+        try:
+            if shared and self.blob_store is not None:
+                # the expected digest, if known, tells whether the blob is stored without reading the source
+                return relpath, self.blob_store.install(src_path, dst_path, self.checksums.get(relpath))
+            return relpath, self.file_copier.copy_file(src_path, dst_path, self.hash_algorithm)
+        except OSError as e:
+            raise CopyError(relpath, e) from e
+
+    def _on_copied(self, callback: CopyCallback, relpath: str, result: CopyResult) -> None:
+        self.strategies[result.strategy] += 1
+        if result.digest is not None:
+            expected = self.checksums.get(relpath)
+            if expected is not None and expected != result.digest:
+                raise VerificationError(relpath, expected, result.digest)
+            self.digests[relpath] = result.digest
+        callback(relpath, result.size)
+
+    def _copy_all(
+        self,
+        source_dir: Path,
+        target_dir: Path,
+        relpaths: t.Iterable[str],
+        callback: CopyCallback,
+        is_shared: t.Callable[[str], bool],
+    ) -> None:
+        if self.nb_workers <= 1:
+            for relpath in relpaths:
+                self._on_copied(callback, *self._copy_file(source_dir, target_dir, relpath, is_shared(relpath)))
+            return
+
+        # Bound the number of pending copies, so that the callback is called while the tree is walked
+        max_pending = self.nb_workers * 4
+        pending: t.Set[Future] = set()
+        with ThreadPoolExecutor(max_workers=self.nb_workers, thread_name_prefix="copier") as executor:
+            try:
+                for relpath in relpaths:
+                    if len(pending) >= max_pending:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            self._on_copied(callback, *future.result())
+                    pending.add(executor.submit(self._copy_file, source_dir, target_dir, relpath, is_shared(relpath)))
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        self._on_copied(callback, *future.result())
+            except BaseException:
+                # Stop as soon as possible: the pending copies are cancelled, the running ones are awaited
+                for future in pending:
+                    future.cancel()
+                raise
@@ -0,0 +1,321 @@
+"""
+Module to update the installed program files with binary delta patches.
+
+A bundle can ship delta packages in its `deltas/` directory, one per previous version
+(e.g. `deltas/2.19.0/`). A delta package contains a `delta.json` description and one patch per
+changed file. The description gives, for each patched file, the digest of the installed file the
+patch applies to (the base), the digest of the resulting file, and the path of the patch.
+
+A patch is an LZMA-compressed sequence of operations which rebuild the new file from the base file:
+copy a range of the base file, or insert new data. When all the copied ranges stay at the same
+offset, the patch is applied in place and only the new data is written. A patch applied in place is read
+a first time without writing anything, so that a truncated or corrupted patch leaves the installed file intact.
+"""
+
+import dataclasses
+import hashlib
+import json
+import lzma
+import os
+import shutil
+import struct
+import typing as t
+from pathlib import Path
+
+from antares_web_installer.manifest import HASH_ALGORITHM, hash_file
+
+DELTAS_DIR = Path("deltas")
+DELTA_DESCRIPTION = "delta.json"
+DELTA_VERSION = 1
+
+DEFAULT_BLOCK_SIZE = 64 * 1024
+"""Size of the blocks compared when a patch is created."""
+
+_MAGIC = b"AWDELTA1"
+_HEADER = struct.Struct("<QB")  # size of the new file, flags
+_COPY = struct.Struct("<QQ")  # offset in the base file, length
+_DATA = struct.Struct("<Q")  # length of the data which follows
+_IN_PLACE = 0x01
+
+
+class DeltaError(Exception):
+    """
+    Exception raised when a patch is invalid or can't be applied.
+    """
+
+
+@dataclasses.dataclass(frozen=True)
+class DeltaEntry:
+    """
+    Patch of a program file.
+
+    Attributes:
+        relpath: POSIX path of the file, relative to the installation directory.
+        base_digest: digest of the installed file the patch applies to.
+        target_digest: digest of the file once patched.
+        patch: POSIX path of the patch, relative to the delta package directory.
+    """
+
+    relpath: str
+    base_digest: str
+    target_digest: str
+    patch: str
+
+
+@dataclasses.dataclass
+class DeltaPackage:
+    """
+    Delta package used to update the program files of a given version.
+
+    Attributes:
+        path: directory of the delta package.
+        from_version: version of the installed application the patches apply to.
+        entries: patches indexed by the relative path of the patched files.
+    """
+
+    path: Path
+    from_version: str
+    entries: t.Dict[str, DeltaEntry]
+
+    @classmethod
+    def find(cls, source_dir: Path, old_version: str) -> t.Optional["DeltaPackage"]:
+        """
+        Find the delta package of the source bundle applying to the installed version, if any.
+
+        :param source_dir: directory of the source bundle.
+        :param old_version: installed version, as reported by the server (e.g. "2.19.0").
+        :raise DeltaError: if the package description is invalid.
+        """
+        path = source_dir.joinpath(DELTAS_DIR, old_version)
+        description_path = path.joinpath(DELTA_DESCRIPTION)
+        if not description_path.is_file():
+            return None
+        try:
+            obj = json.loads(description_path.read_text())
+            if obj["version"] != DELTA_VERSION or obj["algorithm"] != HASH_ALGORITHM:
+                raise DeltaError(f"Unsupported delta package '{path}'")
+            entries = {relpath: DeltaEntry(relpath, **entry) for relpath, entry in obj["files"].items()}
+            return cls(path, obj["from_version"], entries)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            raise DeltaError(f"Invalid delta package '{path}': {e}") from e
+
+    def save(self) -> None:
+        """Write the description of the delta package."""
+        obj = {
+            "version": DELTA_VERSION,
+            "algorithm": HASH_ALGORITHM,
+            "from_version": self.from_version,
+            "files": {
+                relpath: {"base_digest": e.base_digest, "target_digest": e.target_digest, "patch": e.patch}
+                for relpath, e in sorted(self.entries.items())
+            },
+        }
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.path.joinpath(DELTA_DESCRIPTION).write_text(json.dumps(obj, indent=1))
+
+    def apply(self, entry: DeltaEntry, base_path: Path, dst_path: Path) -> int:
+        """
+        Apply the patch of a file and check the result.
+
+        :param entry: patch to apply.
+        :param base_path: installed file.
+        :param dst_path: patched file, which can be the installed file itself.
+        :return: the number of bytes written.
+        :raise DeltaError: if the patch can't be applied or if the patched file is not the expected one.
+        """
+        try:
+            written = apply_patch(base_path, self.path.joinpath(entry.patch), dst_path)
+            digest = hash_file(dst_path)
+        except (OSError, lzma.LZMAError, struct.error) as e:
+            raise DeltaError(f"Cannot apply the patch of '{entry.relpath}': {e}") from e
+        if digest != entry.target_digest:
+            raise DeltaError(f"The patch of '{entry.relpath}' doesn't give the expected file")
+        return written
+
+
+def _block_digest(block: bytes) -> bytes:
+    return hashlib.blake2b(block, digest_size=16).digest()
+
+
+def make_patch(base_path: Path, target_path: Path, patch_path: Path, block_size: int = DEFAULT_BLOCK_SIZE) -> None:
+    """
+    Create the patch which rebuilds the target file from the base file.
+
+    The blocks of the target file are looked up in the base file, preferably at the same offset,
+    so that the patch of a file modified in place can also be applied in place.
+    This function is used to build the delta packages of a release.
+    """
+    base_offsets: t.Dict[bytes, int] = {}
+    base_digests: t.List[bytes] = []
+    with base_path.open(mode="rb") as base:
+        offset = 0
+        while block := base.read(block_size):
+            digest = _block_digest(block)
+            base_offsets.setdefault(digest, offset)
+            base_digests.append(digest)
+            offset += len(block)
+
+    # list of (kind, base offset or data, length), adjacent operations are merged
+    ops: t.List[t.Tuple[str, t.Any, int]] = []
+    in_place = True
+    with target_path.open(mode="rb") as target:
+        offset = 0
+        while block := target.read(block_size):
+            digest = _block_digest(block)
+            index = offset // block_size
+            if index < len(base_digests) and base_digests[index] == digest:
+                src_offset: t.Optional[int] = offset
+            else:
+                src_offset = base_offsets.get(digest)
+            if src_offset is None:
+                if ops and ops[-1][0] == "D":
+                    ops[-1] = ("D", ops[-1][1] + block, ops[-1][2] + len(block))
+                else:
+                    ops.append(("D", block, len(block)))
+            else:
+                in_place = in_place and src_offset == offset
+                last = ops[-1] if ops else None
+                if last and last[0] == "C" and last[1] + last[2] == src_offset:
+                    ops[-1] = ("C", last[1], last[2] + len(block))
+                else:
+                    ops.append(("C", src_offset, len(block)))
+            offset += len(block)
+        target_size = offset
+
+    patch_path.parent.mkdir(parents=True, exist_ok=True)
+    with lzma.open(patch_path, mode="wb") as patch:
+        patch.write(_MAGIC + _HEADER.pack(target_size, _IN_PLACE if in_place else 0))
+        for kind, value, length in ops:
+            if kind == "C":
+                patch.write(b"C" + _COPY.pack(value, length))
+            else:
+                patch.write(b"D" + _DATA.pack(length) + value)
+        patch.write(b"E")
+
+
+def _read_exactly(stream: t.IO[bytes], size: int) -> bytes:
+    data = stream.read(size)
+    if len(data) != size:
+        raise DeltaError("Truncated patch")
+    return data
+
+
+def _iter_ops(patch: t.IO[bytes]) -> t.Iterator[t.Tuple[bytes, int, int]]:
+    """Yield the operations as (kind, base offset, length), the data follows the "D" operations."""
+    while (kind := _read_exactly(patch, 1)) != b"E":
+        if kind == b"C":
+            yield (kind, *_COPY.unpack(_read_exactly(patch, _COPY.size)))
+        elif kind == b"D":
+            yield kind, 0, _DATA.unpack(_read_exactly(patch, _DATA.size))[0]
+        else:
+            raise DeltaError(f"Invalid patch operation: {kind!r}")
+
+
+def _copy_data(src: t.IO[bytes], dst: t.Optional[t.IO[bytes]], length: int) -> None:
+    """Copy data from `src` to `dst`, or only skip it if `dst` is None."""
+    while length > 0:
+        chunk = _read_exactly(src, min(length, DEFAULT_BLOCK_SIZE * 16))
+        if dst is not None:
+            dst.write(chunk)
+        length -= len(chunk)
+
+
+def _read_header(patch: t.IO[bytes], patch_path: Path) -> t.Tuple[int, int]:
+    """Read the magic number and the header of a patch, and return the size of the new file and the flags."""
+    if _read_exactly(patch, len(_MAGIC)) != _MAGIC:
+        raise DeltaError(f"Invalid patch file '{patch_path}'")
+    target_size, flags = _HEADER.unpack(_read_exactly(patch, _HEADER.size))
+    return target_size, flags
+
+
+def check_patch(patch_path: Path) -> None:
+    """
+    Read a whole patch without applying it.
+
+    :param patch_path: patch created by `make_patch`.
+    :raise DeltaError: if the patch is truncated or doesn't rebuild a file of the expected size.
+    """
+    with lzma.open(patch_path, mode="rb") as patch:
+        target_size, _flags = _read_header(patch, patch_path)
+        size = 0
+        for kind, _src_offset, length in _iter_ops(patch):
+            if kind == b"D":
+                _copy_data(patch, None, length)
+            size += length
+        if size != target_size:
+            raise DeltaError(f"Inconsistent patch file '{patch_path}'")
+
+
+def apply_patch(base_path: Path, patch_path: Path, dst_path: Path) -> int:
+    """
+    Rebuild a file from a base file and a patch.
+
+    :param base_path: base file.
+    :param patch_path: patch created by `make_patch`.
+    :param dst_path: file to write, which can be the base file itself.
+    :return: the number of bytes written.
+    """
+    with lzma.open(patch_path, mode="rb") as patch:
+        target_size, flags = _read_header(patch, patch_path)
+        same_file = dst_path.exists() and os.path.samefile(base_path, dst_path)
+
+        # a file with several hard links (e.g. in a snapshot) is replaced rather than modified
+        if same_file and flags & _IN_PLACE and base_path.stat().st_nlink == 1:
+            # the installed file can't be restored once modified: the whole patch is checked first
+            check_patch(patch_path)
+            # only the new data is written, the copied ranges are already in place
+            written = 0
+            with base_path.open(mode="r+b") as dst:
+                offset = 0
+                for kind, _src_offset, length in _iter_ops(patch):
+                    if kind == b"D":
+                        dst.seek(offset)
+                        _copy_data(patch, dst, length)
+                        written += length
+                    offset += length
+                dst.truncate(target_size)
+            return written
+
+        tmp_path = dst_path.with_name(f"~{dst_path.name}.tmp") if same_file else dst_path
+        if not same_file:
+            dst_path.unlink(missing_ok=True)
+        with base_path.open(mode="rb") as base, tmp_path.open(mode="wb") as dst:
+            for kind, src_offset, length in _iter_ops(patch):
+                if kind == b"C":
+                    base.seek(src_offset)
+                    _copy_data(base, dst, length)
+                else:
+                    _copy_data(patch, dst, length)
+        # keep the permissions of the base file (e.g. the executable bit)
+        shutil.copymode(base_path, tmp_path)
+        if same_file:
+            os.replace(tmp_path, dst_path)
+        return target_size
+
+
+def make_delta_package(old_dir: Path, new_dir: Path, source_dir: Path, from_version: str) -> DeltaPackage:
+    """
+    Create the delta package updating the program files of `old_dir` to those of `new_dir`.
+
+    Only the files which exist in both trees and differ are patched: the other files are copied
+    from the source bundle as usual. This function is used to build the delta packages of a release.
+
+    :param old_dir: installation directory of the previous version.
+    :param new_dir: bundle of the new version.
+    :param source_dir: bundle where the delta package is created (usually `new_dir`).
+    :param from_version: previous version.
+    :return: the created delta package.
+    """
+    package = DeltaPackage(source_dir.joinpath(DELTAS_DIR, from_version), from_version, {})
+    for new_path in sorted(new_dir.rglob("*")):
+        relpath = new_path.relative_to(new_dir).as_posix()
+        old_path = old_dir.joinpath(relpath)
+        if relpath.split("/")[0] == DELTAS_DIR.name or not new_path.is_file() or not old_path.is_file():
+            continue
+        base_digest, target_digest = hash_file(old_path), hash_file(new_path)
+        if base_digest != target_digest:
+            patch = f"{relpath}.patch"
+            make_patch(old_path, new_path, package.path.joinpath(patch))
+            package.entries[relpath] = DeltaEntry(relpath, base_digest, target_digest, patch)
+    package.save()
+    return package
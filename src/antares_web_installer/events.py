@@ -0,0 +1,215 @@
+"""
+Module to report the progress of the installation as typed events.
+
+The installation publishes its events on an `EventBus`, from whichever thread runs the step. The subscribers are
+called synchronously by the publishing thread: a user interface subscribes a thread-safe queue, and consumes
+the events from its own thread.
+
+The log messages of the installation are turned into `LogMessage` events by an `EventHandler`, and the progress
+events are logged by `log_event`, so that the console and the log files keep showing the progress.
+
+A user interface refreshed at a fixed rate reduces the events received since its previous refresh
+with `coalesce`, so that its refresh cost doesn't depend on the number of copied files.
+"""
+
+import dataclasses
+import logging
+import queue
+import threading
+import typing as t
+
+
+@dataclasses.dataclass(frozen=True)
+class StepStarted:
+    """The step of the installation started."""
+
+    step: str
+
+
+@dataclasses.dataclass(frozen=True)
+class StepFinished:
+    """
+    The step of the installation finished.
+
+    Attributes:
+        step: name of the step.
+        elapsed: duration of the step in seconds.
+        failed: whether the step raised an error.
+    """
+
+    step: str
+    elapsed: float
+    failed: bool = False
+
+
+@dataclasses.dataclass(frozen=True)
+class ProgressChanged:
+    """
+    The progress of the installation changed.
+
+    Attributes:
+        progress: progress of the whole installation, between 0 and 100.
+        step: name of the step which made progress, if any.
+    """
+
+    progress: float
+    step: t.Optional[str] = None
+
+
+@dataclasses.dataclass(frozen=True)
+class BytesTransferred:
+    """
+    Files were copied or extracted.
+
+    Attributes:
+        done_bytes: number of bytes already transferred.
+        total_bytes: number of bytes to transfer.
+        description: bytes transferred, throughput and remaining time, in a human-readable form.
+    """
+
+    done_bytes: int
+    total_bytes: int
+    description: str
+
+
+@dataclasses.dataclass(frozen=True)
+class LogMessage:
+    """
+    Message of the installation, such as a warning.
+
+    Attributes:
+        level: level of the message, as defined by the `logging` module.
+        text: text of the message.
+    """
+
+    level: int
+    text: str
+
+
+@dataclasses.dataclass(frozen=True)
+class InstallFinished:
+    """The installation completed successfully."""
+
+
+@dataclasses.dataclass(frozen=True)
+class InstallFailed:
+    """
+    The installation failed.
+
+    Attributes:
+        message: description of the error.
+    """
+
+    message: str
+
+
+Event = t.Union[
+    StepStarted, StepFinished, ProgressChanged, BytesTransferred, LogMessage, InstallFinished, InstallFailed
+]
+EventListener = t.Callable[[Event], None]
+
+
+class EventBus:
+    """
+    Deliver the events of the installation to the subscribers.
+
+    This class is thread-safe: the events can be published by several threads. The subscribers are called
+    without holding any lock, since they may log, and the log records may be published in turn.
+    """
+
+    def __init__(self) -> None:
+        self._listeners: t.List[EventListener] = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, listener: EventListener) -> None:
+        """Call a function with each published event, in the publishing thread."""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def unsubscribe(self, listener: EventListener) -> None:
+        with self._lock:
+            self._listeners.remove(listener)
+
+    def subscribe_queue(self) -> "queue.SimpleQueue[Event]":
+        """Put each published event in a new queue, which can be consumed by another thread."""
+        events: "queue.SimpleQueue[Event]" = queue.SimpleQueue()
+        self.subscribe(events.put)
+        return events
+
+    def publish(self, event: Event) -> None:
+        with self._lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener(event)
+
+
+def log_event(logger: logging.Logger) -> EventListener:
+    """
+    Create a subscriber which logs the progress events in the form "Progression: 42.00" and "Transfer: ...".
+
+    The log records are marked with their event, so that an `EventHandler` doesn't publish them again.
+    """
+
+    def log(event: Event) -> None:
+        if isinstance(event, ProgressChanged):
+            logger.info(f"Progression: {event.progress:.2f}", extra={"event": event})
+        elif isinstance(event, BytesTransferred):
+            logger.info(f"Transfer: {event.description}", extra={"event": event})
+
+    return log
+
+
+class EventHandler(logging.Handler):
+    """
+    Logging handler publishing the log messages as `LogMessage` events.
+    """
+
+    def __init__(self, bus: EventBus, level: int = logging.INFO):
+        super().__init__(level)
+        self.bus = bus
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if hasattr(record, "event"):
+            # the record describes an event which was already published
+            return
+        self.bus.publish(LogMessage(record.levelno, record.getMessage()))
+
+
+@dataclasses.dataclass
+class EventBatch:
+    """
+    Events received during a refresh of a user interface, reduced to what must be shown.
+
+    Attributes:
+        progress: latest progress, if it changed.
+        transfer: latest transfer report, if any.
+        message: message to show, i.e. the latest of the most severe messages, if any.
+        outcome: end of the installation, if it is over.
+    """
+
+    progress: t.Optional[ProgressChanged] = None
+    transfer: t.Optional[BytesTransferred] = None
+    message: t.Optional[LogMessage] = None
+    outcome: t.Union[InstallFinished, InstallFailed, None] = None
+
+
+def coalesce(events: t.Iterable[Event]) -> EventBatch:
+    """
+    Reduce a sequence of events to the latest state, so that a user interface is refreshed once per batch
+    however many events were published. The events published after the end of the installation are ignored.
+    """
+    batch = EventBatch()
+    for event in events:
+        if batch.outcome is not None:
+            break
+        if isinstance(event, ProgressChanged):
+            batch.progress = event
+        elif isinstance(event, BytesTransferred):
+            batch.transfer = event
+        elif isinstance(event, LogMessage):
+            # a warning is not hidden by the next information messages of the batch
+            if batch.message is None or event.level >= batch.message.level:
+                batch.message = event
+        elif isinstance(event, (InstallFinished, InstallFailed)):
+            batch.outcome = event
+    return batch
@@ -0,0 +1,163 @@
+"""
+Module to copy the content of a file using the fastest method supported by the file systems.
+
+On Linux, the installer tries, in this order:
+
+- a reflink clone (`FICLONE`), which shares the data blocks on copy-on-write file systems (Btrfs, XFS...),
+- `os.copy_file_range`, which copies the data inside the kernel (and may reflink or offload it),
+- `os.sendfile`, which also avoids copying the data in user space,
+- a buffered copy using a large buffer, which works everywhere.
+
+The first method which works for a pair of source and target file systems is remembered,
+so that the unsupported methods are not tried again for the following files.
+On other platforms, only the buffered copy is used.
+
+When a hash algorithm is given, the buffered copy is always used: the data is hashed while it is
+streamed to the target file, so that the digest of the copied content costs no extra read. This trades the
+kernel-side copies, which never bring the data into user space, for a single read of each source file:
+hashing after a kernel-side copy would read every file a second time.
+"""
+
+import enum
+import errno
+import hashlib
+import os
+import shutil
+import sys
+import threading
+import typing as t
+from pathlib import Path
+
+if sys.platform.startswith("linux"):
+    import fcntl
+
+BUFFER_SIZE = 1024 * 1024
+"""Size of the buffer used by the buffered copy, and of the chunks of the kernel-side copies."""
+
+FICLONE = 0x40049409
+"""`ioctl` request to clone a file, see `linux/fs.h`."""
+
+# Errors meaning that a copy method is not supported by the platform or the file systems
+_UNSUPPORTED_ERRNOS = {
+    errno.EBADF,
+    errno.EINVAL,
+    errno.ENOSYS,
+    errno.ENOTSUP,
+    errno.ENOTTY,
+    errno.EOPNOTSUPP,
+    errno.EXDEV,
+}
+
+
+class CopyStrategy(enum.Enum):
+    """Method used to copy the content of a file."""
+
+    REFLINK = "reflink"
+    COPY_FILE_RANGE = "copy_file_range"
+    SENDFILE = "sendfile"
+    BUFFERED = "buffered"
+    # not a copy method: the file is linked to an identical file of the blob store
+    HARDLINK = "hardlink"
+
+
+def _reflink(src_fd: int, dst_fd: int) -> None:
+    fcntl.ioctl(dst_fd, FICLONE, src_fd)
+
+
+def _copy_file_range(src_fd: int, dst_fd: int) -> None:
+    while os.copy_file_range(src_fd, dst_fd, BUFFER_SIZE * 8):
+        pass
+
+
+def _sendfile(src_fd: int, dst_fd: int) -> None:
+    offset = 0
+    while sent := os.sendfile(dst_fd, src_fd, offset, BUFFER_SIZE * 8):
+        offset += sent
+
+
+def _buffered(src_fd: int, dst_fd: int, hasher: t.Optional["hashlib._Hash"] = None) -> None:
+    while data := os.read(src_fd, BUFFER_SIZE):
+        if hasher is not None:
+            hasher.update(data)
+        view = memoryview(data)
+        while view:
+            view = view[os.write(dst_fd, view) :]
+
+
+_COPY_FUNCTIONS: t.Dict[CopyStrategy, t.Callable[[int, int], None]] = {
+    CopyStrategy.REFLINK: _reflink,
+    CopyStrategy.COPY_FILE_RANGE: _copy_file_range,
+    CopyStrategy.SENDFILE: _sendfile,
+    CopyStrategy.BUFFERED: _buffered,
+}
+
+if sys.platform.startswith("linux"):
+    SUPPORTED_STRATEGIES = list(_COPY_FUNCTIONS)
+else:
+    SUPPORTED_STRATEGIES = [CopyStrategy.BUFFERED]
+
+
+class CopyResult(t.NamedTuple):
+    """Result of a file copy: the method used, the number of bytes copied and the digest of the copied data."""
+
+    strategy: CopyStrategy
+    size: int
+    digest: t.Optional[str] = None
+
+
+class FileCopier:
+    """
+    Copy files like `shutil.copy2`, choosing the copy method for each pair of file systems.
+
+    This class is thread-safe: the same instance can be shared by all the copy workers.
+    """
+
+    def __init__(self, strategies: t.Sequence[CopyStrategy] = tuple(SUPPORTED_STRATEGIES)):
+        self._strategies = list(strategies)
+        self._first_by_devices: t.Dict[t.Tuple[int, int], int] = {}
+        self._lock = threading.Lock()
+
+    def copy_file(self, src_path: Path, dst_path: Path, hash_algorithm: t.Optional[str] = None) -> CopyResult:
+        """
+        Copy a file content and metadata, overriding the target file if it exists.
+
+        :param src_path: path of the source file.
+        :param dst_path: path of the target file.
+        :param hash_algorithm: name of the `hashlib` algorithm used to hash the data while it is copied, if any.
+        :return: the method used to copy the file content, the size of the file and the digest of the copied data.
+        :raise OSError: if the file can't be copied.
+        """
+        # the target file is replaced rather than rewritten, so that its other hard links (snapshots) are preserved
+        dst_path.unlink(missing_ok=True)
+        with open(src_path, mode="rb") as src, open(dst_path, mode="wb") as dst:
+            src_fd, dst_fd = src.fileno(), dst.fileno()
+            src_stat = os.fstat(src_fd)
+            if hash_algorithm is None:
+                strategy = self._copy_content(src_fd, dst_fd, (src_stat.st_dev, os.fstat(dst_fd).st_dev), src_path)
+                digest = None
+            else:
+                hasher = hashlib.new(hash_algorithm)
+                _buffered(src_fd, dst_fd, hasher)
+                strategy, digest = CopyStrategy.BUFFERED, hasher.hexdigest()
+        shutil.copystat(src_path, dst_path)
+        return CopyResult(strategy, src_stat.st_size, digest)
+
+    def _copy_content(self, src_fd: int, dst_fd: int, devices: t.Tuple[int, int], src_path: Path) -> CopyStrategy:
+        with self._lock:
+            first = self._first_by_devices.get(devices, 0)
+        for index in range(first, len(self._strategies)):
+            strategy = self._strategies[index]
+            try:
+                _COPY_FUNCTIONS[strategy](src_fd, dst_fd)
+            except OSError as e:
+                if e.errno not in _UNSUPPORTED_ERRNOS or strategy == CopyStrategy.BUFFERED:
+                    raise
+                # Start again from scratch with the next method, and don't try this one anymore
+                os.lseek(src_fd, 0, os.SEEK_SET)
+                os.lseek(dst_fd, 0, os.SEEK_SET)
+                os.ftruncate(dst_fd, 0)
+                with self._lock:
+                    self._first_by_devices[devices] = max(self._first_by_devices.get(devices, 0), index + 1)
+            else:
+                return strategy
+        raise OSError(errno.ENOTSUP, "No copy method available", str(src_path))  # pragma: no cover
@@ -2,18 +2,16 @@
 Main entrypoint for the GUI application.
 """
 
-import logging
-import sys
+import multiprocessing
 
+from antares_web_installer import add_console_handler
 from antares_web_installer.gui.controller import WizardController
 
 
 def main():
-    logging.basicConfig(
-        level=logging.INFO,
-        format="[%(asctime)-15s] %(message)s",
-        stream=sys.stdout,
-    )
+    # the installation may run in a child process, which is this executable once frozen by PyInstaller
+    multiprocessing.freeze_support()
+    add_console_handler()
 
     controller = WizardController()
     controller.run()
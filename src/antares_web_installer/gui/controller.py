@@ -3,18 +3,24 @@ references:
 ebarr: https://stackoverflow.com/questions/23947281/python-multiprocessing-redirect-stdout-of-a-child-process-to-a-tkinter-text
 """
 
+import queue
 import shutil
 import typing
 from pathlib import Path
 from threading import Thread
 from typing import Optional
 
-from antares_web_installer import logger
+from antares_web_installer import log_queue, logger
 from antares_web_installer.app import App, InstallError
-from antares_web_installer.gui.logger import ConsoleHandler, ProgressHandler, LogFileHandler
+from antares_web_installer.events import Event, EventHandler, InstallFailed
+from antares_web_installer.gui.logger import LogFileHandler
 from antares_web_installer.gui.model import WizardModel
 from antares_web_installer.gui.mvc import Controller
 from antares_web_installer.gui.view import WizardView
+from antares_web_installer.gui.worker import InstallerProcess
+
+# Maximum number of events handled by a refresh of the view, so that it stays responsive
+MAX_EVENTS_PER_POLL = 10_000
 
 
 def run_installation(app: App) -> None:
@@ -36,12 +42,17 @@ class WizardController(Controller):
         self.app = None
         self.log_dir: Optional[Path] = None
         self.log_file: Optional[Path] = None
+        self.log_file_handler: Optional[LogFileHandler] = None
 
         # init loggers
         self.logger = logger
 
         # Thread used while installation is running
         self.thread = None
+        # Child process used instead of the thread, if the installation runs in a separate process
+        self.worker: Optional[InstallerProcess] = None
+        # Events of the installation, consumed by the view
+        self.events: "queue.SimpleQueue[Event]" = queue.SimpleQueue()
         # self.init_file_handler()
 
     def init_model(self) -> "WizardModel":
@@ -81,27 +92,17 @@ class WizardController(Controller):
 
     def init_log_file_handler(self):
         self.init_file_handler()
-        log_file_handler = LogFileHandler(self.log_file)
-        self.logger.addHandler(log_file_handler)
-
-    # initialize file handler logger
-    def init_console_handler(self, callback):
-        """
-
-        @param callback:
-        @return:
-        """
-        console_handler = ConsoleHandler(callback)
-        self.logger.addHandler(console_handler)
+        self.log_file_handler = LogFileHandler(self.log_file)
+        log_queue.add_handler(self.log_file_handler)
 
-    def init_progress_handler(self, callback):
+    def init_event_handler(self, app: App):
         """
-        Initialize handler log of progress.
-        The logs generated will be shown on the window console during installation
-        @param callback: function that is used to update logs
+        Publish the log messages with the other events of the installation,
+        and collect the events in a queue, so that they are shown by the view from its own thread.
+        @param app: installation application
         """
-        progress_logger = ProgressHandler(callback)
-        self.logger.addHandler(progress_logger)
+        log_queue.add_handler(EventHandler(app.events))
+        app.events.subscribe(self.events.put)
 
     def run(self) -> None:
         """
@@ -111,30 +112,40 @@ class WizardController(Controller):
         self.view.update_view()
         super().run()
 
-    def install(self, callback: typing.Callable):
+    def install(self):
         """
-        Run App.install method
-        @param callback: function that is used to update logs
+        Run App.install method.
+        The progress of the installation is reported by the events of `self.events`.
         """
         self.init_log_file_handler()
         self.logger.debug("file logger initialized.")
-        self.init_console_handler(callback)
-        self.logger.debug("console logger initialized.")
-        self.init_progress_handler(callback)
-        self.logger.debug("progress logger initialized.")
 
         self.logger.debug("Initializing installer worker")
 
+        options = dict(
+            source_dir=self.model.source_dir,
+            target_dir=self.model.target_dir,
+            shortcut=self.model.shortcut,
+            launch=self.model.launch,
+            nb_workers=self.model.nb_workers,
+            staged=self.model.staged,
+        )
+        if self.model.separate_process:
+            # the log records of the child process are written in the log file by this process
+            self.worker = InstallerProcess(options)
+            self.worker.start()
+            self.logger.debug("installer process started.")
+            return
+
         try:
-            self.app = App(
-                source_dir=self.model.source_dir,
-                target_dir=self.model.target_dir,
-                shortcut=self.model.shortcut,
-                launch=self.model.launch,
-            )
+            self.app = App(**options)
         except InstallError as e:
             logger.warning("Impossible to create a new shortcut. Skip this step.")
             logger.debug(e)
+            self.events.put(InstallFailed(str(e)))
+            return
+        self.init_event_handler(self.app)
+        self.logger.debug("event handler initialized.")
 
         self.thread = Thread(target=lambda: run_installation(self.app), args=())
 
@@ -143,6 +154,30 @@ class WizardController(Controller):
         except InstallError as e:
             self.view.raise_error(e)
 
+    def poll_events(self, max_events: int = MAX_EVENTS_PER_POLL) -> typing.List[Event]:
+        """
+        Get the events of the installation published since the previous call, without waiting.
+        @param max_events: maximum number of events returned, the next ones are returned by the next call
+        """
+        if self.worker is not None:
+            return self.worker.poll_events(max_events)
+        events: typing.List[Event] = []
+        while len(events) < max_events:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                break
+        return events
+
+    def cancel_installation(self) -> None:
+        """
+        Stop the installation, if it runs in a separate process.
+        The installation running in a thread can't be stopped.
+        """
+        if self.worker is not None:
+            logger.info("Cancelling the installation...")
+            self.worker.cancel()
+
     def get_target_dir(self) -> Path:
         return self.model.target_dir
 
@@ -161,15 +196,35 @@ class WizardController(Controller):
     def set_launch(self, new_value):
         self.model.set_launch(new_value)
 
+    def get_nb_workers(self) -> int:
+        return self.model.nb_workers
+
+    def set_nb_workers(self, new_value: int):
+        self.model.set_nb_workers(new_value)
+
+    def get_staged(self) -> bool:
+        return self.model.staged
+
+    def set_staged(self, new_value: bool):
+        self.model.set_staged(new_value)
+
+    def get_separate_process(self) -> bool:
+        return self.model.separate_process
+
+    def set_separate_process(self, new_value: bool):
+        self.model.set_separate_process(new_value)
+
     def update_log_file(self):
         # close log file handler
+        log_file_handler = self.log_file_handler
+        if log_file_handler is None:
+            return
         logger.debug("Terminate log file handler.")
-        log_file_handler = logger.handlers[0]
 
-        log_file_handler.flush()
+        # the handler is removed once the pending messages are written
+        log_queue.remove_handler(log_file_handler)
         log_file_handler.close()
-
-        logger.removeHandler(log_file_handler)
+        self.log_file_handler = None
         logger.debug("Log file handler was successfully removed")
 
         # If log file was newly created, it is located in source dir
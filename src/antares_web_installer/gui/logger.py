@@ -1,39 +1,9 @@
 import logging
-import typing
 
+from antares_web_installer.logqueue import BufferedFileHandler
 
-MessageConsumer = typing.Callable[[str], None]
 
-
-class ConsoleHandler(logging.Handler):
-    def __init__(self, callback: MessageConsumer):
-        logging.Handler.__init__(self)
-        self.setLevel(logging.INFO)
-        formatter = logging.Formatter("[%(asctime)-15s] %(message)s")
-        self.setFormatter(formatter)
-        self.callback = callback
-
-    def emit(self, logs: logging.LogRecord):
-        self.callback(logs.msg)
-
-
-class ProgressHandler(logging.Handler):
-    def __init__(self, callback: MessageConsumer):
-        """
-        This logging handler intercept all logs that are progression values
-        @param progress_var: tkinter.StringVar
-        """
-        logging.Handler.__init__(self)
-        self.setLevel(logging.INFO)
-        formatter = logging.Formatter("[%(asctime)-15s] %(message)s")
-        self.setFormatter(formatter)
-        self.callback = callback  # to call at the end of the emit() method
-
-    def emit(self, logs: logging.LogRecord):
-        self.callback(logs.msg)
-
-
-class LogFileHandler(logging.FileHandler):
+class LogFileHandler(BufferedFileHandler):
     def __init__(self, filename):
         super().__init__(filename, "a")
         self.setLevel(logging.DEBUG)
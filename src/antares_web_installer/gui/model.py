@@ -4,6 +4,7 @@ from pathlib import Path
 
 from antares_web_installer.gui.mvc import Model, Controller
 from antares_web_installer import SRC_DIR, TARGET_DIR
+from antares_web_installer.copier import DEFAULT_NB_WORKERS
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +20,9 @@ class WizardModel(Model):
     @param target_dir:
     @param shortcut_dir:
     @param launch:
+    @param nb_workers: number of threads used to copy the files
+    @param staged: whether to prepare the new program files before stopping the running server
+    @param separate_process: whether to run the installation in a child process rather than in a thread
     """
 
     def __init__(self, controller: Controller):
@@ -27,6 +31,9 @@ class WizardModel(Model):
         self.target_dir = TARGET_DIR
         self.shortcut = True
         self.launch = True
+        self.nb_workers = DEFAULT_NB_WORKERS
+        self.staged = False
+        self.separate_process = False
 
     def set_target_dir(self, new_target_dir: Path) -> None:
         self.target_dir = new_target_dir
@@ -38,3 +45,17 @@ class WizardModel(Model):
     def set_launch(self, new_launch: bool):
         self.launch = new_launch
         logger.debug("Launch option is now set to '{}'.".format(self.shortcut))
+
+    def set_nb_workers(self, new_nb_workers: int):
+        if new_nb_workers < 1:
+            raise ModelError("The number of workers must be a positive integer, got {}.".format(new_nb_workers))
+        self.nb_workers = new_nb_workers
+        logger.debug("Number of copy workers is now set to '{}'.".format(self.nb_workers))
+
+    def set_staged(self, new_staged: bool):
+        self.staged = new_staged
+        logger.debug("Staged option is now set to '{}'.".format(self.staged))
+
+    def set_separate_process(self, new_separate_process: bool):
+        self.separate_process = new_separate_process
+        logger.debug("Separate process option is now set to '{}'.".format(self.separate_process))
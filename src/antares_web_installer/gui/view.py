@@ -25,6 +25,7 @@ from antares_web_installer.gui.widgets.frame import (
 from antares_web_installer.gui.widgets import convert_in_du
 
 if typing.TYPE_CHECKING:
+    from antares_web_installer.events import Event
     from antares_web_installer.gui.controller import WizardController
 
 
@@ -174,8 +175,14 @@ class WizardView(View):
     def update_log_file(self):
         self.controller.update_log_file()
 
-    def run_installation(self, callback):
-        self.controller.install(callback)
+    def run_installation(self):
+        self.controller.install()
+
+    def poll_events(self) -> typing.List["Event"]:
+        return self.controller.poll_events()
+
+    def cancel_installation(self):
+        self.controller.cancel_installation()
 
     def installation_over(self):
         self.frames["progress_frame"].installation_over()
@@ -60,6 +60,7 @@ class CancelBtn(CloseableButton):
     def confirm(self):
         answer = messagebox.askyesno("Quit application", "Are you sure you want to cancel the installation?")
         if answer:
+            self.master.window.cancel_installation()
             self.close_window()
 
 
@@ -3,6 +3,7 @@ import typing
 from tkinter import ttk, filedialog
 from typing import TYPE_CHECKING
 
+from antares_web_installer.events import InstallFinished, coalesce
 from antares_web_installer.shortcuts import get_homedir
 from .button import CancelBtn, BackBtn, NextBtn, FinishBtn, InstallBtn
 
@@ -11,6 +12,9 @@ if TYPE_CHECKING:
 
 FORMAT = "[%(asctime)-15s] %(message)s"
 
+# Delay in milliseconds between two refreshes of the progress (about 30 refreshes per second)
+REFRESH_INTERVAL = 33
+
 
 class ViewError(Exception):
     pass
@@ -224,6 +228,12 @@ class ProgressFrame(BasicFrame):
             side="top", fill="x", padx=5
         )
 
+        # Transfer throughput and remaining time
+        self.transfer_var = tk.StringVar(value="")
+        ttk.Label(self.body, textvariable=self.transfer_var, style="Description.TLabel").pack(
+            side="top", fill="x", padx=5
+        )
+
         # Logs display
         self.console_var = tk.StringVar(value="")
 
@@ -238,24 +248,35 @@ class ProgressFrame(BasicFrame):
         self.bind("<<ActivateFrame>>", self.on_active_frame)
 
     def on_active_frame(self, event):
-        self.window.run_installation(self.progress_update)
-
-    def progress_update(self, logs: str):
-        if logs.startswith("Progression: "):
-            # progress bar description
-            self.progress_var.set(logs + "%")
-
-            # progress bar value
-            progress_value = float(logs.lstrip("Progression: "))
-            self.progress_bar["value"] = progress_value
-
-            # in case installation is complete
-            if progress_value == 100:
-                self.window.installation_over()
-        else:
+        self.window.run_installation()
+        self.after(REFRESH_INTERVAL, self.progress_update)
+
+    def progress_update(self):
+        """
+        Show the events published by the installation since the previous refresh, until the installation is over.
+        The events are coalesced: the widgets are updated at most once per refresh, however fast the files are copied.
+        """
+        batch = coalesce(self.window.poll_events())
+        if batch.progress is not None:
+            self.progress_var.set(f"Progression: {batch.progress.progress:.2f}%")
+            self.progress_bar["value"] = batch.progress.progress
+        if batch.transfer is not None:
+            # bytes copied, throughput and remaining time
+            self.transfer_var.set(f"Transfer: {batch.transfer.description}")
+        if batch.message is not None:
             # console logs
-            self.console_var.set(logs)
-        self.window.update_idletasks()
+            self.console_var.set(batch.message.text)
+        if batch.outcome is None:
+            self.after(REFRESH_INTERVAL, self.progress_update)
+        elif isinstance(batch.outcome, InstallFinished):
+            self.progress_var.set("Progression: 100.00%")
+            self.progress_bar["value"] = 100
+            self.window.installation_over()
+        else:
+            self.console_var.set(f"Installation failed: {batch.outcome.message}")
+            # the log file is closed before the wizard quits
+            self.window.update_log_file()
+            self.window.raise_error(f"Installation failed: {batch.outcome.message}")
 
     def installation_over(self):
         self.window.update_log_file()
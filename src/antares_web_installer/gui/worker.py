@@ -0,0 +1,182 @@
+"""
+Module to run the installation in a child process, so that the CPU-heavy work of the installation
+(hashing, YAML dumping...) doesn't compete with the Tk main loop for the GIL.
+
+The child process sends the events of the installation, including its log messages, over a pipe,
+and the wizard polls the pipe from the Tk main loop. The child process is spawned rather than forked,
+since a forked Tk process is unusable.
+
+The child process doesn't write the log file itself: its log records are also sent over the pipe,
+and handled by the logger of the wizard, so that a single process writes the log file.
+
+Cancelling the installation terminates the child process: an interrupted installation is resumed
+by the next one.
+"""
+
+import copy
+import logging
+import multiprocessing
+import threading
+import time
+import typing as t
+from multiprocessing.connection import Connection
+
+from antares_web_installer import log_queue, logger
+from antares_web_installer.app import App
+from antares_web_installer.events import Event, EventHandler, InstallFailed, InstallFinished
+
+EXIT_TIMEOUT = 5.0
+"""Time in seconds given to the child process to exit, once it reported the end of the installation."""
+
+CANCEL_TIMEOUT = 5.0
+"""Time in seconds given to the child process to terminate before it is killed."""
+
+
+class _RecordSender(logging.Handler):
+    """
+    Send the log records of the child process to the parent process.
+    """
+
+    def __init__(self, send: t.Callable[[logging.LogRecord], None]):
+        super().__init__(logging.DEBUG)
+        self._send = send
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            # the arguments and the traceback may not be picklable: they are formatted in the message
+            record = copy.copy(record)
+            record.msg = self.format(record)
+            record.args = None
+            record.exc_info = None
+            record.exc_text = None
+            record.stack_info = None
+            self._send(record)
+        except Exception:
+            self.handleError(record)
+
+
+def _run_installation(options: t.Dict[str, t.Any], conn: Connection) -> None:
+    """
+    Entry point of the child process: run the installation, and send its events and its log records
+    to the parent process.
+    """
+    lock = threading.Lock()
+
+    def send(item: t.Union[Event, logging.LogRecord]) -> None:
+        # the events are published by the threads of all the running steps
+        with lock:
+            conn.send(item)
+
+    # the handlers of the parent process are not inherited by a spawned process
+    log_queue.add_handler(_RecordSender(send))
+
+    try:
+        try:
+            app = App(**options)
+        except Exception as e:
+            send(InstallFailed(str(e)))
+            return
+        app.events.subscribe(send)
+        log_queue.add_handler(EventHandler(app.events))
+        try:
+            app.run()
+        except Exception as e:
+            # the error was published by `App.run`
+            logger.exception(f"An error occurred during installation: {e}")
+    finally:
+        # the pending log messages are sent before the pipe is closed
+        log_queue.flush()
+        conn.close()
+
+
+class InstallerProcess:
+    """
+    Installation running in a child process.
+
+    Attributes:
+        options: arguments of the installation application.
+    """
+
+    def __init__(self, options: t.Dict[str, t.Any]):
+        self.options = options
+        context = multiprocessing.get_context("spawn")
+        self._conn, child_conn = context.Pipe(duplex=False)
+        self._process = context.Process(
+            target=_run_installation,
+            args=(options, child_conn),
+            name="installer",
+            daemon=True,
+        )
+        self._child_conn = child_conn
+        self._outcome: t.Union[InstallFinished, InstallFailed, None] = None
+        # outcome of a cancelled installation, returned by the next call to `poll_events`
+        self._cancelled: t.Optional[InstallFailed] = None
+
+    def start(self) -> None:
+        self._process.start()
+        # the pipe is closed once the child process closes its end
+        self._child_conn.close()
+
+    def is_alive(self) -> bool:
+        return self._process.is_alive()
+
+    def poll_events(self, max_events: int) -> t.List[Event]:
+        """
+        Get the events sent by the child process since the previous call, without waiting.
+        The log records sent by the child process are handled by the logger of this process.
+
+        The end of the installation is only returned once the child process exited, so that its files are closed.
+        If the child process exits without reporting the end of the installation, a failure is returned.
+        """
+        events: t.List[Event] = []
+        if self._cancelled is not None:
+            events.append(self._cancelled)
+            self._cancelled = None
+        while self._outcome is None and len(events) < max_events:
+            try:
+                if not self._conn.poll():
+                    break
+                event = self._conn.recv()
+            except (EOFError, OSError):
+                self._process.join(EXIT_TIMEOUT)
+                exitcode = self._process.exitcode
+                event = InstallFailed(f"The installation process exited unexpectedly (exit code {exitcode}).")
+            if isinstance(event, logging.LogRecord):
+                logger.handle(event)
+                continue
+            if isinstance(event, (InstallFinished, InstallFailed)):
+                self._outcome = event
+                self._handle_last_records()
+                self._process.join(EXIT_TIMEOUT)
+                self._conn.close()
+            events.append(event)
+        return events
+
+    def _handle_last_records(self) -> None:
+        """
+        Handle the log records sent after the end of the installation, until the child process closes the pipe.
+        """
+        deadline = time.monotonic() + EXIT_TIMEOUT
+        try:
+            while self._conn.poll(max(deadline - time.monotonic(), 0)):
+                item = self._conn.recv()
+                if isinstance(item, logging.LogRecord):
+                    logger.handle(item)
+        except (EOFError, OSError):
+            pass
+
+    def cancel(self) -> None:
+        """
+        Terminate the child process, and kill it if it doesn't exit in time.
+        """
+        if self._outcome is not None:
+            return
+        self._process.terminate()
+        self._process.join(CANCEL_TIMEOUT)
+        if self._process.is_alive():
+            self._process.kill()
+            self._process.join()
+        self._outcome = self._cancelled = InstallFailed(
+            "Installation cancelled: run the installation again to resume it."
+        )
+        self._conn.close()
@@ -0,0 +1,221 @@
+"""
+Module to journal the copy operations, so that an interrupted installation can be resumed.
+
+The journal is a JSON Lines file kept in the installer data directory of the target directory.
+The first line describes the copy in progress (source and destination directories, kind of installation),
+and a line is appended each time a file is completely copied, with the size and the modification time
+of the source and of the copied file. When the installation is run again with the same source and
+destination, the files whose journal entry still matches both files are skipped.
+The journal is removed once the copy is completed.
+"""
+
+import contextlib
+import json
+import os
+import typing as t
+from pathlib import Path
+
+from antares_web_installer.scanner import ScanEntry
+
+JOURNAL_VERSION = 1
+
+SYNC_INTERVAL = 64
+"""Number of entries written between two synchronizations of the journal on disk."""
+
+
+class JournalEntry(t.NamedTuple):
+    """
+    Completed copy of a file.
+
+    Attributes:
+        src_size: size of the source file.
+        src_mtime_ns: modification time of the source file.
+        dst_size: size of the copied file.
+        dst_mtime_ns: modification time of the copied file.
+        digest: digest of the copied file, if computed during the copy.
+    """
+
+    src_size: int
+    src_mtime_ns: int
+    dst_size: int
+    dst_mtime_ns: int
+    digest: t.Optional[str] = None
+
+
+class Journal:
+    """
+    Journal of the files copied from a source directory to a destination directory.
+
+    Attributes:
+        path: path of the journal file.
+        header: description of the copy in progress.
+        entries: completed copies, indexed by the POSIX path of the file relative to the destination directory.
+    """
+
+    def __init__(self, path: Path, header: t.Dict[str, t.Any], entries: t.Dict[str, JournalEntry]):
+        self.path = path
+        self.header = header
+        self.entries = entries
+        self._file: t.Optional[t.TextIO] = None
+        self._nb_unsynced = 0
+
+    @staticmethod
+    def make_header(
+        source_dir: Path, dst_dir: Path, fresh: bool, old_version: t.Optional[str] = None
+    ) -> t.Dict[str, t.Any]:
+        header: t.Dict[str, t.Any] = {
+            "version": JOURNAL_VERSION,
+            "source": str(source_dir),
+            "dst": str(dst_dir),
+            "fresh": fresh,
+        }
+        if old_version is not None:
+            # once some program files are upgraded, the installed version can't be found again
+            header["old_version"] = old_version
+        return header
+
+    @classmethod
+    def load(cls, path: Path) -> t.Optional["Journal"]:
+        """
+        Load the journal of an interrupted copy, if any.
+
+        The last line may be truncated if the installer was killed while writing it: it is ignored.
+        A journal which can't be read is ignored.
+        """
+        try:
+            lines = path.read_text().splitlines()
+            header = json.loads(lines[0])
+            if header.get("version") != JOURNAL_VERSION:
+                return None
+        except (OSError, ValueError, IndexError):
+            return None
+        entries = {}
+        for line in lines[1:]:
+            try:
+                obj = json.loads(line)
+                src_size, src_mtime_ns = obj["src"]
+                dst_size, dst_mtime_ns = obj["dst"]
+                entries[obj["path"]] = JournalEntry(
+                    src_size=src_size,
+                    src_mtime_ns=src_mtime_ns,
+                    dst_size=dst_size,
+                    dst_mtime_ns=dst_mtime_ns,
+                    digest=obj.get("digest"),
+                )
+            except (ValueError, KeyError, TypeError):
+                break
+        return cls(path, header, entries)
+
+    @classmethod
+    def find(cls, path: Path, source_dir: Path, dst_dir: Path, fresh: t.Optional[bool] = None) -> t.Optional["Journal"]:
+        """
+        Load the journal of an interrupted copy from `source_dir` to `dst_dir`, if any.
+
+        :param path: path of the journal file.
+        :param source_dir: source directory of the copy.
+        :param dst_dir: destination directory of the copy.
+        :param fresh: kind of installation to match, or `None` to match any kind.
+        """
+        journal = cls.load(path)
+        if journal is None:
+            return None
+        header = journal.header
+        if header.get("source") != str(source_dir) or header.get("dst") != str(dst_dir):
+            return None
+        if fresh is not None and header.get("fresh") != fresh:
+            return None
+        return journal
+
+    @classmethod
+    def start(
+        cls, path: Path, source_dir: Path, dst_dir: Path, fresh: bool, old_version: t.Optional[str] = None
+    ) -> "Journal":
+        """
+        Resume the journal of an interrupted copy, or start a new journal.
+
+        :param old_version: version installed before an upgrade, recorded in the header of a new journal.
+        """
+        journal = cls.find(path, source_dir, dst_dir, fresh)
+        if journal is None:
+            journal = cls(path, cls.make_header(source_dir, dst_dir, fresh, old_version), {})
+        journal.open()
+        return journal
+
+    def open(self) -> None:
+        """Open the journal file for writing, rewriting the valid entries."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = self.path.open(mode="w")
+        self._file.write(json.dumps(self.header) + "\n")
+        for relpath, entry in self.entries.items():
+            self._write(relpath, entry)
+        self.sync()
+
+    def __enter__(self) -> "Journal":
+        return self
+
+    def __exit__(self, *args: t.Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
+
+    def discard(self) -> None:
+        """Close and remove the journal, once the copy is completed."""
+        self.close()
+        self.path.unlink(missing_ok=True)
+        # don't leave an empty data directory behind
+        with contextlib.suppress(OSError):
+            self.path.parent.rmdir()
+
+    def sync(self) -> None:
+        """Flush the journal file to disk."""
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._nb_unsynced = 0
+
+    def _write(self, relpath: str, entry: JournalEntry) -> None:
+        assert self._file is not None
+        obj: t.Dict[str, t.Any] = {
+            "path": relpath,
+            "src": [entry.src_size, entry.src_mtime_ns],
+            "dst": [entry.dst_size, entry.dst_mtime_ns],
+        }
+        if entry.digest:
+            obj["digest"] = entry.digest
+        self._file.write(json.dumps(obj) + "\n")
+
+    def record(self, src_entry: ScanEntry, dst_path: Path, digest: t.Optional[str] = None) -> None:
+        """
+        Record the completed copy of a file.
+
+        :param src_entry: index entry of the source file.
+        :param dst_path: path of the copied file.
+        :param digest: digest of the copied file, if known.
+        """
+        stat = dst_path.stat()
+        entry = JournalEntry(src_entry.size, src_entry.mtime_ns, stat.st_size, stat.st_mtime_ns, digest)
+        self.entries[src_entry.relpath] = entry
+        self._write(src_entry.relpath, entry)
+        # each line is handed over to the OS right away, but only synced to disk from time to time
+        assert self._file is not None
+        self._file.flush()
+        self._nb_unsynced += 1
+        if self._nb_unsynced >= SYNC_INTERVAL:
+            self.sync()
+
+    def is_done(self, src_entry: ScanEntry, dst_path: Path) -> bool:
+        """
+        Check whether a file was already copied and neither the source nor the copy have changed since.
+        """
+        entry = self.entries.get(src_entry.relpath)
+        if entry is None or (entry.src_size, entry.src_mtime_ns) != (src_entry.size, src_entry.mtime_ns):
+            return False
+        try:
+            stat = dst_path.stat()
+        except OSError:
+            return False
+        return (entry.dst_size, entry.dst_mtime_ns) == (stat.st_size, stat.st_mtime_ns)
@@ -0,0 +1,133 @@
+"""
+Module to write the log messages of the installation from a background thread.
+
+The package logger only puts its records in a queue, so that logging a message from the copy loop doesn't wait
+for a slow log directory (e.g. on a network drive) or for the user interface. A single listener thread hands
+the records over to the actual handlers: the console, the log file and the events of the user interface.
+
+The log files are written in batches: a `BufferedFileHandler` doesn't flush the file after each record,
+the listener flushes the handlers once the queue is empty. The errors are flushed right away, and the queue is
+flushed at exit, so that no message is lost if the installation fails.
+"""
+
+import atexit
+import logging
+import queue
+import threading
+import typing as t
+from logging.handlers import QueueHandler, QueueListener
+
+
+class BufferedFileHandler(logging.FileHandler):
+    """
+    File handler leaving the file buffer flushes to its caller, except for the error messages.
+    """
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if self.stream is None:
+            self.stream = self._open()
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+            if record.levelno >= logging.ERROR:
+                self.stream.flush()
+        except Exception:
+            self.handleError(record)
+
+
+def _flush(handler: logging.Handler) -> None:
+    try:
+        handler.flush()
+    except (OSError, ValueError):
+        # the stream of a handler may already be closed at exit
+        pass
+
+
+class _BatchListener(QueueListener):
+    """
+    Queue listener flushing its handlers at the end of each batch of records, i.e. when the queue is empty.
+    """
+
+    def __init__(self, records: "queue.Queue[logging.LogRecord]", respect_handler_level: bool = False):
+        super().__init__(records, respect_handler_level=respect_handler_level)
+        # `QueueListener.queue` is only typed as a queue supporting `get` and `put_nowait`
+        self._records = records
+
+    def handle(self, record: logging.LogRecord) -> None:
+        super().handle(record)
+        if self._records.empty():
+            for handler in self.handlers:
+                _flush(handler)
+
+
+class LogQueue:
+    """
+    Forward the log records of a logger to its handlers from a background thread.
+
+    The handlers can be added and removed at any time: the listener thread is started with the first handler.
+    The records are only queued if a handler would accept their level.
+
+    Attributes:
+        logger: logger whose records are queued.
+    """
+
+    def __init__(self, logger: logging.Logger):
+        self.logger = logger
+        self._queue: "queue.Queue[logging.LogRecord]" = queue.Queue()
+        self._queue_handler = QueueHandler(self._queue)
+        self._listener = _BatchListener(self._queue, respect_handler_level=True)
+        self._lock = threading.Lock()
+        self._started = False
+
+    @property
+    def handlers(self) -> t.Tuple[logging.Handler, ...]:
+        return self._listener.handlers
+
+    def add_handler(self, handler: logging.Handler) -> None:
+        with self._lock:
+            # the listener thread reads the tuple of handlers, which is replaced rather than modified
+            self._listener.handlers = self._listener.handlers + (handler,)
+            self._update_level()
+            if not self._started:
+                self.logger.addHandler(self._queue_handler)
+                self._listener.start()
+                atexit.register(self.stop)
+                self._started = True
+
+    def remove_handler(self, handler: logging.Handler) -> None:
+        """
+        Remove a handler once the records already queued are handled, so that it can be closed.
+        """
+        self.flush()
+        with self._lock:
+            self._listener.handlers = tuple(h for h in self._listener.handlers if h is not handler)
+            self._update_level()
+        # the listener may be handling a record with the previous handlers
+        self.flush()
+        _flush(handler)
+
+    def flush(self) -> None:
+        """
+        Wait until the queued records are handled and written.
+
+        This method must not be called by a handler, since it would wait for itself.
+        """
+        if self._started:
+            self._queue.join()
+
+    def stop(self) -> None:
+        """
+        Handle the queued records, then stop the listener thread and flush the handlers.
+        """
+        with self._lock:
+            if not self._started:
+                return
+            self.logger.removeHandler(self._queue_handler)
+            self._listener.stop()
+            self._started = False
+            atexit.unregister(self.stop)
+        for handler in self._listener.handlers:
+            _flush(handler)
+
+    def _update_level(self) -> None:
+        levels = [handler.level for handler in self._listener.handlers]
+        self._queue_handler.setLevel(min(levels, default=logging.NOTSET))
@@ -0,0 +1,212 @@
+"""
+Module to track the program files installed in the target directory.
+
+The manifest records the size, the modification time and the content hash of the installed files.
+It is used during an upgrade to find the files of the new bundle which were added or changed,
+so that only those files need to be copied.
+"""
+
+import dataclasses
+import hashlib
+import json
+import os
+import typing as t
+from pathlib import Path
+
+from antares_web_installer.scanner import ScanEntry, TreeIndex
+
+HASH_ALGORITHM = "sha256"
+MANIFEST_VERSION = 1
+
+CHECKSUMS_FILE = "SHA256SUMS"
+"""Checksum manifest which can be shipped with the bundle, in the format of `sha256sum`."""
+
+
+def hash_file(path: Path) -> str:
+    """
+    Compute the hexadecimal digest of a file content.
+
+    :param path: path of the file to hash.
+    :return: hexadecimal digest computed with `HASH_ALGORITHM`.
+    """
+    with path.open(mode="rb") as f:
+        return hashlib.file_digest(f, HASH_ALGORITHM).hexdigest()
+
+
+def load_checksums(path: Path) -> t.Dict[str, str]:
+    """
+    Load a checksum manifest in the format of `sha256sum`: one "<digest>  <path>" line per file.
+
+    :param path: path of the checksum manifest.
+    :return: the expected digests indexed by POSIX path relative to the root of the bundle.
+    :raise OSError: if the file can't be read.
+    :raise ValueError: if a line is invalid.
+    """
+    checksums = {}
+    for lineno, line in enumerate(path.read_text().splitlines(), start=1):
+        if not line.strip() or line.startswith("#"):
+            continue
+        digest, _, name = line.partition(" ")
+        # the second separator is a space for a text mode checksum, or a star for a binary mode checksum
+        name = name[1:] if name[:1] in {" ", "*"} else name
+        relpath = name.replace("\\", "/").removeprefix("./")
+        if not relpath or len(digest) != hashlib.new(HASH_ALGORITHM).digest_size * 2:
+            raise ValueError(f"Invalid checksum at line {lineno}: {line!r}")
+        checksums[relpath] = digest.lower()
+    return checksums
+
+
+@dataclasses.dataclass(frozen=True)
+class FileEntry:
+    """
+    Description of an installed file.
+
+    Attributes:
+        size: size of the file in bytes.
+        mtime_ns: modification time of the file in nanoseconds.
+        digest: hexadecimal digest of the file content.
+    """
+
+    size: int
+    mtime_ns: int
+    digest: str
+
+    def matches(self, stat: os.stat_result) -> bool:
+        """Check whether the recorded entry still describes the file with the given status."""
+        return self.size == stat.st_size and self.mtime_ns == stat.st_mtime_ns
+
+
+class Manifest:
+    """
+    Manifest of the installed files, indexed by their POSIX path relative to the target directory.
+
+    The digests are computed lazily: an entry is only (re)computed when the recorded size or
+    modification time doesn't match the file on disk anymore, so that unchanged installed files
+    don't need to be read again during an upgrade.
+    """
+
+    def __init__(self, entries: t.Optional[t.Mapping[str, FileEntry]] = None):
+        self.entries: t.Dict[str, FileEntry] = dict(entries or {})
+
+    @classmethod
+    def load(cls, path: Path) -> "Manifest":
+        """
+        Load a manifest from a JSON file.
+
+        A missing or unreadable manifest is considered empty: all digests will be recomputed.
+        """
+        try:
+            with path.open(mode="r") as f:
+                obj = json.load(f)
+            if obj.get("version") != MANIFEST_VERSION or obj.get("algorithm") != HASH_ALGORITHM:
+                return cls()
+            entries = {relpath: FileEntry(**entry) for relpath, entry in obj["files"].items()}
+        except (OSError, ValueError, KeyError, TypeError):
+            return cls()
+        return cls(entries)
+
+    def save(self, path: Path) -> None:
+        """Save the manifest in a JSON file, creating the parent directory if needed."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        obj = {
+            "version": MANIFEST_VERSION,
+            "algorithm": HASH_ALGORITHM,
+            "files": {relpath: dataclasses.asdict(entry) for relpath, entry in sorted(self.entries.items())},
+        }
+        tmp_path = path.with_name(path.name + ".tmp")
+        with tmp_path.open(mode="w") as f:
+            json.dump(obj, f, indent=1)
+        os.replace(tmp_path, path)
+
+    def digest(self, relpath: str, path: Path, stat: t.Optional[os.stat_result] = None) -> str:
+        """
+        Return the digest of an installed file, using the recorded entry if it is still valid.
+
+        :param relpath: POSIX path of the file relative to the target directory.
+        :param path: path of the file.
+        :param stat: status of the file, if already known.
+        :return: hexadecimal digest of the file content.
+        """
+        stat = stat or path.stat()
+        entry = self.entries.get(relpath)
+        if entry is None or not entry.matches(stat):
+            entry = FileEntry(size=stat.st_size, mtime_ns=stat.st_mtime_ns, digest=hash_file(path))
+            self.entries[relpath] = entry
+        return entry.digest
+
+    def record(self, relpath: str, path: Path, digest: t.Optional[str] = None) -> None:
+        """
+        Record (or update) the entry of a newly installed file.
+
+        :param relpath: POSIX path of the file relative to the target directory.
+        :param path: path of the file.
+        :param digest: digest of the file content, if already known.
+        """
+        stat = path.stat()
+        digest = digest or hash_file(path)
+        self.entries[relpath] = FileEntry(size=stat.st_size, mtime_ns=stat.st_mtime_ns, digest=digest)
+
+    def retain(self, relpaths: t.Iterable[str]) -> None:
+        """Forget the entries of the files which are not part of the given paths."""
+        keep = set(relpaths)
+        self.entries = {relpath: entry for relpath, entry in self.entries.items() if relpath in keep}
+
+
+@dataclasses.dataclass
+class CopyPlan:
+    """
+    Result of the comparison between the source bundle and the installed tree.
+
+    Attributes:
+        changed: POSIX paths of the files which were added or changed in the source bundle.
+        unchanged: POSIX paths of the files which are identical in both trees.
+        bytes_to_copy: total size of the files to copy.
+    """
+
+    changed: t.List[str] = dataclasses.field(default_factory=list)
+    unchanged: t.List[str] = dataclasses.field(default_factory=list)
+    bytes_to_copy: int = 0
+
+
+def _is_unchanged(src_path: Path, src_entry: ScanEntry, dst_path: Path, manifest: Manifest) -> bool:
+    try:
+        dst_stat = dst_path.stat()
+    except FileNotFoundError:
+        return False
+    if src_entry.size != dst_stat.st_size:
+        return False
+    # The installed files keep the modification time of their source: like rsync, a source file with the size
+    # and the modification time of an untouched installed file is considered unchanged without being read
+    entry = manifest.entries.get(src_entry.relpath)
+    if entry is not None and entry.matches(dst_stat) and entry.mtime_ns == src_entry.mtime_ns:
+        return True
+    # Otherwise only the source is read: the digest of the installed file is usually known by the manifest
+    return hash_file(src_path) == manifest.digest(src_entry.relpath, dst_path, dst_stat)
+
+
+def plan_copy(
+    index: TreeIndex,
+    target_dir: Path,
+    manifest: Manifest,
+    skip: t.Optional[t.Callable[[ScanEntry], bool]] = None,
+) -> CopyPlan:
+    """
+    Compare the program files of the source bundle with the installed tree to find the files to copy.
+
+    :param index: index of the source bundle, the excluded resources are ignored.
+    :param target_dir: installation directory.
+    :param manifest: manifest of the installed tree, updated with the digests computed during the comparison.
+    :param skip: function telling whether a file must be left out of the plan (e.g. because it is already copied).
+    :return: the plan of the files to copy.
+    """
+    plan = CopyPlan()
+    for entry in index.iter_files(include_excluded=False):
+        if skip is not None and skip(entry):
+            continue
+        src_path = index.root.joinpath(entry.relpath)
+        if _is_unchanged(src_path, entry, target_dir.joinpath(entry.relpath), manifest):
+            plan.unchanged.append(entry.relpath)
+        else:
+            plan.changed.append(entry.relpath)
+            plan.bytes_to_copy += entry.size
+    return plan
@@ -0,0 +1,305 @@
+"""
+Module to find the running processes of an Antares Web Server installation.
+
+A process belongs to the installation if it runs the server executable of the installation directory
+and belongs to the current user: the servers of other installations or of other users are left alone.
+
+When the installer launches a server, it records it in a lock file of the installation directory,
+so that the server can be found and validated in constant time; all the processes are only scanned
+if there is no lock file or if the recorded process is not the server anymore.
+
+The servers are stopped gracefully: they are all asked to terminate at once, so that they can complete
+their pending writes, and only the processes which are still alive after a deadline are killed.
+
+The processes are described in a single pass, prefetching the attributes needed to identify them.
+On Linux, the `/proc` file system is read directly: the owner of a process is given by the status
+of its `/proc/<pid>` directory and its executable by the `/proc/<pid>/exe` link, so that the processes
+of the other users are skipped without any further system call. Elsewhere, `psutil.process_iter`
+is used with the same identification rules.
+"""
+
+import dataclasses
+import json
+import os
+import socket
+import sys
+import time
+import typing as t
+from pathlib import Path
+
+import psutil
+
+PROC_DIR = Path("/proc")
+
+PREFETCHED_ATTRS = ["name", "exe", "cwd", "username"]
+"""Process attributes fetched by `psutil.process_iter` to identify the server processes."""
+
+DEFAULT_STOP_TIMEOUT = 10.0
+"""Time in seconds given to the servers to terminate before they are killed."""
+
+KILL_TIMEOUT = 5.0
+"""Time in seconds to wait for the killed processes to exit."""
+
+_DELETED_SUFFIX = " (deleted)"
+
+
+def _normalize(path: t.Union[str, Path]) -> str:
+    return os.path.normcase(os.path.realpath(path))
+
+
+@dataclasses.dataclass(frozen=True)
+class ProcessInfo:
+    """
+    Attributes of a running process used to identify it, `None` if they can't be read.
+
+    Attributes:
+        pid: process identifier.
+        name: name of the process.
+        exe: path of the executable.
+        cwd: working directory.
+        username: name of the owner.
+    """
+
+    pid: int
+    name: t.Optional[str] = None
+    exe: t.Optional[str] = None
+    cwd: t.Optional[str] = None
+    username: t.Optional[str] = None
+
+
+@dataclasses.dataclass(frozen=True)
+class ServerLock:
+    """
+    Description of the server launched by the installer, recorded in the installation directory.
+
+    Attributes:
+        pid: process identifier of the server.
+        create_time: creation time of the process, which tells it apart from a process reusing the same identifier.
+        port: port the server listens to.
+        exe: path of the server executable.
+    """
+
+    pid: int
+    create_time: float
+    port: int
+    exe: str
+
+    @classmethod
+    def load(cls, path: Path) -> t.Optional["ServerLock"]:
+        """Load a lock file, `None` if it is missing or invalid."""
+        try:
+            return cls(**json.loads(path.read_text()))
+        except (OSError, ValueError, TypeError):
+            return None
+
+    def save(self, path: Path) -> None:
+        """Save the lock file, creating the parent directory if needed."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        tmp_path.write_text(json.dumps(dataclasses.asdict(self), indent=1))
+        os.replace(tmp_path, path)
+
+
+class ServerFinder:
+    """
+    Find the server processes running the executable of an installation, for the current user.
+    """
+
+    def __init__(self, server_path: Path, target_dir: Path):
+        self.server_path = _normalize(server_path)
+        self.server_name = os.path.normcase(server_path.name)
+        self._resolved_name = os.path.basename(self.server_path)
+        self.target_dir = _normalize(target_dir)
+        self.username = psutil.Process().username()
+
+    def matches(self, info: ProcessInfo) -> bool:
+        """
+        Check whether a process is a server of the installation, run by the current user.
+
+        The executable identifies the server. If it can't be read, a process with the name of the server
+        running in the installation directory is considered a server.
+        """
+        if info.username != self.username:
+            return False
+        if info.exe:
+            # the executable of a server which was running during an upgrade has been replaced
+            exe = info.exe.removesuffix(_DELETED_SUFFIX)
+            # the name is compared first, so that the paths of the other processes are not resolved
+            if os.path.normcase(os.path.basename(exe)) != self._resolved_name:
+                return False
+            return _normalize(exe) == self.server_path
+        if not info.name or not info.cwd or os.path.normcase(info.name) != self.server_name:
+            return False
+        cwd = _normalize(info.cwd)
+        return cwd == self.target_dir or cwd.startswith(self.target_dir + os.sep)
+
+    def find(self, lock_path: t.Optional[Path] = None) -> t.List[psutil.Process]:
+        """
+        Find the running server processes.
+
+        :param lock_path: path of the lock file of the server launched by the installer, if any.
+        :return: the processes, which can be used to stop them.
+        """
+        if lock_path is not None:
+            processes = self.find_locked(lock_path)
+            if processes is not None:
+                return processes
+        return self.scan()
+
+    def find_locked(self, lock_path: Path) -> t.Optional[t.List[psutil.Process]]:
+        """
+        Find the server recorded in a lock file, with its child processes.
+
+        :param lock_path: path of the lock file.
+        :return: the processes, or `None` if there is no lock file or if it is stale, in which case it is removed.
+        """
+        lock = ServerLock.load(lock_path)
+        if lock is None:
+            return None
+        try:
+            process = psutil.Process(lock.pid)
+            with process.oneshot():
+                info = ProcessInfo(lock.pid, exe=process.exe(), username=process.username())
+                if process.create_time() == lock.create_time and self.matches(info):
+                    # e.g. the process unpacked by a one-file executable
+                    return [process, *process.children(recursive=True)]
+        except psutil.Error:
+            pass
+        lock_path.unlink(missing_ok=True)
+        return None
+
+    def record(self, process: psutil.Process, port: int, lock_path: Path) -> t.Optional[ServerLock]:
+        """
+        Record a launched server in a lock file.
+
+        :param process: the launched process, which may be a shell running the server.
+        :param port: port the server listens to.
+        :param lock_path: path of the lock file.
+        :return: the recorded lock, or `None` if neither the process nor its children run the server.
+        """
+        try:
+            for candidate in (process, *process.children(recursive=True)):
+                with candidate.oneshot():
+                    exe = candidate.exe()
+                    if self.matches(ProcessInfo(candidate.pid, exe=exe, username=candidate.username())):
+                        lock = ServerLock(candidate.pid, candidate.create_time(), port, exe)
+                        lock.save(lock_path)
+                        return lock
+        except psutil.Error:
+            pass
+        return None
+
+    def scan(self) -> t.List[psutil.Process]:
+        """
+        Find the running server processes by scanning all the processes.
+        """
+        infos = self.iter_proc() if sys.platform.startswith("linux") and PROC_DIR.is_dir() else self.iter_psutil()
+        processes = []
+        for info in infos:
+            if self.matches(info):
+                try:
+                    processes.append(psutil.Process(info.pid))
+                except psutil.NoSuchProcess:
+                    continue
+        return processes
+
+    def iter_psutil(self) -> t.Iterator[ProcessInfo]:
+        """Describe the running processes with `psutil`, unreadable attributes being `None`."""
+        for process in psutil.process_iter(PREFETCHED_ATTRS, ad_value=None):
+            yield ProcessInfo(process.pid, **process.info)
+
+    def iter_proc(self) -> t.Iterator[ProcessInfo]:
+        """Describe the running processes of the current user by reading `/proc`."""
+        uid = os.getuid()
+        with os.scandir(PROC_DIR) as it:
+            for entry in it:
+                if not entry.name.isdigit():
+                    continue
+                try:
+                    if entry.stat().st_uid != uid:
+                        continue
+                    exe = os.readlink(os.path.join(entry.path, "exe"))
+                except OSError:
+                    # the process is gone, or it is a kernel thread or a zombie, which have no executable
+                    continue
+                yield ProcessInfo(int(entry.name), exe=exe, username=self.username)
+
+
+def stop_processes(
+    processes: t.Sequence[psutil.Process],
+    timeout: float = DEFAULT_STOP_TIMEOUT,
+    kill_timeout: float = KILL_TIMEOUT,
+) -> t.List[psutil.Process]:
+    """
+    Stop processes gracefully: all of them are asked to terminate, then the survivors are killed after a deadline.
+
+    On Windows, terminating a process kills it.
+
+    :param processes: processes to stop.
+    :param timeout: time in seconds given to the processes to terminate.
+    :param kill_timeout: time in seconds to wait for the killed processes to exit.
+    :return: the processes which are still alive.
+    """
+    for process in processes:
+        try:
+            process.terminate()
+        except psutil.NoSuchProcess:
+            continue
+    _, alive = psutil.wait_procs(processes, timeout=timeout)
+    if not alive:
+        return []
+    for process in alive:
+        try:
+            process.kill()
+        except psutil.NoSuchProcess:
+            continue
+    _, alive = psutil.wait_procs(alive, timeout=kill_timeout)
+    return alive
+
+
+def is_port_free(host: str, port: int) -> bool:
+    """Check whether a server could listen to a port, by binding a socket to it."""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    with socket.socket(family, socket.SOCK_STREAM) as sock:
+        if os.name == "posix":
+            # like the servers, ignore the connections of a stopped server which are still closing (TIME_WAIT)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            sock.bind((host, port))
+        except OSError:
+            return False
+    return True
+
+
+def wait_port_released(host: str, port: int, timeout: float, interval: float = 0.1) -> bool:
+    """
+    Wait until a port is released by a stopped server.
+
+    :return: whether the port is free before the deadline.
+    """
+    deadline = time.monotonic() + timeout
+    while not is_port_free(host, port):
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(interval)
+    return True
+
+
+def find_port_holder(port: int) -> t.Optional[ProcessInfo]:
+    """
+    Find the process listening to a TCP port.
+
+    :return: the description of the process, or `None` if it can't be found, e.g. if it belongs to another user.
+    """
+    try:
+        connections = psutil.net_connections(kind="tcp")
+    except psutil.AccessDenied:
+        return None
+    for conn in connections:
+        if conn.status == psutil.CONN_LISTEN and conn.laddr and conn.laddr.port == port and conn.pid is not None:
+            try:
+                process = psutil.Process(conn.pid)
+                return ProcessInfo(conn.pid, **process.as_dict(PREFETCHED_ATTRS, ad_value=None))
+            except psutil.NoSuchProcess:
+                continue
+    return None
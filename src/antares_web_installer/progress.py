@@ -0,0 +1,103 @@
+"""
+Module to measure the progress of a file transfer in bytes.
+
+The progress is reported with the current throughput and an estimation of the remaining time,
+so that a slow disk can be told apart from a hung installation.
+"""
+
+import time
+import typing as t
+
+REPORT_INTERVAL = 0.5
+"""Minimum delay in seconds between two progress reports."""
+
+SMOOTHING_FACTOR = 0.3
+"""Weight of the last measure in the exponential moving average of the throughput."""
+
+
+def format_size(nbytes: float) -> str:
+    """
+    Format a size in bytes using a human-readable unit (e.g. "12.3 MB").
+    """
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(nbytes) < 1024 or unit == "GB":
+            break
+        nbytes /= 1024
+    return f"{nbytes:.0f} {unit}" if unit == "B" else f"{nbytes:.1f} {unit}"
+
+
+def format_duration(seconds: float) -> str:
+    """
+    Format a duration in seconds (e.g. "2 min 05 s").
+    """
+    minutes, seconds = divmod(round(seconds), 60)
+    return f"{minutes} min {seconds:02d} s" if minutes else f"{seconds} s"
+
+
+class TransferProgress:
+    """
+    Progress of a transfer of a known number of bytes.
+
+    Attributes:
+        total_bytes: number of bytes to transfer, computed by scanning the source before the transfer.
+        done_bytes: number of bytes already transferred.
+        throughput: smoothed throughput in bytes per second, measured between two reports.
+    """
+
+    def __init__(
+        self,
+        total_bytes: int,
+        report_interval: float = REPORT_INTERVAL,
+        clock: t.Callable[[], float] = time.monotonic,
+    ):
+        self.total_bytes = total_bytes
+        self.done_bytes = 0
+        self.throughput = 0.0
+        self._report_interval = report_interval
+        self._clock = clock
+        self._last_time = self._clock()
+        self._last_bytes = 0
+
+    @property
+    def fraction(self) -> float:
+        """Fraction of the bytes already transferred, between 0 and 1."""
+        return min(self.done_bytes / self.total_bytes, 1.0) if self.total_bytes else 1.0
+
+    @property
+    def eta(self) -> t.Optional[float]:
+        """Estimated remaining time in seconds, or `None` if the throughput is not known yet."""
+        if not self.throughput:
+            return None
+        return max(self.total_bytes - self.done_bytes, 0) / self.throughput
+
+    def advance(self, nbytes: int) -> bool:
+        """
+        Account for newly transferred bytes.
+
+        :param nbytes: number of bytes transferred since the previous call.
+        :return: whether a report is due, which happens at most every `report_interval` seconds
+            and when the transfer is complete.
+        """
+        self.done_bytes += nbytes
+        now = self._clock()
+        elapsed = now - self._last_time
+        completed = self.done_bytes >= self.total_bytes
+        if elapsed < self._report_interval and not completed:
+            return False
+        if elapsed > 0:
+            rate = (self.done_bytes - self._last_bytes) / elapsed
+            self.throughput = (
+                rate if not self.throughput else SMOOTHING_FACTOR * rate + (1 - SMOOTHING_FACTOR) * self.throughput
+            )
+        self._last_time = now
+        self._last_bytes = self.done_bytes
+        return True
+
+    def __str__(self) -> str:
+        text = f"{format_size(self.done_bytes)} / {format_size(self.total_bytes)}"
+        if self.throughput:
+            text += f", {format_size(self.throughput)}/s"
+        eta = self.eta
+        if eta is not None and self.done_bytes < self.total_bytes:
+            text += f", {format_duration(eta)} remaining"
+        return text
@@ -0,0 +1,167 @@
+"""
+Module to wait until a launched server is ready to serve requests.
+
+The server is first probed with a plain TCP connection, which fails fast while the server is not listening yet,
+then with HTTP requests to its health check endpoint, sent over a single session so that the connection is reused.
+The probes are scheduled with an exponential backoff: a server which starts quickly is detected within
+a few tens of milliseconds, and a slow server is not flooded with requests.
+"""
+
+import dataclasses
+import socket
+import threading
+import time
+import typing as t
+from urllib.parse import urlsplit
+
+import requests
+
+INITIAL_DELAY = 0.05
+"""Delay in seconds between the first probes."""
+
+MAX_DELAY = 1.0
+"""Maximum delay in seconds between two probes."""
+
+CONNECT_TIMEOUT = 0.5
+"""Timeout in seconds of the TCP connections."""
+
+REQUEST_TIMEOUT = 5.0
+"""Timeout in seconds of the HTTP responses."""
+
+ProbeCallback = t.Callable[[int, str], None]
+"""Function called with the number and the failure reason of each failed probe."""
+
+ProbeTraceCallback = t.Callable[[int, float, t.Optional[str]], None]
+"""Function called with the number, the duration and the failure reason, if any, of each probe."""
+
+
+class ReadinessError(Exception):
+    """
+    Exception raised when a server is not ready.
+    """
+
+
+class ServerExitedError(ReadinessError):
+    """
+    Exception raised when the server exits, or reports a failure, before being ready.
+    """
+
+
+class ReadinessTimeout(ReadinessError):
+    """
+    Exception raised when the server is not ready before the deadline.
+    """
+
+
+@dataclasses.dataclass(frozen=True)
+class ProbeResult:
+    """
+    Result of the readiness detection.
+
+    Attributes:
+        elapsed: time in seconds until the server was ready.
+        nb_probes: number of probes sent.
+    """
+
+    elapsed: float
+    nb_probes: int
+
+
+def _ignore(_nb_probes: int, _reason: str) -> None:
+    pass
+
+
+def _ignore_trace(_nb_probes: int, _elapsed: float, _reason: t.Optional[str]) -> None:
+    pass
+
+
+def _always_alive() -> bool:
+    return True
+
+
+@dataclasses.dataclass
+class ReadinessProber:
+    """
+    Wait until the health check endpoint of a server answers successfully.
+
+    Attributes:
+        url: URL of the health check endpoint.
+        timeout: maximum time in seconds to wait for the server.
+        initial_delay: delay in seconds between the first probes, doubled after each failure.
+        max_delay: maximum delay in seconds between two probes.
+        connect_timeout: timeout in seconds of the connections.
+        request_timeout: timeout in seconds of the responses.
+    """
+
+    url: str
+    timeout: float
+    initial_delay: float = INITIAL_DELAY
+    max_delay: float = MAX_DELAY
+    connect_timeout: float = CONNECT_TIMEOUT
+    request_timeout: float = REQUEST_TIMEOUT
+
+    def wait(
+        self,
+        is_alive: t.Callable[[], bool] = _always_alive,
+        on_failure: ProbeCallback = _ignore,
+        wakeup: t.Optional[threading.Event] = None,
+        on_probe: ProbeTraceCallback = _ignore_trace,
+    ) -> ProbeResult:
+        """
+        Probe the server until it is ready.
+
+        :param is_alive: function telling whether the server is still running and starting.
+        :param on_failure: function called after each failed probe.
+        :param wakeup: event interrupting the delay before the next probe, e.g. when the server reports its state.
+        :param on_probe: function called after each probe, to measure the probes.
+        :return: the time until the server was ready and the number of probes.
+        :raise ServerExitedError: if the server process exits.
+        :raise ReadinessTimeout: if the server is not ready before the deadline.
+        """
+        start = time.monotonic()
+        deadline = start + self.timeout
+        delay = self.initial_delay
+        listening = False
+        nb_probes = 0
+        with requests.Session() as session:
+            while True:
+                if not is_alive():
+                    raise ServerExitedError(f"The server exited before being ready after {nb_probes} probe(s)")
+                nb_probes += 1
+                probe_start = time.monotonic()
+                remaining = max(deadline - probe_start, 0.001)
+                # once the server listens, only the HTTP probes are sent
+                listening = listening or self._is_listening(min(self.connect_timeout, remaining))
+                reason = self._probe_http(session, remaining) if listening else "not listening"
+                on_probe(nb_probes, time.monotonic() - probe_start, reason)
+                if reason is None:
+                    return ProbeResult(time.monotonic() - start, nb_probes)
+                on_failure(nb_probes, reason)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise ReadinessTimeout(f"The server is not ready after {self.timeout:g} seconds: {reason}")
+                if wakeup is None:
+                    time.sleep(min(delay, remaining))
+                elif wakeup.wait(min(delay, remaining)):
+                    wakeup.clear()
+                delay = min(delay * 2, self.max_delay)
+
+    def _is_listening(self, timeout: float) -> bool:
+        parts = urlsplit(self.url)
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        try:
+            with socket.create_connection((parts.hostname, port), timeout=timeout):
+                return True
+        except OSError:
+            return False
+
+    def _probe_http(self, session: requests.Session, remaining: float) -> t.Optional[str]:
+        """Send a HTTP probe, and return the reason of the failure, if any."""
+        timeout = (min(self.connect_timeout, remaining), min(self.request_timeout, remaining))
+        try:
+            res = session.get(self.url, timeout=timeout)
+        except requests.RequestException as e:
+            return f"error while requesting {self.url}: {e}"
+        if res.status_code != 200:
+            return f"got HTTP status code {res.status_code} while requesting {self.url}: {res.text[:200]}"
+        return None
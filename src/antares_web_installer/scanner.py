@@ -0,0 +1,135 @@
+"""
+Module to scan a source tree once and keep an in-memory index of its content.
+
+The copy, the progress report, the disk space check and the installation report all read
+the sizes and types of the files from this index, instead of querying the file system again.
+The tree is walked with `os.scandir`, which gets the file types from the directory listing,
+so that only one `stat` call is made per file (none on Windows).
+"""
+
+import dataclasses
+import os
+import typing as t
+from pathlib import Path, PurePosixPath
+
+from antares_web_installer.progress import format_size
+
+
+@dataclasses.dataclass(frozen=True)
+class ScanEntry:
+    """
+    File or directory of the scanned tree.
+
+    Attributes:
+        relpath: POSIX path relative to the root of the tree.
+        is_dir: whether the entry is a directory.
+        size: size of the file in bytes, 0 for a directory.
+        mode: permission bits.
+        mtime_ns: modification time in nanoseconds.
+        excluded: whether the entry belongs to an excluded top-level resource.
+    """
+
+    relpath: str
+    is_dir: bool
+    size: int
+    mode: int
+    mtime_ns: int
+    excluded: bool
+
+    @property
+    def root(self) -> str:
+        """Name of the top-level resource containing the entry."""
+        return PurePosixPath(self.relpath).parts[0]
+
+
+@dataclasses.dataclass
+class TreeIndex:
+    """
+    Index of a scanned tree.
+
+    Attributes:
+        root: path of the scanned directory.
+        entries: entries indexed by relative path, listed in walk order (parent directories first).
+    """
+
+    root: Path
+    entries: t.Dict[str, ScanEntry] = dataclasses.field(default_factory=dict)
+
+    def iter_entries(
+        self,
+        include_excluded: bool = True,
+        roots: t.Optional[t.Collection[str]] = None,
+    ) -> t.Iterator[ScanEntry]:
+        """
+        Iterate over the entries in walk order.
+
+        :param include_excluded: whether to include the entries of the excluded resources.
+        :param roots: names of the top-level resources to select, by default all of them.
+        """
+        for entry in self.entries.values():
+            if (include_excluded or not entry.excluded) and (roots is None or entry.root in roots):
+                yield entry
+
+    def iter_files(
+        self,
+        include_excluded: bool = True,
+        roots: t.Optional[t.Collection[str]] = None,
+    ) -> t.Iterator[ScanEntry]:
+        """Iterate over the file entries in walk order, see `iter_entries`."""
+        return (entry for entry in self.iter_entries(include_excluded, roots) if not entry.is_dir)
+
+    def top_level(self, include_excluded: bool = True) -> t.List[ScanEntry]:
+        """List the top-level entries."""
+        return [entry for entry in self.iter_entries(include_excluded) if "/" not in entry.relpath]
+
+    def total_size(self, include_excluded: bool = True, roots: t.Optional[t.Collection[str]] = None) -> int:
+        """Compute the total size of the files, see `iter_entries`."""
+        return sum(entry.size for entry in self.iter_files(include_excluded, roots))
+
+    def describe(self) -> str:
+        """Summarize the content of the tree, e.g. "1200 files (3 excluded), 80 directories, 210.5 MB..."."""
+        nb_dirs = sum(entry.is_dir for entry in self.entries.values())
+        nb_files = len(self.entries) - nb_dirs
+        nb_excluded = sum(not entry.is_dir and entry.excluded for entry in self.entries.values())
+        total_size = format_size(self.total_size())
+        program_size = format_size(self.total_size(include_excluded=False))
+        return (
+            f"{nb_files} files ({nb_excluded} excluded), {nb_dirs} directories,"
+            f" {total_size} ({program_size} of program files)"
+        )
+
+
+def scan_tree(root: Path, excluded: t.Collection[Path] = ()) -> TreeIndex:
+    """
+    Scan a directory tree, following symbolic links like `shutil.copytree` does by default.
+
+    :param root: directory to scan.
+    :param excluded: top-level resources to flag as excluded.
+    :return: the index of the tree.
+    :raise OSError: if a directory can't be listed or a file can't be read.
+    """
+    excluded_names = {path.as_posix() for path in excluded}
+    index = TreeIndex(root)
+    stack: t.List[t.Tuple[str, str, bool]] = [(os.fspath(root), "", False)]
+    while stack:
+        dir_path, dir_relpath, dir_excluded = stack.pop()
+        subdirs = []
+        with os.scandir(dir_path) as it:
+            for dir_entry in sorted(it, key=lambda e: e.name):
+                relpath = f"{dir_relpath}/{dir_entry.name}" if dir_relpath else dir_entry.name
+                is_excluded = dir_excluded or (not dir_relpath and dir_entry.name in excluded_names)
+                stat = dir_entry.stat()
+                is_dir = dir_entry.is_dir()
+                index.entries[relpath] = ScanEntry(
+                    relpath=relpath,
+                    is_dir=is_dir,
+                    size=0 if is_dir else stat.st_size,
+                    mode=stat.st_mode,
+                    mtime_ns=stat.st_mtime_ns,
+                    excluded=is_excluded,
+                )
+                if is_dir:
+                    subdirs.append((dir_entry.path, relpath, is_excluded))
+        # depth-first walk, in alphabetical order
+        stack.extend(reversed(subdirs))
+    return index
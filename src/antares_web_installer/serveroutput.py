@@ -0,0 +1,99 @@
+"""
+Module to watch the output of a launched server during its startup.
+
+The output of the server is written to a log file, which is followed in the background: its last lines are kept
+in a bounded buffer, and each line is compared with known patterns. A "startup complete" line means that
+the server is ready, and a fatal line (the port is already in use, a traceback...) means that it failed to start,
+so that the installer doesn't need to wait for the readiness deadline to report the failure with its cause.
+
+The server writes to the file directly rather than to a pipe, so that it can keep running and logging
+once the installer exits.
+"""
+
+import collections
+import re
+import threading
+import typing as t
+from pathlib import Path
+
+DEFAULT_TAIL_SIZE = 20
+"""Number of lines of the output kept to report a failure."""
+
+READY_PATTERNS = [
+    re.compile(r"Application startup complete"),
+    re.compile(r"Uvicorn running on"),
+]
+"""Lines written by the server once it is ready."""
+
+FATAL_PATTERNS = [
+    re.compile(r"address already in use", re.IGNORECASE),
+    re.compile(r"only one usage of each socket address", re.IGNORECASE),
+    re.compile(r"error while attempting to bind", re.IGNORECASE),
+    re.compile(r"^Traceback \(most recent call last\)"),
+]
+"""Lines written by the server when it fails to start."""
+
+POLL_INTERVAL = 0.02
+"""Delay in seconds between two reads when the end of the output is reached."""
+
+
+class OutputMonitor:
+    """
+    Follow the output file of a server, keeping its last lines and detecting the readiness and the fatal errors.
+
+    Attributes:
+        path: path of the output file.
+        ready: whether a line telling that the server is ready was found.
+        fatal_line: first line telling that the server failed to start, if any.
+        event: event set when the server is ready or failed.
+    """
+
+    def __init__(self, path: Path, tail_size: int = DEFAULT_TAIL_SIZE):
+        self.path = path
+        self.ready = False
+        self.fatal_line: t.Optional[str] = None
+        self.event = threading.Event()
+        self._lines: t.Deque[str] = collections.deque(maxlen=tail_size)
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._follow, name="server-output", daemon=True)
+
+    def __enter__(self) -> "OutputMonitor":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args: t.Any) -> None:
+        self._stopped.set()
+        self._thread.join()
+
+    def tail(self) -> t.List[str]:
+        """Last lines of the output."""
+        return list(self._lines)
+
+    def feed(self, line: str) -> None:
+        """Process a line of the output."""
+        line = line.rstrip()
+        if not line:
+            return
+        self._lines.append(line)
+        if self.fatal_line is None and any(pattern.search(line) for pattern in FATAL_PATTERNS):
+            self.fatal_line = line
+            self.event.set()
+        elif not self.ready and any(pattern.search(line) for pattern in READY_PATTERNS):
+            self.ready = True
+            self.event.set()
+
+    def _follow(self) -> None:
+        pending = ""
+        with self.path.open(mode="r", encoding="utf-8", errors="replace") as f:
+            while True:
+                chunk = f.readline()
+                if chunk:
+                    pending += chunk
+                    if pending.endswith("\n"):
+                        self.feed(pending)
+                        pending = ""
+                elif self._stopped.wait(POLL_INTERVAL):
+                    # the remaining output is read before stopping
+                    for line in (pending + f.read()).splitlines():
+                        self.feed(line)
+                    return
@@ -0,0 +1,380 @@
+"""
+Module to take cheap snapshots of an installation before it is upgraded, and to restore them.
+
+A snapshot mirrors the content of the installation directory: program files, configuration and user data
+(studies, matrices...). Each file is cloned with a reflink when the file system supports it (Btrfs, XFS...),
+so that taking a snapshot costs one system call per file, whatever the size of the data.
+
+Otherwise (ext4, NTFS...), the program files are hard-linked: they share their content with the installed files,
+but the installer never rewrites them in place (they are always replaced by new ones), so that the snapshot keeps
+the content they had before the upgrade. The configuration, which the server modifies in place, is copied.
+The user data is left out of the snapshot: copying it would take too long, while the server is stopped,
+and too much disk space. The free disk space is checked before anything is copied.
+
+Restoring a snapshot doesn't lose the user data written since: the entries which are not in the snapshot are left
+untouched, the files created after the snapshot are put back in place, and the files modified after the snapshot
+are kept aside in the snapshot store.
+"""
+
+import contextlib
+import dataclasses
+import datetime
+import errno
+import json
+import os
+import shutil
+import stat
+import typing as t
+from pathlib import Path
+
+from antares_web_installer.fastcopy import SUPPORTED_STRATEGIES, CopyStrategy, FileCopier
+from antares_web_installer.progress import format_size
+
+SNAPSHOT_DESCRIPTION = "snapshot.json"
+SNAPSHOT_FILES_DIR = "files"
+
+DEFAULT_NB_SNAPSHOTS = 2
+"""Number of snapshots kept by default: the older ones are removed."""
+
+COPIED_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+"""Suffixes of the files which are modified in place, and must be copied instead of hard-linked."""
+
+REPLACED_SUFFIX = ".replaced"
+"""Suffix of the directory where the user data modified after a restored snapshot is kept."""
+
+
+class SnapshotError(Exception):
+    """
+    Exception raised when a snapshot can't be taken or restored.
+    """
+
+
+@dataclasses.dataclass(frozen=True)
+class Snapshot:
+    """
+    Snapshot of an installation.
+
+    Attributes:
+        path: directory of the snapshot.
+        version: version of the application when the snapshot was taken.
+        created: date and time of the snapshot (ISO 8601 format).
+        nb_files: number of files in the snapshot.
+        user_data: whether the user data is part of the snapshot, which requires reflinks.
+    """
+
+    path: Path
+    version: str
+    created: str
+    nb_files: int
+    user_data: bool = True
+
+    @property
+    def name(self) -> str:
+        return self.path.name
+
+    @property
+    def files_dir(self) -> Path:
+        """Directory containing the files of the installation."""
+        return self.path.joinpath(SNAPSHOT_FILES_DIR)
+
+    def __str__(self) -> str:
+        content = f"{self.nb_files} files" if self.user_data else f"{self.nb_files} files, without user data"
+        return f"{self.name} (version {self.version}, {content}, taken on {self.created})"
+
+
+class SnapshotStore:
+    """
+    Directory where the snapshots of an installation are kept, on the same file system as the installation.
+    """
+
+    def __init__(self, root_dir: Path):
+        self.root_dir = root_dir
+        self._file_copier = FileCopier([CopyStrategy.REFLINK])
+        self._reflink_supported = CopyStrategy.REFLINK in SUPPORTED_STRATEGIES
+
+    def list(self) -> t.List[Snapshot]:
+        """List the snapshots, from the oldest to the latest one. Incomplete snapshots are ignored."""
+        if not self.root_dir.is_dir():
+            return []
+        snapshots = []
+        for path in self.root_dir.iterdir():
+            try:
+                obj = json.loads(path.joinpath(SNAPSHOT_DESCRIPTION).read_text())
+                snapshots.append(
+                    Snapshot(path, obj["version"], obj["created"], obj["nb_files"], obj.get("user_data", True))
+                )
+            except (OSError, ValueError, KeyError):
+                continue
+        return sorted(snapshots, key=lambda snapshot: (snapshot.created, snapshot.name))
+
+    def get(self, name: t.Optional[str] = None) -> Snapshot:
+        """
+        Find a snapshot by name, or the latest snapshot if no name is given.
+
+        :raise SnapshotError: if the snapshot doesn't exist.
+        """
+        snapshots = self.list()
+        if name is None:
+            if not snapshots:
+                raise SnapshotError(f"No snapshot found in '{self.root_dir}'")
+            return snapshots[-1]
+        for snapshot in snapshots:
+            if snapshot.name == name:
+                return snapshot
+        raise SnapshotError(f"Snapshot '{name}' not found in '{self.root_dir}'")
+
+    def create(
+        self,
+        target_dir: Path,
+        version: str,
+        excluded: t.Collection[str] = (),
+        program_files: t.Collection[str] = (),
+        user_data: t.Collection[str] = (),
+    ) -> Snapshot:
+        """
+        Take a snapshot of an installation.
+
+        :param target_dir: installation directory.
+        :param version: version of the installed application.
+        :param excluded: names of the top-level entries which are not part of the snapshot.
+        :param program_files: names of the top-level entries holding the program files, which may be hard-linked.
+        :param user_data: names of the top-level entries holding the user data,
+            which is only part of the snapshot if the file system supports reflinks.
+        :return: the new snapshot.
+        :raise SnapshotError: if the file system supports neither reflinks nor hard links,
+            or if there isn't enough disk space to copy the files which can't be linked.
+        :raise OSError: if a file can't be read or written.
+        """
+        now = datetime.datetime.now()
+        name = f"{now:%Y%m%d-%H%M%S}-{version}"
+        path = self.root_dir.joinpath(name)
+        suffix = 1
+        while path.exists():
+            suffix += 1
+            path = self.root_dir.joinpath(f"{name}-{suffix}")
+        # the snapshot is only listed once it is complete
+        tmp_path = path.with_name(f"~{path.name}.tmp")
+        try:
+            files_dir = tmp_path.joinpath(SNAPSHOT_FILES_DIR)
+            files_dir.mkdir(parents=True)
+            cloned = self._can_reflink(tmp_path)
+            # without reflinks, copying the user data would take too long, and too much disk space
+            excluded = set(excluded) if cloned else set(excluded) | set(user_data)
+            if not cloned:
+                self._check_free_space(target_dir, tmp_path, excluded, set(program_files))
+            nb_files = self._capture(target_dir, files_dir, excluded, set(program_files))
+            with_user_data = cloned or not any(target_dir.joinpath(name).exists() for name in user_data)
+            snapshot = Snapshot(path, version, now.isoformat(timespec="microseconds"), nb_files, with_user_data)
+            description = {
+                "version": snapshot.version,
+                "created": snapshot.created,
+                "nb_files": nb_files,
+                "user_data": snapshot.user_data,
+            }
+            tmp_path.joinpath(SNAPSHOT_DESCRIPTION).write_text(json.dumps(description, indent=1))
+            os.replace(tmp_path, path)
+        except BaseException:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+        return snapshot
+
+    def _can_reflink(self, tmp_dir: Path) -> bool:
+        """
+        Check whether the files can be cloned in the snapshot store, i.e. whether its file system supports reflinks.
+        """
+        if not self._reflink_supported:
+            return False
+        probe_path = tmp_dir.joinpath("reflink.probe")
+        clone_path = tmp_dir.joinpath("reflink.clone")
+        probe_path.write_bytes(b"probe")
+        try:
+            self._file_copier.copy_file(probe_path, clone_path)
+        except OSError as e:
+            if e.errno != errno.ENOTSUP:
+                raise
+            # not supported by this file system: don't try again for the files
+            self._reflink_supported = False
+        finally:
+            probe_path.unlink()
+            clone_path.unlink(missing_ok=True)
+        return self._reflink_supported
+
+    @staticmethod
+    def _check_free_space(src_dir: Path, tmp_dir: Path, excluded: t.Set[str], program_files: t.Set[str]) -> None:
+        """
+        Check that the files which can't be hard-linked can be copied in the snapshot store.
+        """
+        size = 0
+        for path in src_dir.iterdir():
+            if path.name in excluded or path.is_symlink():
+                continue
+            if path.is_file():
+                files = [(str(path.parent), path.name)]
+            else:
+                files = [(parent, name) for parent, _, names in os.walk(path) for name in names]
+            for parent, name in files:
+                if path.name not in program_files or name.lower().endswith(COPIED_SUFFIXES):
+                    file_stat = os.lstat(os.path.join(parent, name))
+                    if stat.S_ISREG(file_stat.st_mode):
+                        size += file_stat.st_size
+        free = shutil.disk_usage(tmp_dir).free
+        if size > free:
+            raise SnapshotError(
+                f"Not enough disk space to take a snapshot: {format_size(size)} needed, {format_size(free)} available"
+            )
+
+    def _capture(self, src_dir: Path, dst_dir: Path, excluded: t.Set[str], program_files: t.Set[str]) -> int:
+        nb_files = 0
+        directories = []
+        stack = [(src_dir, dst_dir, False)]
+        while stack:
+            src_parent, dst_parent, linkable = stack.pop()
+            with os.scandir(src_parent) as it:
+                for dir_entry in it:
+                    if src_parent == src_dir:
+                        if dir_entry.name in excluded:
+                            continue
+                        linkable = dir_entry.name in program_files
+                    src_path, dst_path = Path(dir_entry.path), dst_parent.joinpath(dir_entry.name)
+                    if dir_entry.is_symlink():
+                        os.symlink(os.readlink(src_path), dst_path)
+                    elif dir_entry.is_dir():
+                        dst_path.mkdir()
+                        directories.append((src_path, dst_path))
+                        stack.append((src_path, dst_path, linkable))
+                    else:
+                        self._capture_file(src_path, dst_path, linkable)
+                        nb_files += 1
+        for src_path, dst_path in reversed(directories):
+            shutil.copystat(src_path, dst_path)
+        return nb_files
+
+    def _capture_file(self, src_path: Path, dst_path: Path, linkable: bool) -> None:
+        if self._reflink_supported:
+            try:
+                self._file_copier.copy_file(src_path, dst_path)
+                return
+            except OSError as e:
+                if e.errno != errno.ENOTSUP:
+                    raise
+                # not supported by this file system: don't try again for the other files
+                self._reflink_supported = False
+                dst_path.unlink(missing_ok=True)
+        if not linkable or src_path.name.lower().endswith(COPIED_SUFFIXES):
+            shutil.copy2(src_path, dst_path)
+            return
+        try:
+            os.link(src_path, dst_path)
+        except OSError as e:
+            if e.errno in {errno.EPERM, errno.EXDEV, errno.ENOTSUP, errno.EOPNOTSUPP, errno.EMLINK}:
+                raise SnapshotError(f"Cannot link '{src_path}': {e}") from e
+            raise
+
+    def prune(self, keep: int) -> t.List[Snapshot]:
+        """
+        Remove the oldest snapshots, and the leftovers of interrupted snapshots.
+
+        :param keep: number of snapshots to keep.
+        :return: the removed snapshots.
+        """
+        if not self.root_dir.is_dir():
+            return []
+        snapshots = self.list()
+        removed = snapshots[: max(len(snapshots) - keep, 0)]
+        for snapshot in removed:
+            shutil.rmtree(snapshot.path, ignore_errors=True)
+        for path in self.root_dir.glob("~*.tmp"):
+            shutil.rmtree(path, ignore_errors=True)
+        return removed
+
+    def restore(
+        self,
+        snapshot: Snapshot,
+        target_dir: Path,
+        excluded: t.Collection[str] = (),
+        program_files: t.Collection[str] = (),
+    ) -> t.Optional[Path]:
+        """
+        Restore a snapshot, replacing the top-level entries of the installation using renames only.
+
+        The current entries are moved aside, then the entries of the snapshot are moved in place.
+        If a rename fails, the current entries are put back. The snapshot is consumed by the restoration.
+
+        The current program files are discarded. In the other entries (configuration, user data...),
+        the files created after the snapshot are put back in place, and the files modified after the snapshot
+        are kept aside, in a directory of the snapshot store.
+
+        :param snapshot: snapshot to restore.
+        :param target_dir: installation directory.
+        :param excluded: names of the top-level entries which are not part of the snapshot, and are left untouched.
+        :param program_files: names of the top-level entries holding the program files.
+        :return: the directory where the files modified after the snapshot are kept, if any.
+        :raise SnapshotError: if the snapshot can't be restored.
+        """
+        aside_dir = self.root_dir.joinpath(f"~{snapshot.name}{REPLACED_SUFFIX}.tmp")
+        shutil.rmtree(aside_dir, ignore_errors=True)
+        aside_dir.mkdir(parents=True)
+        moved: t.List[str] = []
+        restored: t.List[str] = []
+        try:
+            for path in sorted(target_dir.iterdir()):
+                if path.name in excluded:
+                    continue
+                # the user data created after the snapshot is left in place
+                if path.name in program_files or os.path.lexists(snapshot.files_dir.joinpath(path.name)):
+                    os.replace(path, aside_dir.joinpath(path.name))
+                    moved.append(path.name)
+            for path in sorted(snapshot.files_dir.iterdir()):
+                os.replace(path, target_dir.joinpath(path.name))
+                restored.append(path.name)
+        except OSError as e:
+            for name in reversed(restored):
+                os.replace(target_dir.joinpath(name), snapshot.files_dir.joinpath(name))
+            for name in reversed(moved):
+                os.replace(aside_dir.joinpath(name), target_dir.joinpath(name))
+            raise SnapshotError(f"Cannot restore snapshot '{snapshot.name}' in '{target_dir}': {e}") from e
+        shutil.rmtree(snapshot.path, ignore_errors=True)
+
+        for name in moved:
+            aside_path = aside_dir.joinpath(name)
+            if name in program_files:
+                _remove(aside_path)
+            else:
+                _put_back(aside_path, target_dir.joinpath(name))
+        if not any(aside_dir.iterdir()):
+            aside_dir.rmdir()
+            return None
+        kept_dir = self.root_dir.joinpath(f"{snapshot.name}{REPLACED_SUFFIX}")
+        shutil.rmtree(kept_dir, ignore_errors=True)
+        os.replace(aside_dir, kept_dir)
+        return kept_dir
+
+
+def _remove(path: Path) -> None:
+    if path.is_dir() and not path.is_symlink():
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        path.unlink(missing_ok=True)
+
+
+def _put_back(aside_path: Path, dst_path: Path) -> None:
+    """
+    Put back the files of `aside_path` which are missing in `dst_path`, and remove the files which are unchanged.
+    The files which differ from `dst_path` are left in `aside_path`.
+    """
+    if not os.path.lexists(dst_path):
+        os.replace(aside_path, dst_path)
+        return
+    aside_stat, dst_stat = os.lstat(aside_path), os.lstat(dst_path)
+    if stat.S_ISDIR(aside_stat.st_mode) and stat.S_ISDIR(dst_stat.st_mode):
+        for child in list(aside_path.iterdir()):
+            _put_back(child, dst_path.joinpath(child.name))
+        # the directory is only removed if all its files were put back or unchanged
+        with contextlib.suppress(OSError):
+            aside_path.rmdir()
+    elif (
+        stat.S_IFMT(aside_stat.st_mode) == stat.S_IFMT(dst_stat.st_mode)
+        and aside_stat.st_size == dst_stat.st_size
+        and aside_stat.st_mtime_ns == dst_stat.st_mtime_ns
+    ):
+        aside_path.unlink()
@@ -0,0 +1,115 @@
+"""
+Module to run the steps of the installation as a dependency graph.
+
+Each step declares the steps it requires; a step is started as soon as all of its requirements are completed,
+so that the independent steps run concurrently on a thread pool.
+
+The errors are reported deterministically: once a step fails, no other step is started, the running steps
+are waited for, and the error of the first failed step, in the declaration order, is raised.
+The steps which could not be run because of the failure are neither started nor timed.
+"""
+
+import dataclasses
+import time
+import typing as t
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+DEFAULT_MAX_WORKERS = 4
+"""Maximum number of steps run concurrently."""
+
+
+class StepError(Exception):
+    """
+    Exception raised when the dependency graph of the steps is invalid.
+    """
+
+
+@dataclasses.dataclass(frozen=True)
+class Step:
+    """
+    Step of the installation.
+
+    Attributes:
+        name: unique name of the step.
+        func: function running the step.
+        requires: names of the steps which must be completed before this step is started.
+    """
+
+    name: str
+    func: t.Callable[[], None]
+    requires: t.Sequence[str] = ()
+
+
+class StepScheduler:
+    """
+    Run steps concurrently, following their dependencies.
+
+    Attributes:
+        steps: steps in the declaration order, which is the order of the error reporting.
+        timings: duration in seconds of each completed or failed step, in the declaration order.
+        errors: errors of the failed steps, in the declaration order.
+    """
+
+    def __init__(self, steps: t.Sequence[Step], max_workers: int = DEFAULT_MAX_WORKERS):
+        self.steps = list(steps)
+        self.max_workers = max_workers
+        self.timings: t.Dict[str, float] = {}
+        self.errors: t.Dict[str, BaseException] = {}
+        self._check_graph()
+
+    def _check_graph(self) -> None:
+        names = [step.name for step in self.steps]
+        if len(set(names)) != len(names):
+            raise StepError(f"Duplicate step names: {', '.join(names)}")
+        for step in self.steps:
+            unknown = [name for name in step.requires if name not in names]
+            if unknown:
+                raise StepError(f"Step '{step.name}' requires unknown steps: {', '.join(unknown)}")
+        # the steps are sorted topologically, which fails if there is a cycle
+        done: t.Set[str] = set()
+        pending = list(self.steps)
+        while pending:
+            ready = [step for step in pending if done.issuperset(step.requires)]
+            if not ready:
+                raise StepError(f"Cyclic dependencies between the steps: {', '.join(s.name for s in pending)}")
+            done.update(step.name for step in ready)
+            pending = [step for step in pending if step.name not in done]
+
+    def run(self) -> t.Dict[str, float]:
+        """
+        Run all the steps.
+
+        :return: the duration in seconds of each step.
+        :raise: the error of the first failed step, in the declaration order.
+        """
+        done: t.Set[str] = set()
+        pending = list(self.steps)
+        running: t.Dict[Future, Step] = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="step") as executor:
+            while pending or running:
+                if not self.errors:
+                    for step in [step for step in pending if done.issuperset(step.requires)]:
+                        pending.remove(step)
+                        running[executor.submit(self._run_step, step)] = step
+                if not running:
+                    break
+                completed, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in completed:
+                    step = running.pop(future)
+                    error = future.exception()
+                    if error is None:
+                        done.add(step.name)
+                    else:
+                        self.errors[step.name] = error
+        self.timings = {step.name: self.timings[step.name] for step in self.steps if step.name in self.timings}
+        if self.errors:
+            self.errors = {step.name: self.errors[step.name] for step in self.steps if step.name in self.errors}
+            raise next(iter(self.errors.values()))
+        return self.timings
+
+    def _run_step(self, step: Step) -> None:
+        start = time.perf_counter()
+        try:
+            step.func()
+        finally:
+            self.timings[step.name] = time.perf_counter() - start
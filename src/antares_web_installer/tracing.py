@@ -0,0 +1,206 @@
+"""
+Module to trace where the installation time goes.
+
+Each phase of the installation is recorded as a span, with its wall time, the CPU time of the process,
+and the number of bytes and files it copied. The spans are nested: a span opened while another one is open
+in the same thread is a sub-phase of it, named after its parent (e.g. "install/copy/AntaresWeb"),
+and its bytes and files are added to its parent when it ends.
+
+The spans of an installation are appended to a JSON Lines trace file, one span per line, with the identifier
+of the installation run, so that the traces of several installations can be compared.
+"""
+
+import contextlib
+import dataclasses
+import json
+import threading
+import time
+import typing as t
+import uuid
+from pathlib import Path
+
+from antares_web_installer.progress import format_size
+
+
+@dataclasses.dataclass
+class Span:
+    """
+    Phase of the installation.
+
+    Attributes:
+        name: name of the phase, prefixed with the names of its parents.
+        start: start time, in seconds since the epoch.
+        wall_time: duration in seconds.
+        cpu_time: CPU time in seconds used by the process during the phase, including its other threads.
+        nb_bytes: number of bytes copied.
+        nb_files: number of files copied.
+        failed: whether the phase raised an error.
+        attrs: additional information, such as the failure reason of a health check.
+    """
+
+    name: str
+    start: float
+    wall_time: float = 0.0
+    cpu_time: float = 0.0
+    nb_bytes: int = 0
+    nb_files: int = 0
+    failed: bool = False
+    attrs: t.Dict[str, t.Any] = dataclasses.field(default_factory=dict)
+    _lock: threading.Lock = dataclasses.field(default_factory=threading.Lock, init=False, repr=False, compare=False)
+
+    def add(self, nb_bytes: int, nb_files: int = 1) -> None:
+        """Count copied files, which may be copied by several threads."""
+        with self._lock:
+            self.nb_bytes += nb_bytes
+            self.nb_files += nb_files
+
+    def counting(self, callback: t.Callable[[str, int], None]) -> t.Callable[[str, int], None]:
+        """
+        Wrap a copy callback, called with the path and the size of each copied file, to count the copied files.
+        """
+
+        def on_copied(relpath: str, size: int) -> None:
+            self.add(size)
+            callback(relpath, size)
+
+        return on_copied
+
+    def to_dict(self) -> t.Dict[str, t.Any]:
+        return {
+            "name": self.name,
+            "start": round(self.start, 6),
+            "wall_time": round(self.wall_time, 6),
+            "cpu_time": round(self.cpu_time, 6),
+            "bytes": self.nb_bytes,
+            "files": self.nb_files,
+            "failed": self.failed,
+            **self.attrs,
+        }
+
+
+class Tracer:
+    """
+    Record the spans of an installation.
+
+    This class is thread-safe: the spans can be recorded by the threads of several steps.
+
+    Attributes:
+        run_id: identifier of the installation run, written with each span.
+        spans: completed spans, in the order of their end.
+    """
+
+    def __init__(self) -> None:
+        self.run_id = uuid.uuid4().hex
+        self.spans: t.List[Span] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _stack(self) -> t.List[Span]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    @contextlib.contextmanager
+    def span(self, name: str, **attrs: t.Any) -> t.Iterator[Span]:
+        """
+        Record a phase, nested in the phase open in the current thread, if any.
+
+        :param name: name of the phase.
+        :param attrs: additional information written with the span.
+        :return: the span, whose counters can be updated while the phase is running.
+        """
+        stack = self._stack()
+        parent = stack[-1] if stack else None
+        span = Span(self._full_name(name), time.time(), attrs=attrs)
+        stack.append(span)
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        try:
+            yield span
+        except BaseException:
+            span.failed = True
+            raise
+        finally:
+            span.wall_time = time.perf_counter() - start_wall
+            span.cpu_time = time.process_time() - start_cpu
+            stack.pop()
+            if parent is not None:
+                parent.add(span.nb_bytes, span.nb_files)
+            with self._lock:
+                self.spans.append(span)
+
+    def add_span(self, name: str, wall_time: float, failed: bool = False, **attrs: t.Any) -> Span:
+        """
+        Record a phase which just ended, measured by the caller, such as a health check attempt.
+
+        :param name: name of the phase, nested in the phase open in the current thread, if any.
+        :param wall_time: duration of the phase in seconds.
+        :param failed: whether the phase failed.
+        :param attrs: additional information written with the span.
+        :return: the recorded span.
+        """
+        span = Span(self._full_name(name), time.time() - wall_time, wall_time, failed=failed, attrs=attrs)
+        with self._lock:
+            self.spans.append(span)
+        return span
+
+    def _full_name(self, name: str) -> str:
+        stack = self._stack()
+        return f"{stack[-1].name}/{name}" if stack else name
+
+    def sorted_spans(self) -> t.List[Span]:
+        """Spans in the order of their start."""
+        with self._lock:
+            return sorted(self.spans, key=lambda s: s.start)
+
+    def write(self, path: Path) -> None:
+        """
+        Append the spans to a JSON Lines trace file.
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open(mode="a", encoding="utf-8") as file:
+            for span in self.sorted_spans():
+                file.write(json.dumps({"run": self.run_id, **span.to_dict()}) + "\n")
+
+    def summary(self, max_depth: int = 3) -> str:
+        """
+        Format the spans as a table, the sub-phases being indented below their parent.
+        The sibling spans of the same name, such as the health check attempts, are summed up in a single row.
+
+        :param max_depth: maximum nesting level of the spans in the table.
+        """
+        children: t.Dict[str, t.Dict[str, t.List[Span]]] = {}
+        for span in self.sorted_spans():
+            parent, _, name = span.name.rpartition("/")
+            children.setdefault(parent, {}).setdefault(name, []).append(span)
+
+        rows = [("Phase", "Wall", "CPU", "Bytes", "Files")]
+
+        def add_rows(parent: str, depth: int) -> None:
+            for name, spans in children.get(parent, {}).items():
+                label = name if len(spans) == 1 else f"{name} (x{len(spans)})"
+                if any(span.failed for span in spans):
+                    label += " (failed)"
+                nb_files = sum(span.nb_files for span in spans)
+                rows.append(
+                    (
+                        "  " * depth + label,
+                        f"{sum(span.wall_time for span in spans):.3f} s",
+                        f"{sum(span.cpu_time for span in spans):.3f} s",
+                        format_size(sum(span.nb_bytes for span in spans)) if nb_files else "",
+                        str(nb_files) if nb_files else "",
+                    )
+                )
+                if depth + 1 < max_depth:
+                    add_rows(spans[0].name, depth + 1)
+
+        add_rows("", 0)
+        widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+        lines = [
+            "  ".join(
+                cell.ljust(width) if i == 0 else cell.rjust(width) for i, (cell, width) in enumerate(zip(row, widths))
+            )
+            for row in rows
+        ]
+        return "\n".join(line.rstrip() for line in lines)
@@ -0,0 +1,160 @@
+"""
+Module to find the version of an Antares Web Server installation or bundle.
+
+The version is read, by order of preference:
+
+- from the `VERSION` file shipped at the root of the bundle, which costs a single read;
+- from the cache of the previous probes, keyed by the path, the size and the modification time of the executable;
+- by running the server executable with `--version`, which is slow: a one-file executable unpacks itself
+  each time it is run.
+
+The `CHANGELOG.md` header is not used: it is not always updated with the bundled version.
+"""
+
+import json
+import os
+import re
+import subprocess
+import threading
+import typing as t
+from pathlib import Path
+
+VERSION_FILE = "VERSION"
+"""Version file which can be shipped at the root of the bundle."""
+
+VERSION_PATTERN = re.compile(r"^\d+(\.\d+)+")
+"""Version numbers in the form 'x.y' or 'x.y.z'."""
+
+PROBE_TIMEOUT = 30
+"""Timeout in seconds of the server executable run with `--version`."""
+
+_CacheKey = t.Tuple[str, int, int]
+
+
+class VersionError(Exception):
+    """
+    Exception raised when the version can't be found.
+    """
+
+
+def parse_version(text: str) -> t.Optional[str]:
+    """Extract the version number from the beginning of a text, `None` if there is none."""
+    matched = VERSION_PATTERN.match(text.strip())
+    return matched.group() if matched else None
+
+
+def read_version_file(root_dir: Path) -> t.Optional[str]:
+    """Read the version file of a bundle or an installation, `None` if it is missing or invalid."""
+    try:
+        return parse_version(root_dir.joinpath(VERSION_FILE).read_text())
+    except (OSError, ValueError):
+        return None
+
+
+class VersionResolver:
+    """
+    Find the versions of the server executables, caching the versions given by the executables.
+
+    This class is thread-safe: the versions of several executables can be probed in parallel,
+    and an executable is only run once even if its version is requested concurrently.
+    """
+
+    def __init__(self, cache_path: t.Optional[Path] = None, timeout: float = PROBE_TIMEOUT):
+        self.cache_path = cache_path
+        self.timeout = timeout
+        self._cache: t.Dict[_CacheKey, str] = self._load_cache()
+        self._lock = threading.Lock()
+        self._probe_locks: t.Dict[_CacheKey, threading.Lock] = {}
+
+    def resolve(self, root_dir: Path, server_path: Path, copy_of: t.Optional[Path] = None) -> str:
+        """
+        Find the version of a bundle or an installation.
+
+        :param root_dir: root directory of the bundle or of the installation.
+        :param server_path: path of the server executable.
+        :param copy_of: executable `server_path` may be a copy of: if both have the same size and modification time,
+            the version of this executable is used.
+        :return: the version number.
+        :raise VersionError: if the version can't be found.
+        """
+        version = read_version_file(root_dir)
+        if version is not None:
+            return version
+        if copy_of is not None and self._same_file(server_path, copy_of):
+            return self.probe(copy_of)
+        return self.probe(server_path)
+
+    def probe(self, server_path: Path) -> str:
+        """
+        Find the version of a server executable, running it if its version is not cached.
+
+        :raise VersionError: if the executable can't be run or doesn't give a version.
+        """
+        try:
+            stat = os.stat(server_path)
+        except OSError as e:
+            raise VersionError(f"Can't check version: {e}") from e
+        key = (os.path.normcase(os.path.realpath(server_path)), stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            probe_lock = self._probe_locks.setdefault(key, threading.Lock())
+        with probe_lock:
+            with self._lock:
+                version = self._cache.get(key)
+            if version is None:
+                version = self._run(server_path)
+                with self._lock:
+                    # only the latest version of each executable is kept
+                    for other_key in [k for k in self._cache if k[0] == key[0]]:
+                        del self._cache[other_key]
+                    self._cache[key] = version
+                    self._save_cache()
+        return version
+
+    def _run(self, server_path: Path) -> str:
+        args = [str(server_path), "--version"]
+        try:
+            output = subprocess.check_output(args, text=True, stderr=subprocess.PIPE, timeout=self.timeout)
+        except OSError as e:
+            raise VersionError(f"Can't check version: {e}") from e
+        except subprocess.CalledProcessError as e:
+            reason = "\n".join(f"  | {line}" for line in e.stderr.splitlines())
+            raise VersionError(f"Can't check version:\n{reason}") from e
+        except subprocess.TimeoutExpired as e:
+            raise VersionError(f"Impossible to check version: {e}") from e
+        version = parse_version(output)
+        if version is None:
+            raise VersionError("No version found.")
+        return version
+
+    @staticmethod
+    def _same_file(path: Path, other_path: Path) -> bool:
+        try:
+            stat, other_stat = os.stat(path), os.stat(other_path)
+        except OSError:
+            return False
+        return (stat.st_size, stat.st_mtime_ns) == (other_stat.st_size, other_stat.st_mtime_ns)
+
+    def _load_cache(self) -> t.Dict[_CacheKey, str]:
+        if self.cache_path is None:
+            return {}
+        try:
+            entries = json.loads(self.cache_path.read_text())
+            return {(e["path"], e["size"], e["mtime_ns"]): e["version"] for e in entries}
+        except (OSError, ValueError, KeyError, TypeError):
+            return {}
+
+    def _save_cache(self) -> None:
+        if self.cache_path is None:
+            return
+        entries = [
+            {"path": path, "size": size, "mtime_ns": mtime_ns, "version": version}
+            for (path, size, mtime_ns), version in self._cache.items()
+        ]
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.cache_path.with_name(self.cache_path.name + ".tmp")
+            tmp_path.write_text(json.dumps(entries, indent=1))
+            os.replace(tmp_path, self.cache_path)
+        except OSError:
+            # the cache only saves time
+            pass
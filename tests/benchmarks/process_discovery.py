@@ -0,0 +1,80 @@
+"""
+Benchmark of the server process discovery, compared with the former fuzzy matching of the process names.
+
+Usage::
+
+    python -m tests.benchmarks.process_discovery [--repeat N]
+
+Each implementation scans all the processes of the machine looking for the server of a fake installation.
+Start many processes beforehand (e.g. with `--spawn N`) to simulate a loaded terminal server.
+"""
+
+import argparse
+import subprocess
+import sys
+import tempfile
+import time
+import typing as t
+from difflib import SequenceMatcher
+from pathlib import Path
+
+import psutil
+
+from antares_web_installer.processes import ServerFinder
+
+
+def legacy_scan() -> t.List[psutil.Process]:
+    """Former implementation of `App._get_server_processes`."""
+    res = []
+    for process in psutil.process_iter(["pid", "name"]):
+        try:
+            matching_ratio = SequenceMatcher(None, "antareswebserver", process.name().lower()).ratio()
+        except (FileNotFoundError, psutil.NoSuchProcess):
+            continue
+        if matching_ratio > 0.8:
+            res.append(process)
+    return res
+
+
+def _timeit(func: t.Callable[[], t.Any], repeat: int) -> float:
+    """Best time of `repeat` calls, in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=10, help="number of runs of each implementation")
+    parser.add_argument("--spawn", type=int, default=0, help="number of idle processes to start beforehand")
+    args = parser.parse_args()
+
+    idle = [subprocess.Popen([sys.executable, "-c", "import time; time.sleep(600)"]) for _ in range(args.spawn)]
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            target_dir = Path(tmp_dir)
+            finder = ServerFinder(target_dir / "AntaresWeb" / "AntaresWebServer", target_dir)
+            implementations: t.Dict[str, t.Callable[[], t.Any]] = {
+                "legacy (SequenceMatcher)": legacy_scan,
+                "psutil (prefetched attributes)": lambda: [
+                    info for info in finder.iter_psutil() if finder.matches(info)
+                ],
+            }
+            if sys.platform.startswith("linux"):
+                implementations["/proc (Linux fast path)"] = lambda: [
+                    info for info in finder.iter_proc() if finder.matches(info)
+                ]
+            print(f"{len(psutil.pids())} processes, best of {args.repeat} runs:")
+            for name, func in implementations.items():
+                print(f"  {name:<32} {_timeit(func, args.repeat):8.2f} ms")
+    finally:
+        for process in idle:
+            process.kill()
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
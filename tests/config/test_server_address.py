@@ -0,0 +1,14 @@
+from pathlib import Path
+
+from antares_web_installer.config import DEFAULT_SERVER_HOST, DEFAULT_SERVER_PORT, read_server_address
+
+
+def test_read_server_address(tmp_path: Path) -> None:
+    config_path = tmp_path / "config.yaml"
+    assert read_server_address(config_path) == (DEFAULT_SERVER_HOST, DEFAULT_SERVER_PORT)
+    config_path.write_text("server:\n  worker_threadpool_size: 12\n")
+    assert read_server_address(config_path) == (DEFAULT_SERVER_HOST, DEFAULT_SERVER_PORT)
+    config_path.write_text("server:\n  host: 0.0.0.0\n  port: 8081\n")
+    assert read_server_address(config_path) == ("0.0.0.0", 8081)
+    config_path.write_text("server:\n  port: not-a-port\n")
+    assert read_server_address(config_path) == (DEFAULT_SERVER_HOST, DEFAULT_SERVER_PORT)
@@ -0,0 +1,12 @@
+import typing as t
+from pathlib import Path
+
+
+def write_file(path: Path, content: t.Union[str, bytes]) -> Path:
+    """Write a file, creating its parent directories."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if isinstance(content, bytes):
+        path.write_bytes(content)
+    else:
+        path.write_text(content)
+    return path
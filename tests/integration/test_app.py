@@ -1,6 +1,5 @@
 import os
 import shutil
-import time
 
 import psutil
 import pytest
@@ -12,7 +11,7 @@ from typing import Any
 
 from _pytest.monkeypatch import MonkeyPatch
 
-from antares_web_installer.app import App, InstallError
+from antares_web_installer.app import INSTALLER_DATA_DIR, App, InstallError
 from tests.samples import SAMPLES_DIR
 
 DOWNLOAD_FOLDER = "Download"
@@ -122,14 +121,15 @@ class TestApp:
             assert custom_dir.iterdir()
 
             # check if all files are identical in both source_dir (application_dir) and target_dir (program_dir)
-            program_dir_content = list(custom_dir.iterdir())
+            # the installer keeps the manifest of the installed files in its own data directory
+            program_dir_content = [path for path in custom_dir.iterdir() if path.name != INSTALLER_DATA_DIR.name]
             source_dir_content = list(source_dir.iterdir())
             assert len(source_dir_content) == len(program_dir_content)
             for index, file in enumerate(source_dir.iterdir()):
                 assert file.name == program_dir_content[index].name
 
-            # give some time for the server to shut down
-            time.sleep(2)
+            # stop the server, whose port is used by the server of the next installation
+            app.kill_running_server()
 
     def test_shortcut__created(self, downloaded_dir: Path, program_dir: Path, desktop_dir: Path, settings: Any):
         for application_dir in downloaded_dir.iterdir():
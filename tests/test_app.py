@@ -1,9 +1,20 @@
 import hashlib
+import os
+import zipfile
 from pathlib import Path
 
 import pytest
 
-from antares_web_installer.app import App, EXCLUDED_ROOT_RESOURCES
+from antares_web_installer.app import (
+    BACKUP_PATH,
+    EXCLUDED_ROOT_RESOURCES,
+    INSTALLER_DATA_DIR,
+    MANIFEST_PATH,
+    STAGING_PATH,
+    App,
+    InstallError,
+)
+from antares_web_installer.manifest import Manifest
 
 
 class TestApp:
@@ -41,6 +52,65 @@ class TestApp:
         for name in expected_files:
             assert (target_dir / name).exists(), f"File {name} must be copied"
 
+    def test_install_files__from_archive(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        """
+        Case where the source is a release archive.
+        """
+        source_path = tmp_path / "AntaresWeb-2.19.zip"
+        with zipfile.ZipFile(source_path, mode="w") as archive:
+            # the permissions of the server executable are not recorded
+            archive.writestr(zipfile.ZipInfo("AntaresWeb-2.19/AntaresWeb/AntaresWebServer"), "server")
+            archive.writestr("AntaresWeb-2.19/config.yaml", "desktop_mode: false")
+            archive.writestr("AntaresWeb-2.19/deltas/2.18.0/delta.json", "{}")
+        target_dir = tmp_path / "target"
+        monkeypatch.setattr("antares_web_installer.app.App.check_version", lambda _: "2.19.0")
+
+        # fresh install
+        app = App(source_dir=source_path, target_dir=target_dir)
+        app.install_files()
+        app.close_archive()
+        assert target_dir.joinpath("AntaresWeb/AntaresWebServer").read_text() == "server"
+        assert target_dir.joinpath("config.yaml").read_text() == "desktop_mode: false"
+        # the delta packages are not installed
+        assert not target_dir.joinpath("deltas").exists()
+        if os.name == "posix":
+            assert target_dir.joinpath("AntaresWeb/AntaresWebServer").stat().st_mode & 0o777 == 0o755
+
+        # update: the configuration is migrated from the archive
+        app = App(source_dir=source_path, target_dir=target_dir)
+        app.install_files()
+        app.close_archive()
+        assert target_dir.joinpath("config.yaml").read_text() == "desktop_mode: true\n"
+
+    def test_install_files__verification(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        """
+        Case where the bundle ships a checksum manifest.
+        """
+        source_dir = tmp_path / "source"
+        source_dir.joinpath("AntaresWeb").mkdir(parents=True)
+        source_dir.joinpath("AntaresWeb/server.bin").write_text("server")
+        source_dir.joinpath("config.yaml").write_text("config")
+        digest = hashlib.sha256(b"server").hexdigest()
+        source_dir.joinpath("SHA256SUMS").write_text(f"{digest}  AntaresWeb/server.bin\n")
+        monkeypatch.setattr("antares_web_installer.app.App.check_version", lambda _: "2.19.0")
+
+        # the manifest of the installed program files is written
+        target_dir = tmp_path / "target"
+        App(source_dir=source_dir, target_dir=target_dir).install_files()
+        manifest = Manifest.load(target_dir.joinpath(MANIFEST_PATH))
+        assert manifest.entries["AntaresWeb/server.bin"].digest == digest
+        assert "config.yaml" not in manifest.entries
+
+        # the bundle file doesn't match its checksum
+        source_dir.joinpath("AntaresWeb/server.bin").write_text("corrupted")
+        with pytest.raises(InstallError, match="'AntaresWeb/server.bin' is corrupted"):
+            App(source_dir=source_dir, target_dir=tmp_path / "other").install_files()
+
+        # a file of the checksum manifest is missing
+        source_dir.joinpath("AntaresWeb/server.bin").unlink()
+        with pytest.raises(InstallError, match="missing files: AntaresWeb/server.bin"):
+            App(source_dir=source_dir, target_dir=tmp_path / "other").install_files()
+
     def test_copy_files__nominal_case(self, datadir: Path) -> None:
         # Prepare the test resources
         source_dir = datadir.joinpath("copy_files/source_files")
@@ -59,6 +129,9 @@ class TestApp:
         # Check the results
         for file in target_dir.rglob("*.*"):
             relative_path = file.relative_to(target_dir)
+            if relative_path.parts[0] == INSTALLER_DATA_DIR.name:
+                # data written by the installer itself (manifest...)
+                continue
             content = file.read_bytes()
             old_checksum = old_checksum_by_name[relative_path]
             new_checksum = hashlib.md5(content).hexdigest()
@@ -74,3 +147,57 @@ class TestApp:
         # 2. Le programme exécutable existe, mais le programme plante => InstallError
         # 3. Le programme exécutable existe et fonctionne => pas d'erreur
         pass
+
+
+class TestStagedUpgrade:
+    @pytest.fixture(name="app")
+    def app_fixture(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> App:
+        source_dir = tmp_path / "source"
+        target_dir = tmp_path / "target"
+        for root_dir, version in [(source_dir, "new"), (target_dir, "old")]:
+            root_dir.joinpath("AntaresWeb").mkdir(parents=True)
+            root_dir.joinpath("AntaresWeb/server.bin").write_text(f"{version} server")
+            root_dir.joinpath("AntaresWeb/lib.so").write_text("unchanged library")
+            root_dir.joinpath("config.yaml").write_text(f"{version}: true")
+        target_dir.joinpath("AntaresWeb/obsolete.so").write_text("obsolete library")
+        monkeypatch.setattr("antares_web_installer.app.App.check_version", lambda _: "2.19.0")
+        return App(source_dir=source_dir, target_dir=target_dir, shortcut=False, launch=False, staged=True)
+
+    def test_stage_files(self, app: App) -> None:
+        app.stage_files()
+        # the installed files are not modified while the server may be running
+        assert app.target_dir.joinpath("AntaresWeb/server.bin").read_text() == "old server"
+        staging_dir = app.target_dir.joinpath(STAGING_PATH)
+        assert staging_dir.joinpath("AntaresWeb/server.bin").read_text() == "new server"
+        assert staging_dir.joinpath("AntaresWeb/lib.so").read_text() == "unchanged library"
+        assert not staging_dir.joinpath("config.yaml").exists()
+
+    def test_run(self, app: App, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setattr("antares_web_installer.app.App.kill_running_server", lambda _: None)
+        app.run()
+        assert app.target_dir.joinpath("AntaresWeb/server.bin").read_text() == "new server"
+        assert app.target_dir.joinpath("AntaresWeb/lib.so").read_text() == "unchanged library"
+        # the program directories are switched as a whole
+        assert not app.target_dir.joinpath("AntaresWeb/obsolete.so").exists()
+        assert app.target_dir.joinpath("config.yaml").exists()
+        assert not app.target_dir.joinpath(STAGING_PATH).exists()
+        assert not app.target_dir.joinpath(BACKUP_PATH).exists()
+        assert list(app.step_timings) == ["stage", "version", "kill", "snapshot", "install"]
+        assert app.progress == 100
+
+    def test_swap_staged_files__rollback(self, app: App, monkeypatch: pytest.MonkeyPatch) -> None:
+        app.stage_files()
+        staging_dir = app.target_dir.joinpath(STAGING_PATH)
+        staging_dir.joinpath("README.md").write_text("new readme")
+        original_replace = os.replace
+
+        def replace(src, dst):
+            if Path(src).name == "README.md":
+                raise PermissionError("file is locked")
+            original_replace(src, dst)
+
+        monkeypatch.setattr("antares_web_installer.app.os.replace", replace)
+        with pytest.raises(InstallError, match="file is locked"):
+            app.swap_staged_files()
+        assert app.target_dir.joinpath("AntaresWeb/server.bin").read_text() == "old server"
+        assert app.target_dir.joinpath("AntaresWeb/obsolete.so").exists()
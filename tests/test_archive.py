@@ -0,0 +1,72 @@
+import io
+import tarfile
+import typing as t
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from antares_web_installer.archive import ArchiveError, BundleArchive, is_archive
+
+BUNDLE = {
+    "AntaresWeb-2.19/AntaresWeb/AntaresWebServer": b"server",
+    "AntaresWeb-2.19/config.yaml": b"desktop_mode: true\n",
+    "AntaresWeb-2.19/studies/README.md": b"studies",
+}
+
+
+def _make_zip(path: Path, files: dict) -> Path:
+    with zipfile.ZipFile(path, mode="w") as archive:
+        for name, content in files.items():
+            archive.writestr(name, content)
+    return path
+
+
+def _make_tar(path: Path, files: dict) -> Path:
+    with tarfile.open(path, mode="w:xz") as archive:
+        for name, content in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            info.mode = 0o755
+            archive.addfile(info, io.BytesIO(content))
+    return path
+
+
+@pytest.fixture(name="archive_path", params=["bundle.zip", "bundle.tar.xz"])
+def archive_path_fixture(request: pytest.FixtureRequest, tmp_path: Path) -> Path:
+    name = request.param
+    make = _make_zip if name.endswith(".zip") else _make_tar
+    return make(tmp_path.joinpath(name), BUNDLE)
+
+
+def test_is_archive(archive_path: Path, tmp_path: Path) -> None:
+    assert is_archive(archive_path)
+    assert not is_archive(tmp_path)
+
+
+class TestBundleArchive:
+    def test_members__root_is_stripped(self, archive_path: Path) -> None:
+        with BundleArchive(archive_path) as archive:
+            relpaths = sorted(member.relpath for member in archive.members)
+        assert relpaths == ["AntaresWeb/AntaresWebServer", "config.yaml", "studies/README.md"]
+
+    def test_extract(self, archive_path: Path, tmp_path: Path) -> None:
+        target_dir = tmp_path.joinpath("target")
+        extracted: t.Dict[str, int] = {}
+        with BundleArchive(archive_path) as archive:
+            members = [member for member in archive.members if member.root != Path("studies")]
+            archive.extract(target_dir, members, callback=extracted.__setitem__)
+        assert extracted == {"AntaresWeb/AntaresWebServer": 6, "config.yaml": 19}
+        assert target_dir.joinpath("AntaresWeb/AntaresWebServer").read_bytes() == b"server"
+        assert not target_dir.joinpath("studies").exists()
+
+    def test_unsafe_path(self, tmp_path: Path) -> None:
+        archive_path = _make_zip(tmp_path.joinpath("evil.zip"), {"../evil.txt": b"evil"})
+        with pytest.raises(ArchiveError, match="Unsafe path"):
+            BundleArchive(archive_path)
+
+    def test_invalid_archive(self, tmp_path: Path) -> None:
+        archive_path = tmp_path.joinpath("invalid.tar.gz")
+        archive_path.write_bytes(b"not an archive")
+        with pytest.raises(ArchiveError, match="Cannot read archive"):
+            BundleArchive(archive_path)
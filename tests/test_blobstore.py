@@ -0,0 +1,62 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from antares_web_installer.app import App
+from antares_web_installer.blobstore import BlobStore
+from antares_web_installer.fastcopy import CopyStrategy
+from antares_web_installer.manifest import hash_file
+from tests.helpers import write_file
+
+
+class TestBlobStore:
+    def test_install(self, tmp_path: Path) -> None:
+        store = BlobStore(tmp_path / "store")
+        src_path = write_file(tmp_path / "source/lib.so", "library")
+        result = store.install(src_path, tmp_path / "a.so")
+        assert result.strategy != CopyStrategy.HARDLINK
+        assert result.digest == hash_file(src_path)
+
+        # the second installation only links the stored blob, without reading the source
+        result = store.install(src_path, tmp_path / "b.so", digest=result.digest)
+        assert result.strategy == CopyStrategy.HARDLINK
+        assert result.digest is not None
+        assert os.path.samefile(tmp_path / "a.so", tmp_path / "b.so")
+        assert os.path.samefile(tmp_path / "a.so", store.blob_path(result.digest))
+
+    def test_install__corrupted_source(self, tmp_path: Path) -> None:
+        store = BlobStore(tmp_path / "store")
+        src_path = write_file(tmp_path / "lib.so", "corrupted")
+        result = store.install(src_path, tmp_path / "a.so", digest="0" * 64)
+        # the blob is named after the content actually copied
+        assert result.digest == hash_file(src_path)
+        assert not store.contains("0" * 64)
+
+    def test_prune(self, tmp_path: Path) -> None:
+        store = BlobStore(tmp_path / "store")
+        used = store.install(write_file(tmp_path / "used.so", "used"), tmp_path / "a.so")
+        unused = store.install(write_file(tmp_path / "unused.so", "unused!"), tmp_path / "b.so")
+        tmp_path.joinpath("b.so").unlink()
+        assert store.prune(min_age=60) == (0, 0)
+        assert store.prune(min_age=0) == (1, len("unused!"))
+        assert used.digest is not None and unused.digest is not None
+        assert store.contains(used.digest)
+        assert not store.contains(unused.digest)
+
+
+class TestAppBlobStore:
+    def test_install_files__shared(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        source_dir, store_dir = tmp_path / "source", tmp_path / "store"
+        write_file(source_dir / "AntaresWeb/server.bin", "server")
+        write_file(source_dir / "config.yaml", "config")
+        monkeypatch.setattr("antares_web_installer.app.App.check_version", lambda _: "2.19.0")
+
+        for name in ("2.19.0", "2.19.1"):
+            App(source_dir=source_dir, target_dir=tmp_path / name, blob_store=store_dir).install_files()
+
+        server_paths = [tmp_path.joinpath(name, "AntaresWeb/server.bin") for name in ("2.19.0", "2.19.1")]
+        assert os.path.samefile(*server_paths)
+        assert server_paths[0].stat().st_nlink == 3
+        # the excluded resources, such as the configuration, are never shared
+        assert tmp_path.joinpath("2.19.0/config.yaml").stat().st_nlink == 1
@@ -0,0 +1,66 @@
+import hashlib
+import typing as t
+from pathlib import Path
+
+import pytest
+
+from antares_web_installer.copier import Copier, CopyError, VerificationError
+from antares_web_installer.scanner import scan_tree
+
+
+@pytest.fixture(name="source_dir")
+def source_dir_fixture(tmp_path: Path) -> Path:
+    source_dir = tmp_path.joinpath("source")
+    for relpath in ["README.md", "AntaresWeb/server.bin", "AntaresWeb/lib/a.so", "AntaresWeb/lib/b.so"]:
+        file_path = source_dir.joinpath(relpath)
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_text(relpath)
+    source_dir.joinpath("AntaresWeb/empty").mkdir()
+    return source_dir
+
+
+class TestCopier:
+    @pytest.mark.parametrize("nb_workers", [1, 4])
+    def test_copy_tree(self, source_dir: Path, tmp_path: Path, nb_workers: int) -> None:
+        target_dir = tmp_path.joinpath("target")
+        sizes: t.Dict[str, int] = {}
+        Copier(nb_workers=nb_workers).copy_tree(scan_tree(source_dir), target_dir, callback=sizes.__setitem__)
+        copied = sorted(sizes)
+        assert copied == ["AntaresWeb/lib/a.so", "AntaresWeb/lib/b.so", "AntaresWeb/server.bin", "README.md"]
+        for relpath in copied:
+            assert target_dir.joinpath(relpath).read_text() == relpath
+            assert sizes[relpath] == len(relpath)
+        assert target_dir.joinpath("AntaresWeb/empty").is_dir()
+
+    def test_copy_tree__roots(self, source_dir: Path, tmp_path: Path) -> None:
+        target_dir = tmp_path.joinpath("target")
+        Copier(nb_workers=2).copy_tree(scan_tree(source_dir), target_dir, ["README.md"])
+        assert [p.name for p in target_dir.iterdir()] == ["README.md"]
+
+    def test_copy_files(self, source_dir: Path, tmp_path: Path) -> None:
+        target_dir = tmp_path.joinpath("target")
+        target_dir.mkdir()
+        Copier(nb_workers=2).copy_files(source_dir, target_dir, ["AntaresWeb/lib/b.so"])
+        assert target_dir.joinpath("AntaresWeb/lib/b.so").read_text() == "AntaresWeb/lib/b.so"
+        assert not target_dir.joinpath("AntaresWeb/lib/a.so").exists()
+
+    def test_copy_files__missing_file(self, source_dir: Path, tmp_path: Path) -> None:
+        target_dir = tmp_path.joinpath("target")
+        target_dir.mkdir()
+        with pytest.raises(CopyError) as ctx:
+            Copier(nb_workers=2).copy_files(source_dir, target_dir, ["README.md", "missing.txt"])
+        assert ctx.value.relpath == "missing.txt"
+
+    def test_copy_files__verification(self, source_dir: Path, tmp_path: Path) -> None:
+        target_dir = tmp_path.joinpath("target")
+        target_dir.mkdir()
+        digest = hashlib.sha256(b"README.md").hexdigest()
+        copier = Copier(nb_workers=2, hash_algorithm="sha256", checksums={"README.md": digest})
+        copier.copy_files(source_dir, target_dir, ["README.md"])
+        assert copier.digests == {"README.md": digest}
+
+        copier.checksums = {"AntaresWeb/server.bin": digest}
+        with pytest.raises(VerificationError) as ctx:
+            copier.copy_files(source_dir, target_dir, ["AntaresWeb/server.bin"])
+        assert ctx.value.relpath == "AntaresWeb/server.bin"
+        assert ctx.value.actual == hashlib.sha256(b"AntaresWeb/server.bin").hexdigest()
@@ -0,0 +1,187 @@
+import lzma
+import os
+from pathlib import Path
+
+import pytest
+
+from antares_web_installer.app import MANIFEST_PATH, App
+from antares_web_installer.delta import (
+    DELTAS_DIR,
+    DeltaError,
+    DeltaPackage,
+    apply_patch,
+    make_delta_package,
+    make_patch,
+)
+from antares_web_installer.manifest import Manifest, hash_file
+from tests.helpers import write_file
+
+BLOCK_SIZE = 16
+
+
+class TestPatch:
+    @pytest.mark.parametrize(
+        "base, target",
+        [
+            pytest.param(b"a" * 64 + b"b" * 64, b"a" * 64 + b"c" * 16 + b"b" * 48, id="modified"),
+            pytest.param(b"a" * 64 + b"b" * 64, b"x" * 16 + b"a" * 64 + b"b" * 64, id="shifted"),
+            pytest.param(b"a" * 64 + b"b" * 64, b"a" * 40, id="truncated"),
+            pytest.param(b"", b"new content", id="empty base"),
+        ],
+    )
+    def test_apply_patch(self, tmp_path: Path, base: bytes, target: bytes) -> None:
+        base_path = write_file(tmp_path / "base.bin", base)
+        target_path = write_file(tmp_path / "target.bin", target)
+        patch_path = tmp_path / "file.patch"
+        make_patch(base_path, target_path, patch_path, block_size=BLOCK_SIZE)
+
+        # in a new file
+        dst_path = tmp_path / "dst.bin"
+        apply_patch(base_path, patch_path, dst_path)
+        assert dst_path.read_bytes() == target
+
+        # in place
+        apply_patch(base_path, patch_path, base_path)
+        assert base_path.read_bytes() == target
+
+    def test_apply_patch__in_place_writes_only_new_data(self, tmp_path: Path) -> None:
+        base = bytes(range(256)) * 64
+        target = base[:1024] + b"z" * BLOCK_SIZE + base[1024 + BLOCK_SIZE :]
+        base_path = write_file(tmp_path / "base.bin", base)
+        patch_path = tmp_path / "file.patch"
+        make_patch(base_path, write_file(tmp_path / "target.bin", target), patch_path, block_size=BLOCK_SIZE)
+        inode = base_path.stat().st_ino
+
+        assert apply_patch(base_path, patch_path, base_path) == BLOCK_SIZE
+        assert base_path.read_bytes() == target
+        assert base_path.stat().st_ino == inode
+
+    def test_apply_patch__truncated_patch_in_place(self, tmp_path: Path) -> None:
+        base = bytes(range(256)) * 64
+        target = base[:1024] + b"y" * BLOCK_SIZE + base[1024 + BLOCK_SIZE : 8192] + b"z" * BLOCK_SIZE * 4
+        base_path = write_file(tmp_path / "base.bin", base)
+        patch_path = tmp_path / "file.patch"
+        make_patch(base_path, write_file(tmp_path / "target.bin", target), patch_path, block_size=BLOCK_SIZE)
+        # the patch is cut in the middle of the second range of new data
+        with lzma.open(patch_path, mode="rb") as patch:
+            content = patch.read()
+        with lzma.open(patch_path, mode="wb") as patch:
+            patch.write(content[: content.index(b"z" * BLOCK_SIZE) + BLOCK_SIZE])
+
+        with pytest.raises(DeltaError, match="Truncated"):
+            apply_patch(base_path, patch_path, base_path)
+        # the installed file is left intact
+        assert base_path.read_bytes() == base
+
+    def test_apply_patch__invalid_patch(self, tmp_path: Path) -> None:
+        base_path = write_file(tmp_path / "base.bin", b"base")
+        patch_path = write_file(tmp_path / "file.patch", b"not a patch")
+        with pytest.raises(lzma.LZMAError):
+            apply_patch(base_path, patch_path, tmp_path / "dst.bin")
+
+
+class TestDeltaPackage:
+    def test_make_and_find(self, tmp_path: Path) -> None:
+        old_dir, new_dir = tmp_path / "old", tmp_path / "new"
+        write_file(old_dir / "AntaresWeb/lib.so", b"old library" * 100)
+        write_file(new_dir / "AntaresWeb/lib.so", b"new library" * 100)
+        write_file(old_dir / "AntaresWeb/same.so", b"same")
+        write_file(new_dir / "AntaresWeb/same.so", b"same")
+        write_file(new_dir / "AntaresWeb/added.so", b"added")
+
+        make_delta_package(old_dir, new_dir, new_dir, "2.19.0")
+        package = DeltaPackage.find(new_dir, "2.19.0")
+        assert package is not None
+        assert list(package.entries) == ["AntaresWeb/lib.so"]
+        assert DeltaPackage.find(new_dir, "2.18.0") is None
+
+        entry = package.entries["AntaresWeb/lib.so"]
+        assert entry.base_digest == hash_file(old_dir / "AntaresWeb/lib.so")
+        package.apply(entry, old_dir / "AntaresWeb/lib.so", tmp_path / "lib.so")
+        assert tmp_path.joinpath("lib.so").read_bytes() == b"new library" * 100
+
+    def test_apply__unexpected_result(self, tmp_path: Path) -> None:
+        old_dir, new_dir = tmp_path / "old", tmp_path / "new"
+        write_file(old_dir / "lib.so", b"a" * 65536 + b"old library")
+        write_file(new_dir / "lib.so", b"a" * 65536 + b"new library")
+        package = make_delta_package(old_dir, new_dir, new_dir, "2.19.0")
+        # the unchanged block is copied from a file which is not the base of the patch
+        other_path = write_file(tmp_path / "other.so", b"b" * 65536 + b"old library")
+        with pytest.raises(DeltaError, match="expected file"):
+            package.apply(package.entries["lib.so"], other_path, tmp_path / "lib.so")
+
+    def test_find__invalid_description(self, tmp_path: Path) -> None:
+        write_file(tmp_path.joinpath(DELTAS_DIR, "2.19.0", "delta.json"), b"{}")
+        with pytest.raises(DeltaError):
+            DeltaPackage.find(tmp_path, "2.19.0")
+
+
+class TestAppDeltas:
+    @pytest.fixture(name="app")
+    def app_fixture(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> App:
+        source_dir, target_dir = tmp_path / "source", tmp_path / "target"
+        for root_dir, version in [(source_dir, b"new"), (target_dir, b"old")]:
+            write_file(root_dir / "AntaresWeb/lib.so", b"library" * 1000 + version)
+            write_file(root_dir / "AntaresWeb/server.bin", version + b" server")
+            write_file(root_dir / "config.yaml", b"")
+        make_delta_package(target_dir, source_dir, source_dir, "2.19.0")
+        monkeypatch.setattr("antares_web_installer.app.App.check_version", lambda _: "2.19.0")
+        app = App(source_dir=source_dir, target_dir=target_dir, shortcut=False, launch=False, nb_workers=2)
+        app.check_old_version()
+        return app
+
+    def test_copy_files__patched(self, app: App) -> None:
+        lib_path = app.target_dir.joinpath("AntaresWeb/lib.so")
+        inode = lib_path.stat().st_ino
+        app.copy_files()
+        assert lib_path.read_bytes() == b"library" * 1000 + b"new"
+        assert lib_path.stat().st_ino == inode
+        assert app.target_dir.joinpath("AntaresWeb/server.bin").read_bytes() == b"new server"
+        # the delta packages are not installed
+        assert not app.target_dir.joinpath(DELTAS_DIR).exists()
+
+    def test_copy_files__patched_file_hashed_once(self, app: App, monkeypatch: pytest.MonkeyPatch) -> None:
+        lib_path = app.target_dir.joinpath("AntaresWeb/lib.so")
+        hashed = []
+
+        def counting_hash_file(path: Path) -> str:
+            hashed.append(path)
+            return hash_file(path)
+
+        monkeypatch.setattr("antares_web_installer.manifest.hash_file", counting_hash_file)
+        app.copy_files()
+        # the installed file is hashed to check the base of the patch, but not again once patched
+        assert hashed.count(lib_path) == 1
+        manifest_entry = Manifest.load(app.target_dir.joinpath(MANIFEST_PATH)).entries["AntaresWeb/lib.so"]
+        assert manifest_entry.digest == hash_file(lib_path)
+
+    def test_copy_files__base_mismatch(self, app: App) -> None:
+        lib_path = app.target_dir.joinpath("AntaresWeb/lib.so")
+        lib_path.write_bytes(b"locally modified library")
+        app.copy_files()
+        assert lib_path.read_bytes() == b"library" * 1000 + b"new"
+
+    def test_copy_files__patch_failure(self, app: App) -> None:
+        for patch_path in app.source_dir.joinpath(DELTAS_DIR).rglob("*.patch"):
+            patch_path.write_bytes(b"corrupted")
+        app.copy_files()
+        assert app.target_dir.joinpath("AntaresWeb/lib.so").read_bytes() == b"library" * 1000 + b"new"
+
+    def test_copy_files__truncated_patch(self, app: App) -> None:
+        # a patch which fails once the installed file is modified is recovered by a full copy from the bundle
+        for patch_path in app.source_dir.joinpath(DELTAS_DIR).rglob("*.patch"):
+            with lzma.open(patch_path, mode="rb") as patch:
+                content = patch.read()
+            with lzma.open(patch_path, mode="wb") as patch:
+                patch.write(content[:-1])
+        app.copy_files()
+        assert app.target_dir.joinpath("AntaresWeb/lib.so").read_bytes() == b"library" * 1000 + b"new"
+
+    def test_install_files__staged(self, app: App) -> None:
+        app.staged = True
+        app.stage_files()
+        lib_path = app.target_dir.joinpath("AntaresWeb/lib.so")
+        assert lib_path.read_bytes() == b"library" * 1000 + b"old"
+        staged_path = app.target_dir.joinpath(".installer/staging/AntaresWeb/lib.so")
+        assert staged_path.read_bytes() == b"library" * 1000 + b"new"
+        assert not os.path.samefile(lib_path, staged_path)
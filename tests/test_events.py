@@ -0,0 +1,100 @@
+import logging
+from pathlib import Path
+
+import pytest
+
+from antares_web_installer.app import App, InstallError
+from antares_web_installer.events import (
+    BytesTransferred,
+    EventBus,
+    EventHandler,
+    InstallFailed,
+    InstallFinished,
+    LogMessage,
+    ProgressChanged,
+    StepFinished,
+    StepStarted,
+    coalesce,
+    log_event,
+)
+
+
+class TestEventBus:
+    def test_log_adapters(self, caplog: pytest.LogCaptureFixture) -> None:
+        logger = logging.getLogger("test_events")
+        bus = EventBus()
+        events = bus.subscribe_queue()
+        bus.subscribe(log_event(logger))
+        handler = EventHandler(bus)
+        logger.addHandler(handler)
+        try:
+            with caplog.at_level(logging.INFO, logger="test_events"):
+                bus.publish(ProgressChanged(42.0, "install"))
+                logger.info("Files was successfully copied.")
+                logger.debug("Copied 'README.md'")
+        finally:
+            logger.removeHandler(handler)
+        # the progress is logged, but the log record of the progress is not published again
+        assert "Progression: 42.00" in caplog.messages
+        assert [events.get_nowait() for _ in range(events.qsize())] == [
+            ProgressChanged(42.0, "install"),
+            LogMessage(logging.INFO, "Files was successfully copied."),
+        ]
+
+
+def test_coalesce() -> None:
+    batch = coalesce(
+        [
+            ProgressChanged(10),
+            BytesTransferred(10, 100, "10 B / 100 B"),
+            LogMessage(logging.WARNING, "Cannot take a snapshot"),
+            ProgressChanged(20),
+            LogMessage(logging.INFO, "Files was successfully copied."),
+            BytesTransferred(100, 100, "100 B / 100 B"),
+        ]
+    )
+    assert batch.progress == ProgressChanged(20)
+    assert batch.transfer == BytesTransferred(100, 100, "100 B / 100 B")
+    # the warning is not hidden by the next message
+    assert batch.message == LogMessage(logging.WARNING, "Cannot take a snapshot")
+    assert batch.outcome is None
+
+    batch = coalesce([ProgressChanged(90), InstallFailed("disk full"), ProgressChanged(95)])
+    assert batch.progress == ProgressChanged(90)
+    assert batch.outcome == InstallFailed("disk full")
+
+
+class TestAppEvents:
+    @pytest.fixture(name="app")
+    def app_fixture(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> App:
+        source_dir = tmp_path / "source"
+        source_dir.joinpath("AntaresWeb").mkdir(parents=True)
+        source_dir.joinpath("AntaresWeb/server.bin").write_text("server")
+        source_dir.joinpath("config.yaml").write_text("server: {}\n")
+        monkeypatch.setattr("antares_web_installer.app.App.check_version", lambda _: "2.19.0")
+        return App(source_dir=source_dir, target_dir=tmp_path / "target", shortcut=False, launch=False)
+
+    def test_run(self, app: App) -> None:
+        events = app.events.subscribe_queue()
+        app.run()
+        published = [events.get_nowait() for _ in range(events.qsize())]
+        assert published[-1] == InstallFinished()
+        steps = [event.step for event in published if isinstance(event, StepStarted)]
+        assert sorted(steps) == ["install", "kill", "snapshot", "version"]
+        assert all(not event.failed for event in published if isinstance(event, StepFinished))
+        progress = [event.progress for event in published if isinstance(event, ProgressChanged)]
+        assert progress[-1] == pytest.approx(100)
+
+    def test_run__failed(self, app: App, monkeypatch: pytest.MonkeyPatch) -> None:
+        def kill_running_server(_: App) -> None:
+            raise InstallError("server still running")
+
+        monkeypatch.setattr("antares_web_installer.app.App.kill_running_server", kill_running_server)
+        events = app.events.subscribe_queue()
+        with pytest.raises(InstallError):
+            app.run()
+        published = [events.get_nowait() for _ in range(events.qsize())]
+        assert published[-1] == InstallFailed("server still running")
+        finished = [event for event in published if isinstance(event, StepFinished) and event.step == "kill"]
+        assert [event.failed for event in finished] == [True]
+        assert finished[0].elapsed == pytest.approx(0, abs=1)
@@ -0,0 +1,47 @@
+import hashlib
+import os
+from pathlib import Path
+
+import pytest
+
+from antares_web_installer.fastcopy import SUPPORTED_STRATEGIES, CopyStrategy, FileCopier
+
+
+@pytest.fixture(name="src_path")
+def src_path_fixture(tmp_path: Path) -> Path:
+    src_path = tmp_path.joinpath("source.bin")
+    src_path.write_bytes(os.urandom(3 * 1024 * 1024 + 17))
+    os.utime(src_path, ns=(1_700_000_000_000_000_000, 1_700_000_000_000_000_000))
+    return src_path
+
+
+class TestFileCopier:
+    @pytest.mark.parametrize("strategy", SUPPORTED_STRATEGIES)
+    def test_copy_file(self, src_path: Path, tmp_path: Path, strategy: CopyStrategy) -> None:
+        dst_path = tmp_path.joinpath("target.bin")
+        dst_path.write_bytes(b"previous content, longer than nothing")
+        # the buffered copy is always available as a fallback
+        copier = FileCopier([strategy, CopyStrategy.BUFFERED])
+        result = copier.copy_file(src_path, dst_path)
+        assert result.strategy in {strategy, CopyStrategy.BUFFERED}
+        assert result.size == src_path.stat().st_size
+        assert result.digest is None
+        assert dst_path.read_bytes() == src_path.read_bytes()
+        assert dst_path.stat().st_mtime_ns == src_path.stat().st_mtime_ns
+
+    def test_copy_file__remember_strategy(self, src_path: Path, tmp_path: Path) -> None:
+        copier = FileCopier()
+        first = copier.copy_file(src_path, tmp_path.joinpath("first.bin"))
+        second = copier.copy_file(src_path, tmp_path.joinpath("second.bin"))
+        assert first == second
+
+    def test_copy_file__hash(self, src_path: Path, tmp_path: Path) -> None:
+        dst_path = tmp_path.joinpath("target.bin")
+        result = FileCopier().copy_file(src_path, dst_path, hash_algorithm="sha256")
+        assert result.strategy == CopyStrategy.BUFFERED
+        assert result.digest == hashlib.sha256(src_path.read_bytes()).hexdigest()
+        assert dst_path.read_bytes() == src_path.read_bytes()
+
+    def test_copy_file__missing_source(self, tmp_path: Path) -> None:
+        with pytest.raises(FileNotFoundError):
+            FileCopier().copy_file(tmp_path.joinpath("missing.bin"), tmp_path.joinpath("target.bin"))
@@ -0,0 +1,146 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from antares_web_installer.app import JOURNAL_PATH, App, InstallError
+from antares_web_installer.fastcopy import FileCopier
+from antares_web_installer.journal import Journal
+from antares_web_installer.scanner import scan_tree
+from tests.helpers import write_file
+
+
+class TestJournal:
+    def test_record_and_load(self, tmp_path: Path) -> None:
+        source_dir, dst_dir = tmp_path / "source", tmp_path / "dst"
+        write_file(source_dir / "a.txt", "a")
+        write_file(source_dir / "b.txt", "b")
+        index = scan_tree(source_dir)
+        journal_path = tmp_path / "journal.jsonl"
+
+        with Journal.start(journal_path, source_dir, dst_dir, fresh=True) as journal:
+            for relpath in ("a.txt", "b.txt"):
+                write_file(dst_dir / relpath, relpath[0])
+                journal.record(index.entries[relpath], dst_dir / relpath)
+        # simulate a crash while an entry was written
+        with journal_path.open(mode="a") as f:
+            f.write('{"path": "c.tx')
+
+        found = Journal.find(journal_path, source_dir, dst_dir, fresh=True)
+        assert found is not None
+        assert list(found.entries) == ["a.txt", "b.txt"]
+        assert found.is_done(index.entries["a.txt"], dst_dir / "a.txt")
+
+        # the copied file was modified since
+        write_file(dst_dir / "b.txt", "modified")
+        assert not found.is_done(index.entries["b.txt"], dst_dir / "b.txt")
+
+    def test_find__other_copy(self, tmp_path: Path) -> None:
+        journal_path = tmp_path / "journal.jsonl"
+        Journal.start(journal_path, tmp_path / "source", tmp_path / "dst", fresh=True).close()
+        assert Journal.find(journal_path, tmp_path / "other", tmp_path / "dst") is None
+        assert Journal.find(journal_path, tmp_path / "source", tmp_path / "dst", fresh=False) is None
+        assert Journal.find(journal_path, tmp_path / "source", tmp_path / "dst") is not None
+
+    def test_discard(self, tmp_path: Path) -> None:
+        journal_path = tmp_path / "journal.jsonl"
+        Journal.start(journal_path, tmp_path / "source", tmp_path / "dst", fresh=True).discard()
+        assert not journal_path.exists()
+
+
+class TestResume:
+    @pytest.fixture(name="copied")
+    def copied_fixture(self, monkeypatch: pytest.MonkeyPatch) -> list:
+        """Record the copied files, and fail the copy of the files named "fail.txt"."""
+        copied = []
+        original_copy_file = FileCopier.copy_file
+
+        def copy_file(self, src_path: Path, dst_path: Path, hash_algorithm=None):
+            if src_path.name == "fail.txt":
+                raise PermissionError("access denied")
+            copied.append(src_path.name)
+            return original_copy_file(self, src_path, dst_path, hash_algorithm)
+
+        monkeypatch.setattr(FileCopier, "copy_file", copy_file)
+        monkeypatch.setattr("antares_web_installer.app.App.check_version", lambda _: "2.19.0")
+        return copied
+
+    def test_install_files__from_scratch(self, tmp_path: Path, copied: list) -> None:
+        source_dir, target_dir = tmp_path / "source", tmp_path / "target"
+        for name in ("a.txt", "b.txt", "c/fail.txt", "d.txt"):
+            write_file(source_dir / name, name)
+
+        app = App(source_dir=source_dir, target_dir=target_dir, nb_workers=1)
+        with pytest.raises(InstallError, match="access denied"):
+            app.install_files()
+        assert copied == ["a.txt", "b.txt", "d.txt"]
+        assert target_dir.joinpath(JOURNAL_PATH).exists()
+
+        # the interrupted installation is resumed, even though the target directory isn't empty
+        os.rename(source_dir / "c/fail.txt", source_dir / "c/ok.txt")
+        copied.clear()
+        App(source_dir=source_dir, target_dir=target_dir, nb_workers=1).install_files()
+        assert copied == ["ok.txt"]
+        assert not target_dir.joinpath(JOURNAL_PATH).exists()
+
+    def test_copy_files__incremental(self, tmp_path: Path, copied: list) -> None:
+        source_dir, target_dir = tmp_path / "source", tmp_path / "target"
+        for name in ("a.txt", "b.txt", "fail.txt"):
+            write_file(source_dir / name, f"new {name}")
+            write_file(target_dir / name, f"old {name}")
+
+        app = App(source_dir=source_dir, target_dir=target_dir, nb_workers=1)
+        with pytest.raises(InstallError, match="access denied"):
+            app.copy_files()
+        assert copied == ["a.txt", "b.txt"]
+
+        copied.clear()
+        source_dir.joinpath("fail.txt").rename(source_dir / "ok.txt")
+        App(source_dir=source_dir, target_dir=target_dir, nb_workers=1).copy_files()
+        assert copied == ["ok.txt"]
+        assert target_dir.joinpath("b.txt").read_text() == "new b.txt"
+
+    def test_copy_files__no_resume(self, tmp_path: Path, copied: list) -> None:
+        source_dir, target_dir = tmp_path / "source", tmp_path / "target"
+        for name in ("a.txt", "fail.txt"):
+            write_file(source_dir / name, f"new {name}")
+            write_file(target_dir / name, f"old {name}")
+
+        with pytest.raises(InstallError):
+            App(source_dir=source_dir, target_dir=target_dir, nb_workers=1, incremental=False).copy_files()
+        copied.clear()
+        source_dir.joinpath("fail.txt").unlink()
+        App(source_dir=source_dir, target_dir=target_dir, nb_workers=1, incremental=False, resume=False).copy_files()
+        assert copied == ["a.txt"]
+
+    def test_upgrade__resumed_after_version_copied(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        source_dir, target_dir = tmp_path / "source", tmp_path / "target"
+        config = "launcher:\n  local:\n    binaries: {}\n"
+        for root_dir, version in [(source_dir, "2.19.0"), (target_dir, "2.18.0")]:
+            write_file(root_dir / "VERSION", f"{version}\n")
+            write_file(root_dir / "AntaresWeb/server.bin", f"server {version}")
+            write_file(root_dir / "config.yaml", config)
+        original_copy_file = FileCopier.copy_file
+
+        def copy_file(self, src_path: Path, dst_path: Path, hash_algorithm=None):
+            # the upgrade is interrupted once the version file is copied
+            if src_path.name != "VERSION":
+                raise PermissionError("access denied")
+            return original_copy_file(self, src_path, dst_path, hash_algorithm)
+
+        with monkeypatch.context() as m:
+            m.setattr(FileCopier, "copy_file", copy_file)
+            with pytest.raises(InstallError, match="access denied"):
+                App(source_dir=source_dir, target_dir=target_dir, nb_workers=1).install_files()
+        assert target_dir.joinpath("VERSION").read_text() == "2.19.0\n"
+        journal = Journal.load(target_dir / JOURNAL_PATH)
+        assert journal is not None and journal.header["old_version"] == "2.18.0"
+
+        # the resumed upgrade still upgrades from the version installed before the interrupted upgrade
+        target_dir.joinpath("config.yaml").write_text(config)
+        app = App(source_dir=source_dir, target_dir=target_dir, nb_workers=1)
+        app.install_files()
+        assert app.old_version == "2.18.0"
+        assert app.version == "2.19.0"
+        assert "local_workspace" in target_dir.joinpath("config.yaml").read_text()
+        assert target_dir.joinpath("AntaresWeb/server.bin").read_text() == "server 2.19.0"
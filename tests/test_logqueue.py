@@ -0,0 +1,79 @@
+import logging
+import subprocess
+import sys
+import threading
+import typing as t
+from pathlib import Path
+
+from antares_web_installer.logqueue import BufferedFileHandler, LogQueue
+
+
+class SlowHandler(logging.Handler):
+    def __init__(self) -> None:
+        super().__init__(logging.INFO)
+        self.released = threading.Event()
+        self.messages: t.List[str] = []
+        self.threads: t.Set[threading.Thread] = set()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.released.wait(5)
+        self.threads.add(threading.current_thread())
+        self.messages.append(record.getMessage())
+
+
+class TestLogQueue:
+    def test_add_handler(self) -> None:
+        logger = logging.getLogger("test_logqueue.add_handler")
+        logger.setLevel(logging.DEBUG)
+        log_queue = LogQueue(logger)
+        handler = SlowHandler()
+        log_queue.add_handler(handler)
+        try:
+            # logging doesn't wait for the handler
+            logger.info("Copying 'README.md'")
+            logger.debug("not handled")
+            assert handler.messages == []
+            handler.released.set()
+            log_queue.flush()
+            assert handler.messages == ["Copying 'README.md'"]
+            assert threading.current_thread() not in handler.threads
+        finally:
+            log_queue.stop()
+        assert not logger.handlers
+
+    def test_remove_handler(self, tmp_path: Path) -> None:
+        logger = logging.getLogger("test_logqueue.remove_handler")
+        log_queue = LogQueue(logger)
+        log_file = tmp_path / "wizard.log"
+        handler = BufferedFileHandler(log_file)
+        log_queue.add_handler(handler)
+        try:
+            for i in range(100):
+                logger.warning(f"Message {i}")
+            log_queue.remove_handler(handler)
+            logger.warning("Not written")
+            log_queue.flush()
+        finally:
+            handler.close()
+            log_queue.stop()
+        assert log_file.read_text().splitlines() == [f"Message {i}" for i in range(100)]
+
+
+def test_buffered_file_handler(tmp_path: Path) -> None:
+    log_file = tmp_path / "wizard.log"
+    handler = BufferedFileHandler(log_file)
+    try:
+        handler.handle(logging.makeLogRecord({"msg": "Copying 'README.md'", "levelno": logging.INFO}))
+        # the file is written when the buffer is flushed...
+        assert log_file.read_text() == ""
+        # ...or right away for an error
+        handler.handle(logging.makeLogRecord({"msg": "Disk full", "levelno": logging.ERROR}))
+        assert log_file.read_text() == "Copying 'README.md'\nDisk full\n"
+    finally:
+        handler.close()
+
+
+def test_import__no_log_thread() -> None:
+    # the log thread is started by the entry points of the applications, not by importing the package
+    code = "import threading, antares_web_installer; assert threading.active_count() == 1"
+    subprocess.run([sys.executable, "-c", code], check=True)
@@ -0,0 +1,90 @@
+import hashlib
+import os
+from pathlib import Path
+
+import pytest
+
+from antares_web_installer.manifest import Manifest, hash_file, load_checksums, plan_copy
+from antares_web_installer.scanner import scan_tree
+
+
+def _write(path: Path, content: str, mtime_ns: int = 1_700_000_000_000_000_000) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+    return path
+
+
+class TestManifest:
+    def test_load__missing_file(self, tmp_path: Path) -> None:
+        manifest = Manifest.load(tmp_path.joinpath("manifest.json"))
+        assert manifest.entries == {}
+
+    def test_save_and_load(self, tmp_path: Path) -> None:
+        file_path = _write(tmp_path.joinpath("foo.txt"), "foo")
+        manifest = Manifest()
+        manifest.record("foo.txt", file_path)
+        manifest_path = tmp_path.joinpath(".installer", "manifest.json")
+        manifest.save(manifest_path)
+        assert Manifest.load(manifest_path).entries == manifest.entries
+
+    def test_digest__recomputed_when_file_changed(self, tmp_path: Path) -> None:
+        file_path = _write(tmp_path.joinpath("foo.txt"), "foo")
+        manifest = Manifest()
+        manifest.record("foo.txt", file_path)
+        _write(file_path, "bar", mtime_ns=1_800_000_000_000_000_000)
+        assert manifest.digest("foo.txt", file_path) == hash_file(file_path)
+
+
+def test_plan_copy(tmp_path: Path) -> None:
+    source_dir = tmp_path.joinpath("source")
+    target_dir = tmp_path.joinpath("target")
+
+    # identical files
+    _write(source_dir.joinpath("AntaresWeb", "same.txt"), "same")
+    _write(target_dir.joinpath("AntaresWeb", "same.txt"), "same")
+    # identical content, but different modification time
+    _write(source_dir.joinpath("AntaresWeb", "touched.txt"), "touched")
+    _write(target_dir.joinpath("AntaresWeb", "touched.txt"), "touched", mtime_ns=1_600_000_000_000_000_000)
+    # same size and modification time, different content
+    _write(source_dir.joinpath("AntaresWeb", "changed.txt"), "new")
+    _write(target_dir.joinpath("AntaresWeb", "changed.txt"), "old")
+    # new file
+    _write(source_dir.joinpath("README.md"), "readme")
+    # excluded resource
+    _write(source_dir.joinpath("config.yaml"), "config")
+
+    index = scan_tree(source_dir, excluded=[Path("config.yaml")])
+    plan = plan_copy(index, target_dir, Manifest())
+
+    assert sorted(plan.changed) == ["AntaresWeb/changed.txt", "README.md"]
+    assert sorted(plan.unchanged) == ["AntaresWeb/same.txt", "AntaresWeb/touched.txt"]
+    assert plan.bytes_to_copy == len("new") + len("readme")
+
+
+def test_plan_copy__untouched_files_not_read(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    source_dir = tmp_path.joinpath("source")
+    target_dir = tmp_path.joinpath("target")
+    _write(source_dir.joinpath("AntaresWeb", "same.txt"), "same")
+    manifest = Manifest()
+    manifest.record("AntaresWeb/same.txt", _write(target_dir.joinpath("AntaresWeb", "same.txt"), "same"))
+
+    def hash_file(path: Path) -> str:
+        raise AssertionError(f"'{path}' was read")
+
+    monkeypatch.setattr("antares_web_installer.manifest.hash_file", hash_file)
+    plan = plan_copy(scan_tree(source_dir, excluded=[]), target_dir, manifest)
+    assert plan.unchanged == ["AntaresWeb/same.txt"]
+
+
+def test_load_checksums(tmp_path: Path) -> None:
+    digest = hashlib.sha256(b"content").hexdigest()
+    checksums_path = _write(
+        tmp_path.joinpath("SHA256SUMS"),
+        f"{digest}  AntaresWeb/server.bin\n{digest.upper()} *./README.md\n\n",
+    )
+    assert load_checksums(checksums_path) == {"AntaresWeb/server.bin": digest, "README.md": digest}
+
+    _write(checksums_path, "not a checksum line\n")
+    with pytest.raises(ValueError, match="line 1"):
+        load_checksums(checksums_path)
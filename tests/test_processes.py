@@ -0,0 +1,136 @@
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import typing as t
+from pathlib import Path
+
+import psutil
+import pytest
+
+from antares_web_installer.processes import (
+    ProcessInfo,
+    ServerFinder,
+    ServerLock,
+    find_port_holder,
+    is_port_free,
+    stop_processes,
+    wait_port_released,
+)
+
+
+@pytest.fixture(name="finder")
+def finder_fixture(tmp_path: Path) -> ServerFinder:
+    return ServerFinder(tmp_path / "AntaresWeb" / "AntaresWebServer", tmp_path)
+
+
+class TestServerFinder:
+    def test_matches(self, finder: ServerFinder, tmp_path: Path) -> None:
+        username = finder.username
+        server_path = str(tmp_path / "AntaresWeb" / "AntaresWebServer")
+        assert finder.matches(ProcessInfo(1, exe=server_path, username=username))
+        assert finder.matches(ProcessInfo(1, exe=server_path + " (deleted)", username=username))
+        # the servers of other installations or other users
+        assert not finder.matches(ProcessInfo(1, exe=str(tmp_path / "other/AntaresWebServer"), username=username))
+        assert not finder.matches(ProcessInfo(1, exe=server_path, username=f"not-{username}"))
+        # the executable can't be read: the name and the working directory are used
+        name = "AntaresWebServer"
+        assert finder.matches(ProcessInfo(1, name=name, cwd=str(tmp_path), username=username))
+        assert not finder.matches(ProcessInfo(1, name=name, cwd=str(tmp_path.parent), username=username))
+        assert not finder.matches(ProcessInfo(1, name="AntaresWebServer2", cwd=str(tmp_path), username=username))
+
+    @pytest.mark.skipif(os.name != "posix", reason="copies a POSIX executable")
+    def test_find(self, finder: ServerFinder, tmp_path: Path) -> None:
+        server_path = tmp_path / "AntaresWeb" / "AntaresWebServer"
+        server_path.parent.mkdir()
+        shutil.copy2(sys.executable, server_path)
+        other_path = shutil.copy2(sys.executable, tmp_path / "AntaresWebServer")
+        args = ["-c", "import time; time.sleep(30)"]
+        processes = [subprocess.Popen([path, *args]) for path in (server_path, other_path)]
+        try:
+            assert [p.pid for p in finder.find()] == [processes[0].pid]
+            infos = [info for info in finder.iter_psutil() if finder.matches(info)]
+            assert [info.pid for info in infos] == [processes[0].pid]
+        finally:
+            for process in processes:
+                process.kill()
+                process.wait()
+        assert finder.find() == []
+
+    @pytest.mark.skipif(os.name != "posix", reason="copies a POSIX executable")
+    def test_record_and_find_locked(self, finder: ServerFinder, tmp_path: Path) -> None:
+        server_path = tmp_path / "AntaresWeb" / "AntaresWebServer"
+        server_path.parent.mkdir()
+        shutil.copy2(sys.executable, server_path)
+        lock_path = tmp_path / ".installer/server.json"
+        # the server is launched by a shell, which doesn't replace itself with the server
+        shell = subprocess.Popen(f"'{server_path}' -c 'import time; time.sleep(30)'; exit 0", shell=True)
+        try:
+            servers: t.List[psutil.Process] = []
+            while not servers and shell.poll() is None:
+                servers = finder.scan()
+            server = servers[0]
+            lock = finder.record(psutil.Process(shell.pid), 8080, lock_path)
+            assert lock == ServerLock(server.pid, server.create_time(), 8080, str(server_path))
+            assert ServerLock.load(lock_path) == lock
+            assert finder.find_locked(lock_path) == [server]
+            server.kill()
+            server.wait(5)
+        finally:
+            shell.kill()
+            shell.wait()
+        # the recorded process is gone: the lock file is stale
+        assert finder.find_locked(lock_path) is None
+        assert not lock_path.exists()
+
+    def test_find_locked__other_process(self, finder: ServerFinder, tmp_path: Path) -> None:
+        lock_path = tmp_path / "server.json"
+        # the identifier of the recorded server is reused by another process
+        current = psutil.Process()
+        exe = str(tmp_path / "AntaresWeb/AntaresWebServer")
+        ServerLock(current.pid, current.create_time(), 8080, exe).save(lock_path)
+        assert finder.find(lock_path) == []
+        assert not lock_path.exists()
+
+    def test_find__no_server(self, finder: ServerFinder) -> None:
+        assert finder.find() == []
+        assert psutil.Process().pid not in [info.pid for info in finder.iter_psutil() if finder.matches(info)]
+
+
+class TestStopProcesses:
+    @pytest.mark.skipif(os.name != "posix", reason="Windows processes can't ignore the termination")
+    def test_stop_processes(self) -> None:
+        code = "import signal, sys, time; {}; sys.stdout.write('ready\\n'); sys.stdout.flush(); time.sleep(30)"
+        graceful = subprocess.Popen([sys.executable, "-c", code.format("pass")], stdout=subprocess.PIPE)
+        stubborn = subprocess.Popen(
+            [sys.executable, "-c", code.format("signal.signal(signal.SIGTERM, signal.SIG_IGN)")], stdout=subprocess.PIPE
+        )
+        for popen in (graceful, stubborn):
+            assert popen.stdout is not None
+            popen.stdout.readline()
+        processes = [psutil.Process(graceful.pid), psutil.Process(stubborn.pid)]
+
+        assert stop_processes(processes, timeout=0.5) == []
+        # only the process which ignored the termination request was killed
+        # (the `returncode` attribute is set by `psutil.wait_procs`, it isn't declared by `psutil.Process`)
+        assert [getattr(process, "returncode") for process in processes] == [-signal.SIGTERM, -signal.SIGKILL]
+
+    def test_wait_port_released(self) -> None:
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as server:
+            server.bind(("127.0.0.1", 0))
+            server.listen()
+            port = server.getsockname()[1]
+            assert not is_port_free("127.0.0.1", port)
+            assert not wait_port_released("127.0.0.1", port, timeout=0.2)
+        assert wait_port_released("127.0.0.1", port, timeout=0.2)
+
+    def test_find_port_holder(self) -> None:
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as server:
+            server.bind(("127.0.0.1", 0))
+            server.listen()
+            port = server.getsockname()[1]
+            holder = find_port_holder(port)
+            assert holder is not None and holder.pid == os.getpid()
+        assert find_port_holder(port) is None
@@ -0,0 +1,57 @@
+import pytest
+
+from antares_web_installer.progress import TransferProgress, format_duration, format_size
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.mark.parametrize(
+    "nbytes, expected",
+    [
+        (0, "0 B"),
+        (1023, "1023 B"),
+        (2048, "2.0 KB"),
+        (5 * 1024**2 + 1024**2 // 2, "5.5 MB"),
+        (3 * 1024**4, "3072.0 GB"),
+    ],
+)
+def test_format_size(nbytes: int, expected: str) -> None:
+    assert format_size(nbytes) == expected
+
+
+@pytest.mark.parametrize("seconds, expected", [(4.4, "4 s"), (125, "2 min 05 s")])
+def test_format_duration(seconds: float, expected: str) -> None:
+    assert format_duration(seconds) == expected
+
+
+class TestTransferProgress:
+    def test_advance(self) -> None:
+        clock = FakeClock()
+        transfer = TransferProgress(total_bytes=100 * 1024**2, report_interval=0.5, clock=clock)
+
+        # reports are throttled
+        clock.now = 0.1
+        assert not transfer.advance(1024**2)
+
+        clock.now = 1.0
+        assert transfer.advance(9 * 1024**2)
+        assert transfer.fraction == pytest.approx(0.1)
+        assert transfer.throughput == pytest.approx(10 * 1024**2)
+        assert transfer.eta == pytest.approx(9.0)
+        assert str(transfer) == "10.0 MB / 100.0 MB, 10.0 MB/s, 9 s remaining"
+
+        # the completion is always reported
+        clock.now = 1.1
+        assert transfer.advance(90 * 1024**2)
+        assert transfer.fraction == 1.0
+
+    def test_empty_transfer(self) -> None:
+        transfer = TransferProgress(total_bytes=0)
+        assert transfer.fraction == 1.0
+        assert transfer.eta is None
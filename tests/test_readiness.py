@@ -0,0 +1,70 @@
+import http.server
+import socket
+import threading
+import typing as t
+
+import pytest
+
+from antares_web_installer.readiness import ReadinessProber, ReadinessTimeout, ServerExitedError
+
+
+@pytest.fixture(name="unused_tcp_port")
+def unused_tcp_port_fixture() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture(name="health_server")
+def health_server_fixture() -> t.Iterator[http.server.HTTPServer]:
+    """HTTP server whose health check fails for the first two requests."""
+    statuses = [503, 503]
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self) -> None:
+            status = statuses.pop(0) if statuses else 200
+            body = b'{"status": "available"}' if status == 200 else b"starting"
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args: t.Any) -> None:
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class TestReadinessProber:
+    def test_wait(self, health_server: http.server.HTTPServer) -> None:
+        url = f"http://127.0.0.1:{health_server.server_address[1]}/api/health"
+        failures = []
+        probes = []
+        result = ReadinessProber(url, timeout=10, initial_delay=0.01).wait(
+            on_failure=lambda *args: failures.append(args),
+            on_probe=lambda *args: probes.append(args),
+        )
+        assert result.nb_probes == 3
+        assert [nb for nb, _ in failures] == [1, 2]
+        assert "503" in failures[0][1]
+        # each probe is measured, including the successful one
+        assert [(nb, reason) for nb, _, reason in probes] == [(nb, reason) for nb, reason in failures] + [(3, None)]
+        assert all(elapsed >= 0 for _, elapsed, _ in probes)
+        assert result.elapsed < 5
+
+    def test_wait__timeout(self, unused_tcp_port: int) -> None:
+        prober = ReadinessProber(f"http://127.0.0.1:{unused_tcp_port}/api/health", timeout=0.2, initial_delay=0.01)
+        with pytest.raises(ReadinessTimeout, match="not listening"):
+            prober.wait()
+
+    def test_wait__server_exited(self, unused_tcp_port: int) -> None:
+        prober = ReadinessProber(f"http://127.0.0.1:{unused_tcp_port}/api/health", timeout=10)
+        with pytest.raises(ServerExitedError):
+            prober.wait(is_alive=lambda: False)
@@ -0,0 +1,30 @@
+from pathlib import Path
+
+from antares_web_installer.scanner import scan_tree
+
+
+def test_scan_tree(tmp_path: Path) -> None:
+    for relpath, content in [("AntaresWeb/server.bin", "server"), ("AntaresWeb/lib/a.so", "a"), ("studies/x", "xy")]:
+        file_path = tmp_path.joinpath(relpath)
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_text(content)
+
+    index = scan_tree(tmp_path, excluded=[Path("studies")])
+
+    # parent directories are listed before their content
+    assert list(index.entries) == [
+        "AntaresWeb",
+        "studies",
+        "AntaresWeb/lib",
+        "AntaresWeb/server.bin",
+        "AntaresWeb/lib/a.so",
+        "studies/x",
+    ]
+    assert index.entries["AntaresWeb/server.bin"].size == len("server")
+    assert index.entries["AntaresWeb/lib"].is_dir
+    assert index.entries["studies/x"].excluded
+    assert not index.entries["AntaresWeb/lib/a.so"].excluded
+    assert index.total_size() == 9
+    assert index.total_size(include_excluded=False) == 7
+    assert [entry.relpath for entry in index.top_level(include_excluded=False)] == ["AntaresWeb"]
+    assert index.describe() == "3 files (1 excluded), 3 directories, 9 B (7 B of program files)"
@@ -0,0 +1,90 @@
+import os
+import socket
+import textwrap
+import time
+from pathlib import Path
+
+import pytest
+
+from antares_web_installer.app import SERVER_OUTPUT_PATH, App, InstallError
+from antares_web_installer.serveroutput import OutputMonitor
+
+
+class TestOutputMonitor:
+    def test_feed(self, tmp_path: Path) -> None:
+        monitor = OutputMonitor(tmp_path / "output.log", tail_size=2)
+        monitor.feed("INFO:     Started server process [1234]\n")
+        monitor.feed("INFO:     Waiting for application startup.\n")
+        assert not monitor.event.is_set()
+        monitor.feed("INFO:     Application startup complete.\n")
+        assert monitor.ready and monitor.fatal_line is None
+        assert monitor.event.is_set()
+        assert monitor.tail() == [
+            "INFO:     Waiting for application startup.",
+            "INFO:     Application startup complete.",
+        ]
+
+    def test_follow(self, tmp_path: Path) -> None:
+        output_path = tmp_path / "output.log"
+        with output_path.open(mode="w") as output, OutputMonitor(output_path) as monitor:
+            output.write("ERROR:    [Errno 98] error while attempting to bind on address ('127.0.0.1', 8080): ")
+            output.flush()
+            time.sleep(0.1)
+            # the line is only processed once complete
+            assert monitor.tail() == []
+            output.write("address already in use\n")
+            output.flush()
+            assert monitor.event.wait(5)
+            output.write("INFO:     Waiting for application shutdown.\n")
+            output.flush()
+        assert monitor.fatal_line is not None and monitor.fatal_line.startswith("ERROR:    [Errno 98]")
+        assert monitor.tail()[-1] == "INFO:     Waiting for application shutdown."
+
+
+def test_start_server__missing_server(tmp_path: Path) -> None:
+    app = App(source_dir=tmp_path, target_dir=tmp_path, shortcut=False)
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    tmp_path.joinpath("config.yaml").write_text(f"server:\n  port: {port}\n")
+    with pytest.raises(InstallError, match="Cannot start the server"):
+        app.start_server()
+
+
+@pytest.mark.skipif(os.name != "posix", reason="the fake server is a shell script")
+class TestAppStartServer:
+    def test_start_server__fatal_error(self, tmp_path: Path) -> None:
+        app = App(source_dir=tmp_path, target_dir=tmp_path, shortcut=False, server_start_timeout=60)
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        tmp_path.joinpath("config.yaml").write_text(f"server:\n  port: {port}\n")
+        app.server_path.parent.mkdir(parents=True)
+        script = """\
+            #!/bin/sh
+            echo "INFO:     Started server process [$$]"
+            echo "ERROR:    [Errno 98] error while attempting to bind on address: address already in use" >&2
+            sleep 30
+        """
+        app.server_path.write_text(textwrap.dedent(script))
+        app.server_path.chmod(0o755)
+
+        start = time.monotonic()
+        with pytest.raises(InstallError, match="Server failed to start: ERROR: .* address already in use") as ctx:
+            app.start_server()
+        assert time.monotonic() - start < 30
+        assert "Started server process" in str(ctx.value)
+        assert "address already in use" in tmp_path.joinpath(SERVER_OUTPUT_PATH).read_text()
+
+    def test_start_server__port_in_use(self, tmp_path: Path) -> None:
+        app = App(source_dir=tmp_path, target_dir=tmp_path, shortcut=False, server_start_timeout=60)
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            sock.bind(("127.0.0.1", 0))
+            sock.listen()
+            port = sock.getsockname()[1]
+            tmp_path.joinpath("config.yaml").write_text(f"server:\n  host: 127.0.0.1\n  port: {port}\n")
+            assert app.server_url == f"http://127.0.0.1:{port}"
+            # the port is held by the test process: the server is not launched
+            with pytest.raises(InstallError, match=f"port {port} is already in use by the process {os.getpid()}"):
+                app.start_server()
+        assert not tmp_path.joinpath(SERVER_OUTPUT_PATH).exists()
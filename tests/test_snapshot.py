@@ -0,0 +1,154 @@
+import types
+from pathlib import Path
+
+import pytest
+
+from antares_web_installer.app import SNAPSHOTS_PATH, App, InstallError
+from antares_web_installer.fastcopy import CopyStrategy, FileCopier
+from antares_web_installer.snapshot import Snapshot, SnapshotError, SnapshotStore
+from tests.helpers import write_file
+
+
+@pytest.fixture(name="target_dir")
+def target_dir_fixture(tmp_path: Path) -> Path:
+    target_dir = tmp_path / "target"
+    write_file(target_dir / "AntaresWeb/server.bin", "old server")
+    write_file(target_dir / "config.yaml", "old: true")
+    write_file(target_dir / "studies/study/input.txt", "study data")
+    write_file(target_dir / "database.db", "database")
+    write_file(target_dir / ".installer/manifest.json", "{}")
+    return target_dir
+
+
+def _create(store: SnapshotStore, target_dir: Path, version: str = "2.19.0") -> Snapshot:
+    return store.create(
+        target_dir, version, excluded={".installer"}, program_files={"AntaresWeb"}, user_data={"studies"}
+    )
+
+
+@pytest.fixture(name="cloning_store")
+def cloning_store_fixture(target_dir: Path) -> SnapshotStore:
+    """Snapshot store behaving as if the file system supported reflinks."""
+    store = SnapshotStore(target_dir / ".installer/snapshots")
+    store._reflink_supported = True
+    store._file_copier = FileCopier([CopyStrategy.BUFFERED])
+    return store
+
+
+class TestSnapshotStore:
+    def test_create(self, target_dir: Path) -> None:
+        store = SnapshotStore(target_dir / ".installer/snapshots")
+        store._reflink_supported = False
+        snapshot = _create(store, target_dir)
+        assert snapshot.nb_files == 3
+        assert not snapshot.user_data
+        assert store.list() == [snapshot]
+        assert store.get() == snapshot
+        assert store.get(snapshot.name) == snapshot
+        assert "without user data" in str(snapshot)
+        assert not snapshot.files_dir.joinpath(".installer").exists()
+        # without reflinks, the user data isn't copied
+        assert not snapshot.files_dir.joinpath("studies").exists()
+        # the program files are hard-linked, the databases and the configuration are copied
+        assert snapshot.files_dir.joinpath("AntaresWeb/server.bin").stat().st_nlink == 2
+        assert snapshot.files_dir.joinpath("database.db").stat().st_nlink == 1
+        assert snapshot.files_dir.joinpath("config.yaml").read_text() == "old: true"
+        assert snapshot.files_dir.joinpath("config.yaml").stat().st_nlink == 1
+
+    def test_create__reflinks(self, cloning_store: SnapshotStore, target_dir: Path) -> None:
+        snapshot = _create(cloning_store, target_dir)
+        assert snapshot.nb_files == 4
+        assert snapshot.user_data
+        assert cloning_store.list() == [snapshot]
+        assert snapshot.files_dir.joinpath("studies/study/input.txt").read_text() == "study data"
+        assert snapshot.files_dir.joinpath("studies/study/input.txt").stat().st_nlink == 1
+
+    def test_create__not_enough_space(self, target_dir: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        store = SnapshotStore(target_dir / ".installer/snapshots")
+        store._reflink_supported = False
+        monkeypatch.setattr("shutil.disk_usage", lambda _: types.SimpleNamespace(free=0))
+        with pytest.raises(SnapshotError, match="Not enough disk space"):
+            _create(store, target_dir)
+        assert not any(store.root_dir.iterdir())
+
+    def test_get__unknown(self, tmp_path: Path) -> None:
+        with pytest.raises(SnapshotError, match="No snapshot"):
+            SnapshotStore(tmp_path).get()
+        with pytest.raises(SnapshotError, match="'foo' not found"):
+            SnapshotStore(tmp_path).get("foo")
+
+    def test_prune(self, target_dir: Path) -> None:
+        store = SnapshotStore(target_dir / ".installer/snapshots")
+        snapshots = [_create(store, target_dir, version) for version in ("1.0", "2.0", "3.0")]
+        store.root_dir.joinpath("~interrupted.tmp").mkdir()
+        assert store.prune(keep=2) == snapshots[:1]
+        assert store.list() == snapshots[1:]
+        assert sorted(p.name for p in store.root_dir.iterdir()) == [s.name for s in snapshots[1:]]
+
+    def test_restore(self, target_dir: Path) -> None:
+        store = SnapshotStore(target_dir / ".installer/snapshots")
+        snapshot = _create(store, target_dir)
+        # the upgrade replaces the files, the snapshot keeps their previous content
+        target_dir.joinpath("config.yaml").unlink()
+        write_file(target_dir / "config.yaml", "new: true")
+        write_file(target_dir / "AntaresWeb/new.so", "new library")
+
+        kept_dir = store.restore(snapshot, target_dir, excluded={".installer"}, program_files={"AntaresWeb"})
+        assert target_dir.joinpath("config.yaml").read_text() == "old: true"
+        assert not target_dir.joinpath("AntaresWeb/new.so").exists()
+        assert target_dir.joinpath("studies/study/input.txt").read_text() == "study data"
+        assert target_dir.joinpath(".installer/manifest.json").exists()
+        assert store.list() == []
+        # the configuration modified by the upgrade is kept aside
+        assert kept_dir is not None
+        assert kept_dir.joinpath("config.yaml").read_text() == "new: true"
+        assert sorted(p.relative_to(kept_dir).as_posix() for p in kept_dir.rglob("*")) == ["config.yaml"]
+
+    def test_restore__user_data_created_after_snapshot(self, cloning_store: SnapshotStore, target_dir: Path) -> None:
+        store = cloning_store
+        snapshot = _create(store, target_dir)
+        write_file(target_dir / "studies/new_study/input.txt", "new study")
+        write_file(target_dir / "matrices/matrix.txt", "new matrix")
+
+        assert store.restore(snapshot, target_dir, excluded={".installer"}, program_files={"AntaresWeb"}) is None
+        assert target_dir.joinpath("studies/new_study/input.txt").read_text() == "new study"
+        assert target_dir.joinpath("studies/study/input.txt").read_text() == "study data"
+        assert target_dir.joinpath("matrices/matrix.txt").read_text() == "new matrix"
+        assert not any(store.root_dir.iterdir())
+
+
+class TestAppSnapshots:
+    @pytest.fixture(name="app")
+    def app_fixture(self, tmp_path: Path, target_dir: Path, monkeypatch: pytest.MonkeyPatch) -> App:
+        source_dir = tmp_path / "source"
+        write_file(source_dir / "AntaresWeb/server.bin", "new server")
+        write_file(source_dir / "config.yaml", "desktop_mode: false")
+        monkeypatch.setattr("antares_web_installer.app.App.check_version", lambda _: "2.19.0")
+        monkeypatch.setattr("antares_web_installer.app.App.kill_running_server", lambda _: None)
+        return App(source_dir=source_dir, target_dir=target_dir, shortcut=False, launch=False, nb_snapshots=1)
+
+    def test_run_and_rollback(self, app: App) -> None:
+        app.run()
+        assert app.target_dir.joinpath("AntaresWeb/server.bin").read_text() == "new server"
+        assert app.target_dir.joinpath("config.yaml").read_text() == "desktop_mode: true\n"
+        store = SnapshotStore(app.target_dir / SNAPSHOTS_PATH)
+        assert [snapshot.version for snapshot in store.list()] == ["2.19.0"]
+
+        # a second upgrade replaces the first snapshot
+        app.run()
+        assert len(store.list()) == 1
+
+        app.rollback()
+        assert app.target_dir.joinpath("AntaresWeb/server.bin").read_text() == "new server"
+        with pytest.raises(InstallError, match="No snapshot"):
+            app.rollback()
+
+    def test_rollback__previous_version(self, app: App) -> None:
+        app.run()
+        write_file(app.target_dir / "studies/new_study/input.txt", "new study")
+        app.rollback()
+        assert app.target_dir.joinpath("AntaresWeb/server.bin").read_text() == "old server"
+        assert app.target_dir.joinpath("config.yaml").read_text() == "old: true"
+        assert app.target_dir.joinpath("studies/study/input.txt").read_text() == "study data"
+        # the study created after the upgrade is not lost
+        assert app.target_dir.joinpath("studies/new_study/input.txt").read_text() == "new study"
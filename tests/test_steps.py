@@ -0,0 +1,68 @@
+import threading
+import time
+import typing as t
+
+import pytest
+
+from antares_web_installer.steps import Step, StepError, StepScheduler
+
+
+class TestStepScheduler:
+    def test_run(self) -> None:
+        started: t.List[str] = []
+        barrier = threading.Barrier(2, timeout=5)
+
+        def step(name: str, wait: bool = False) -> t.Callable[[], None]:
+            def func() -> None:
+                started.append(name)
+                if wait:
+                    # fails if the other independent step doesn't run concurrently
+                    barrier.wait()
+
+            return func
+
+        scheduler = StepScheduler(
+            [
+                Step("stage", step("stage", wait=True)),
+                Step("version", step("version", wait=True)),
+                Step("kill", step("kill"), requires=["stage"]),
+                Step("install", step("install"), requires=["kill"]),
+                Step("launch", step("launch"), requires=["install", "version"]),
+            ]
+        )
+        timings = scheduler.run()
+        assert sorted(started[:2]) == ["stage", "version"]
+        assert started[2:] == ["kill", "install", "launch"]
+        assert set(timings) == {"stage", "version", "kill", "install", "launch"}
+
+    def test_run__errors(self) -> None:
+        started: t.List[str] = []
+
+        def fail(name: str, delay: float) -> t.Callable[[], None]:
+            def func() -> None:
+                started.append(name)
+                time.sleep(delay)
+                raise RuntimeError(f"{name} failed")
+
+            return func
+
+        scheduler = StepScheduler(
+            [
+                # the first declared step fails last: its error is reported anyway
+                Step("stage", fail("stage", 0.2)),
+                Step("version", fail("version", 0)),
+                Step("kill", lambda: started.append("kill"), requires=["version"]),
+            ]
+        )
+        with pytest.raises(RuntimeError, match="stage failed"):
+            scheduler.run()
+        assert list(scheduler.errors) == ["stage", "version"]
+        # no step is started after a failure
+        assert "kill" not in started
+        assert set(scheduler.timings) == {"stage", "version"}
+
+    def test_check_graph(self) -> None:
+        with pytest.raises(StepError, match="unknown"):
+            StepScheduler([Step("kill", lambda: None, requires=["stage"])])
+        with pytest.raises(StepError, match="Cyclic"):
+            StepScheduler([Step("a", lambda: None, requires=["b"]), Step("b", lambda: None, requires=["a"])])
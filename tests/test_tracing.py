@@ -0,0 +1,101 @@
+import json
+import threading
+from pathlib import Path
+
+import pytest
+
+from antares_web_installer.app import TRACE_PATH, App, InstallError
+from antares_web_installer.tracing import Tracer
+
+
+class TestTracer:
+    def test_span(self) -> None:
+        tracer = Tracer()
+        with tracer.span("install"):
+            with tracer.span("copy") as copy_span:
+                on_copied = copy_span.counting(lambda relpath, size: None)
+                threads = [threading.Thread(target=on_copied, args=(f"file{i}", 10)) for i in range(4)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+            tracer.add_span("probe", 0.5, probe=1)
+        with pytest.raises(ValueError):
+            with tracer.span("launch"):
+                raise ValueError("port in use")
+
+        spans = {span.name: span for span in tracer.spans}
+        assert list(spans) == ["install/copy", "install/probe", "install", "launch"]
+        # the copied files are counted by the parent spans
+        assert (spans["install/copy"].nb_bytes, spans["install/copy"].nb_files) == (40, 4)
+        assert (spans["install"].nb_bytes, spans["install"].nb_files) == (40, 4)
+        assert spans["install/probe"].attrs == {"probe": 1}
+        assert spans["launch"].failed
+        assert spans["install"].wall_time >= spans["install/copy"].wall_time
+
+    def test_summary(self) -> None:
+        tracer = Tracer()
+        with tracer.span("launch"):
+            for nb in range(1, 4):
+                tracer.add_span("probe", 0.1, probe=nb)
+        lines = tracer.summary().splitlines()
+        assert lines[0].split() == ["Phase", "Wall", "CPU", "Bytes", "Files"]
+        assert lines[1].startswith("launch ")
+        # the sibling spans of the same name are summed up
+        assert lines[2].split()[:4] == ["probe", "(x3)", "0.300", "s"]
+        assert len(lines) == 3
+
+    def test_write(self, tmp_path: Path) -> None:
+        tracer = Tracer()
+        with tracer.span("kill"):
+            pass
+        trace_path = tmp_path / "logs" / "install-trace.jsonl"
+        tracer.write(trace_path)
+        tracer.write(trace_path)
+        records = [json.loads(line) for line in trace_path.read_text().splitlines()]
+        assert len(records) == 2
+        assert records[0]["run"] == tracer.run_id
+        assert records[0]["name"] == "kill"
+        assert set(records[0]) >= {"start", "wall_time", "cpu_time", "bytes", "files", "failed"}
+
+
+def test_app_trace(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    source_dir = tmp_path / "source"
+    source_dir.joinpath("AntaresWeb").mkdir(parents=True)
+    source_dir.joinpath("AntaresWeb/server.bin").write_text("server")
+    source_dir.joinpath("config.yaml").write_text("server: {}\n")
+    monkeypatch.setattr("antares_web_installer.app.App.check_version", lambda _: "2.19.0")
+    app = App(source_dir=source_dir, target_dir=tmp_path / "target", shortcut=False, launch=False)
+    app.run()
+
+    records = [json.loads(line) for line in app.target_dir.joinpath(TRACE_PATH).read_text().splitlines()]
+    by_name = {record["name"]: record for record in records}
+    assert {"version", "kill", "snapshot", "install", "install/copy", "install/copy/AntaresWeb"} <= set(by_name)
+    assert by_name["install/copy/AntaresWeb"]["files"] == 1
+    assert by_name["install/copy/AntaresWeb"]["bytes"] == len("server")
+    assert by_name["install"]["files"] == 2
+
+
+def test_app_trace__failed_fresh_install(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    source_dir = tmp_path / "source"
+    source_dir.joinpath("AntaresWeb").mkdir(parents=True)
+    source_dir.joinpath("AntaresWeb/server.bin").write_text("server")
+    source_dir.joinpath("config.yaml").write_text("server: {}\n")
+    monkeypatch.setattr("antares_web_installer.app.App.check_version", lambda _: "2.19.0")
+
+    def kill_running_server(_: App) -> None:
+        raise InstallError("server still running")
+
+    with monkeypatch.context() as m:
+        m.setattr("antares_web_installer.app.App.kill_running_server", kill_running_server)
+        app = App(source_dir=source_dir, target_dir=tmp_path / "target", shortcut=False, launch=False)
+        with pytest.raises(InstallError):
+            app.run()
+    assert app.target_dir.joinpath(TRACE_PATH).is_file()
+
+    # the trace of the failed installation doesn't make the retry an upgrade
+    retry = App(source_dir=source_dir, target_dir=tmp_path / "target", shortcut=False, launch=False)
+    assert not retry._has_existing_files()
+    retry.run()
+    assert retry.old_version is None
+    assert retry.target_dir.joinpath("AntaresWeb/server.bin").read_text() == "server"
@@ -0,0 +1,115 @@
+import os
+import shutil
+import threading
+from pathlib import Path
+
+import pytest
+
+from antares_web_installer.app import App
+from antares_web_installer.versions import VersionError, VersionResolver, parse_version, read_version_file
+
+
+def write_server(server_path: Path, version: str) -> Path:
+    """Write a fake server which prints its version, and counts its runs in a file."""
+    runs_path = server_path.with_name("runs.txt")
+    server_path.parent.mkdir(parents=True, exist_ok=True)
+    server_path.write_text(f"#!/bin/sh\necho run >> '{runs_path}'\necho '{version}'\n")
+    server_path.chmod(0o755)
+    return runs_path
+
+
+def count_runs(runs_path: Path) -> int:
+    return len(runs_path.read_text().splitlines()) if runs_path.exists() else 0
+
+
+def test_parse_version() -> None:
+    assert parse_version("2.19.0\n") == "2.19.0"
+    assert parse_version("2.18 (build 42)") == "2.18"
+    assert parse_version("AntaresWeb 2.18") is None
+
+
+def test_read_version_file(tmp_path: Path) -> None:
+    assert read_version_file(tmp_path) is None
+    tmp_path.joinpath("VERSION").write_text("2.19.1\n")
+    assert read_version_file(tmp_path) == "2.19.1"
+
+
+@pytest.mark.skipif(os.name != "posix", reason="runs a shell script")
+class TestVersionResolver:
+    def test_resolve__version_file(self, tmp_path: Path) -> None:
+        server_path = tmp_path / "AntaresWeb" / "AntaresWebServer"
+        runs_path = write_server(server_path, "2.18.0")
+        tmp_path.joinpath("VERSION").write_text("2.19.0")
+        assert VersionResolver().resolve(tmp_path, server_path) == "2.19.0"
+        assert count_runs(runs_path) == 0
+
+    def test_probe__cached(self, tmp_path: Path) -> None:
+        server_path = tmp_path / "AntaresWeb" / "AntaresWebServer"
+        runs_path = write_server(server_path, "2.19.0")
+        cache_path = tmp_path / ".installer" / "versions.json"
+
+        resolver = VersionResolver(cache_path)
+        threads = [threading.Thread(target=resolver.probe, args=(server_path,)) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # the concurrent requests are served by a single run
+        assert count_runs(runs_path) == 1
+
+        # the cache is shared by the next installations
+        assert VersionResolver(cache_path).resolve(tmp_path, server_path) == "2.19.0"
+        assert count_runs(runs_path) == 1
+
+        # the executable was replaced: it is run again
+        write_server(server_path, "2.19.1")
+        stat = server_path.stat()
+        os.utime(server_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        assert VersionResolver(cache_path).resolve(tmp_path, server_path) == "2.19.1"
+        assert count_runs(runs_path) == 2
+
+    def test_resolve__copy(self, tmp_path: Path) -> None:
+        source_path = tmp_path / "source" / "AntaresWeb" / "AntaresWebServer"
+        runs_path = write_server(source_path, "2.19.0")
+        resolver = VersionResolver()
+        assert resolver.probe(source_path) == "2.19.0"
+
+        # the installed executable is a copy of the probed one
+        target_path = tmp_path / "target" / "AntaresWeb" / "AntaresWebServer"
+        target_path.parent.mkdir(parents=True)
+        shutil.copy2(source_path, target_path)
+        assert resolver.resolve(target_path.parents[1], target_path, copy_of=source_path) == "2.19.0"
+        assert count_runs(runs_path) == 1
+
+    def test_probe__errors(self, tmp_path: Path) -> None:
+        server_path = tmp_path / "AntaresWebServer"
+        resolver = VersionResolver()
+        with pytest.raises(VersionError, match="Can't check version"):
+            resolver.probe(server_path)
+        server_path.write_text("#!/bin/sh\necho 'fatal error' >&2\nexit 1\n")
+        server_path.chmod(0o755)
+        with pytest.raises(VersionError, match=r"\| fatal error"):
+            resolver.probe(server_path)
+        write_server(server_path, "unknown")
+        with pytest.raises(VersionError, match="No version found"):
+            resolver.probe(server_path)
+
+
+@pytest.mark.skipif(os.name != "posix", reason="runs a shell script")
+def test_install_files__version(tmp_path: Path) -> None:
+    source_dir = tmp_path / "source"
+    target_dir = tmp_path / "target"
+    runs_path = write_server(source_dir / "AntaresWeb" / "AntaresWebServer", "2.19.0")
+    source_dir.joinpath("config.yaml").write_text("server: {}\n")
+    write_server(target_dir / "AntaresWeb" / "AntaresWebServer", "2.18.3")
+    target_dir.joinpath("config.yaml").write_text("server: {}\n")
+    target_dir.joinpath("VERSION").write_text("2.18.3")
+
+    app = App(source_dir=source_dir, target_dir=target_dir, shortcut=False, launch=False)
+    app.install_files()
+    assert app.old_version == "2.18.3"
+    assert app.version == "2.19.0"
+    # the version file of the previous installation is obsolete
+    assert not target_dir.joinpath("VERSION").exists()
+    # the installed server is a copy of the source server, which was probed only once
+    assert count_runs(runs_path) == 1
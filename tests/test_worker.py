@@ -0,0 +1,75 @@
+import time
+import typing as t
+from pathlib import Path
+
+import pytest
+
+from antares_web_installer import log_queue
+from antares_web_installer.events import Event, InstallFailed, InstallFinished, ProgressChanged
+from antares_web_installer.gui.logger import LogFileHandler
+from antares_web_installer.gui.worker import InstallerProcess
+
+POLL_TIMEOUT = 60.0
+
+
+def wait_for_outcome(worker: InstallerProcess) -> t.List[Event]:
+    events: t.List[Event] = []
+    deadline = time.monotonic() + POLL_TIMEOUT
+    while time.monotonic() < deadline:
+        events.extend(worker.poll_events(max_events=1000))
+        if events and isinstance(events[-1], (InstallFinished, InstallFailed)):
+            return events
+        time.sleep(0.05)
+    pytest.fail("The installation process did not report the end of the installation")
+
+
+@pytest.fixture(name="source_dir")
+def source_dir_fixture(tmp_path: Path) -> Path:
+    source_dir = tmp_path / "source"
+    source_dir.joinpath("AntaresWeb").mkdir(parents=True)
+    source_dir.joinpath("AntaresWeb/server.bin").write_text("server")
+    source_dir.joinpath("config.yaml").write_text("server: {}\n")
+    source_dir.joinpath("VERSION").write_text("2.19.0\n")
+    return source_dir
+
+
+class TestInstallerProcess:
+    def test_poll_events(self, tmp_path: Path, source_dir: Path) -> None:
+        target_dir = tmp_path / "target"
+        log_file = tmp_path / "wizard.log"
+        log_file_handler = LogFileHandler(log_file)
+        log_queue.add_handler(log_file_handler)
+        options = dict(source_dir=source_dir, target_dir=target_dir, shortcut=False, launch=False)
+        worker = InstallerProcess(options)
+        try:
+            worker.start()
+            events = wait_for_outcome(worker)
+        finally:
+            log_queue.remove_handler(log_file_handler)
+            log_file_handler.close()
+        assert events[-1] == InstallFinished()
+        progress = [event.progress for event in events if isinstance(event, ProgressChanged)]
+        assert progress[-1] == pytest.approx(100)
+        assert not worker.is_alive()
+        assert target_dir.joinpath("AntaresWeb/server.bin").read_text() == "server"
+        # the log records of the child process are written in the log file by the parent process
+        assert "Files was successfully copied." in log_file.read_text()
+
+    def test_poll_events__failed(self, tmp_path: Path) -> None:
+        options = dict(source_dir=tmp_path / "missing", target_dir=tmp_path / "target", shortcut=False, launch=False)
+        worker = InstallerProcess(options)
+        worker.start()
+        events = wait_for_outcome(worker)
+        assert isinstance(events[-1], InstallFailed)
+        assert not worker.is_alive()
+
+    def test_cancel(self, tmp_path: Path, source_dir: Path) -> None:
+        options = dict(source_dir=source_dir, target_dir=tmp_path / "target", shortcut=False, launch=False)
+        worker = InstallerProcess(options)
+        worker.start()
+        worker.cancel()
+        assert not worker.is_alive()
+        assert worker.poll_events(max_events=1000) == [
+            InstallFailed("Installation cancelled: run the installation again to resume it.")
+        ]
+        assert worker.poll_events(max_events=1000) == []